@@ -1,13 +1,55 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, g, has_request_context, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from peewee import *
+from peewee import SCOPE_SOURCE, Source
 from datetime import datetime, timedelta
-from playhouse.shortcuts import model_to_dict
+from playhouse.pool import PooledSqliteDatabase
+from playhouse.sqlite_ext import AutoIncrementField
 from functools import wraps
+from collections import OrderedDict
+from contextlib import contextmanager
 from werkzeug.security import generate_password_hash, check_password_hash
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import click
+import csv
+import io
+import itertools
+import json
+import logging
 import os
+import re
 import secrets
+import sys
+import threading
+import time
+import traceback
+import build_assets
+import worker_metrics
+
+try:
+    import orjson  # optional, deutlich schneller als json.dumps
+except ImportError:
+    orjson = None
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON für jsonify: kompakt, ohne Sortierung der Keys und über orjson,
+    falls installiert (JSON_ENCODER=stdlib erzwingt die Standardbibliothek).
+    """
+    sort_keys = False
+    ensure_ascii = False
+    compact = True
+    # Datumswerte wie bisher über default() (HTTP-Datum) statt orjsons ISO-Format
+    orjson_options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or os.environ.get('JSON_ENCODER') == 'stdlib' or kwargs.get('indent'):
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.orjson_options).decode()
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.secret_key = os.environ.get('SECRET_KEY', 'dein-geheimer-schluessel')  # Ändern Sie dies zu einem sicheren Schlüssel
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SECURE'] = os.environ.get('FLASK_ENV') == 'production'  # HTTPS in Produktion
@@ -22,18 +64,304 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Optionaler In-Process-Cache der User-Identität (Sekunden, 0 = aus)
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 0))
+USER_CACHE_MAX_SIZE = 1000
+_user_cache = {}  # user_id -> (gültig_bis, User)
+
+def load_user(user_id):
+    """Lädt die User-Identität (ohne password_hash), ggf. aus dem Cache"""
+    if USER_CACHE_TTL > 0:
+        cached = _user_cache.get(user_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+    
+    user = (User
+            .select(User.id, User.username, User.email)
+            .where(User.id == user_id)
+            .first())
+    
+    if USER_CACHE_TTL > 0:
+        if len(_user_cache) >= USER_CACHE_MAX_SIZE:
+            _user_cache.clear()
+        _user_cache[user_id] = (time.monotonic() + USER_CACHE_TTL, user)
+    return user
+
+def invalidate_user_cache(user_id):
+    _user_cache.pop(user_id, None)
+
 def get_current_user():
-    if 'user_id' in session:
-        return User.get_or_none(User.id == session['user_id'])
-    return None
+    """Aktueller User, wird pro Request höchstens einmal geladen (flask.g)"""
+    if 'user_id' not in session:
+        return None
+    if 'current_user' not in g:
+        g.current_user = load_user(session['user_id'])
+    return g.current_user
+
+def get_current_user_id():
+    """
+    User-ID aus der Session ohne Datenbankabfrage.
+    Für lesende Endpoints, die nur nach Kosten.user_id filtern.
+    """
+    return session.get('user_id')
+
+# Instrumentierung: Queries und SQL-Zeit pro Request, Slow-Query-Log
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+slow_query_logger = logging.getLogger('verwalco.slow_queries')
+if os.environ.get('SLOW_QUERY_LOG'):
+    slow_query_logger.addHandler(logging.FileHandler(os.environ['SLOW_QUERY_LOG']))
+    slow_query_logger.setLevel(logging.WARNING)
+
+class QueryStatsMixin:
+    """Misst jede über die peewee-Datenbank ausgeführte Query"""
+
+    def execute_sql(self, sql, params=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().execute_sql(sql, params, *args, **kwargs)
+        finally:
+            record_query(sql, params, time.perf_counter() - started)
+
+class InstrumentedSqliteDatabase(QueryStatsMixin, SqliteDatabase):
+    pass
+
+class InstrumentedPooledSqliteDatabase(QueryStatsMixin, PooledSqliteDatabase):
+    pass
+
+def record_query(sql, params, elapsed):
+    """Zählt die Query für den laufenden Request und loggt langsame Queries"""
+    slow = elapsed * 1000 >= SLOW_QUERY_MS
+    if has_request_context() and 'query_count' in g:
+        g.query_count += 1
+        g.query_time += elapsed
+        g.slow_queries += slow
+    if slow:
+        endpoint = request.endpoint if has_request_context() else '-'
+        # Parameter werden bewusst nicht geloggt (Passwort-Hashes, Tokens)
+        slow_query_logger.warning(f'Langsame Query ({elapsed * 1000:.1f} ms, {endpoint}): {sql}')
+
+# Datenbank-Konfiguration (über Umgebungsvariablen, siehe .env.example)
+DATABASE_PATH = os.environ.get('DATABASE_PATH', 'kosten.db')
+
+def create_database(path=DATABASE_PATH):
+    """
+    Erstellt die Datenbankverbindung für die SQLite-Datei `path`.
+
+    Standardmäßig wird ein Connection-Pool pro Worker-Prozess verwendet und
+    SQLite im WAL-Modus betrieben, damit Leser nicht auf Schreiber warten.
+    """
+    busy_timeout = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))  # Millisekunden
+    pragmas = {
+        # Freie Seiten per PRAGMA incremental_vacuum zurückgeben (flask maintenance);
+        # bestehende Datenbanken übernehmen das erst nach einem vollen VACUUM
+        'auto_vacuum': os.environ.get('SQLITE_AUTO_VACUUM', 'incremental'),
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'normal'),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),  # negativ = KiB, also 64 MB
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 268435456)),  # 256 MB
+        'busy_timeout': busy_timeout,
+    }
+    
+    if os.environ.get('DB_POOL', '1') == '0':
+        return InstrumentedSqliteDatabase(path, pragmas=pragmas, timeout=busy_timeout / 1000)
+    
+    return InstrumentedPooledSqliteDatabase(
+        path,
+        pragmas=pragmas,
+        timeout=busy_timeout / 1000,
+        max_connections=int(os.environ.get('DB_MAX_CONNECTIONS', 8)),
+        stale_timeout=int(os.environ.get('DB_STALE_TIMEOUT', 300)),
+        check_same_thread=False  # Verbindungen aus dem Pool wechseln zwischen Threads
+    )
+
+auth_db = create_database()
+
+# Optional: Kosten-Tabellen in einer SQLite-Datei pro User (SHARD_BUCKETS=0)
+# bzw. pro Bucket aus user_id % SHARD_BUCKETS unter SHARD_DIR. User,
+# Reset-Tokens und Wartungsläufe bleiben in DATABASE_PATH. Jede Datei hat
+# ihre eigene Schreibsperre, Schreibzugriffe verschiedener Haushalte warten
+# dann nicht mehr aufeinander. Ohne SHARD_DIR liegt alles in einer Datei.
+SHARD_DIR = os.environ.get('SHARD_DIR')
+SHARD_BUCKETS = int(os.environ.get('SHARD_BUCKETS', 0))
+SHARD_CACHE_SIZE = int(os.environ.get('SHARD_CACHE_SIZE', 64))  # offene Shard-Datenbanken pro Worker
 
-db = SqliteDatabase('kosten.db')
+class ShardRouter(DatabaseProxy):
+    """
+    Leitet alle Queries der Kosten-Tabellen an die Datenbank weiter, die im
+    aktuellen Thread gebunden ist (siehe user_database), sonst an DATABASE_PATH.
+
+    Geöffnete Shard-Datenbanken (samt Connection-Pool) liegen in einem
+    LRU-Cache mit höchstens SHARD_CACHE_SIZE Einträgen; beim Verdrängen
+    werden die freien Verbindungen geschlossen. Jede Datei wird beim ersten
+    Zugriff pro Prozess migriert.
+    """
+    __slots__ = ('_default', '_local', '_shards', '_migrated', '_lock', '_migrate_lock')
+
+    def __init__(self, default):
+        # Proxy.__init__ nicht aufrufen, obj ist hier die Property unten
+        self._default = default
+        self._local = threading.local()
+        self._shards = OrderedDict()  # Pfad -> Datenbank
+        self._migrated = set()
+        self._lock = threading.Lock()
+        self._migrate_lock = threading.Lock()
+
+    @property
+    def obj(self):
+        return getattr(self._local, 'database', None) or self._default
+
+    def use(self, database):
+        """Bindet `database` an den aktuellen Thread (None = DATABASE_PATH), gibt die bisherige zurück"""
+        previous = getattr(self._local, 'database', None)
+        self._local.database = database
+        return previous
+
+    def database_for(self, path):
+        """Geöffnete Datenbank für die Shard-Datei `path` (legt sie bei Bedarf an)"""
+        with self._lock:
+            database = self._shards.get(path)
+            if database is not None:
+                self._shards.move_to_end(path)
+            else:
+                database = self._shards[path] = create_database(path)
+                while len(self._shards) > SHARD_CACHE_SIZE:
+                    self._close(self._shards.popitem(last=False)[1])
+        
+        if path not in self._migrated:
+            with self._migrate_lock:
+                if path not in self._migrated:
+                    with bound_database(database):
+                        run_migrations()
+                    self._migrated.add(path)
+        return database
+
+    def forget(self, path):
+        """Entfernt die Shard-Datei aus dem Cache (vor dem Löschen der Datei)"""
+        with self._lock:
+            database = self._shards.pop(path, None)
+            self._migrated.discard(path)
+        if database is not None:
+            self._close(database)
+
+    @staticmethod
+    def _close(database):
+        # Verbindungen, die gerade von einem Request benutzt werden, gehen
+        # bei dessen close() an den (nicht mehr erreichbaren) Pool zurück
+        if isinstance(database, PooledSqliteDatabase):
+            database.close_idle()
+
+db = ShardRouter(auth_db) if SHARD_DIR else auth_db
+
+def shard_path(user_id):
+    """Pfad der SQLite-Datei mit den Kosten des Users"""
+    if SHARD_BUCKETS > 0:
+        return os.path.join(SHARD_DIR, f'bucket-{user_id % SHARD_BUCKETS:04d}.db')
+    return os.path.join(SHARD_DIR, f'user-{user_id}.db')
+
+@contextmanager
+def bound_database(database):
+    """Bindet `database` im aktuellen Thread und verbindet bei Bedarf"""
+    previous = db.use(database)
+    opened = database.connect(reuse_if_open=True)
+    try:
+        yield database
+    finally:
+        if opened:
+            database.close()
+        db.use(previous)
+
+@contextmanager
+def user_database(user_id):
+    """
+    Bindet im aktuellen Thread die Datenbank mit den Kosten des Users.
+    Ohne SHARD_DIR gibt es nur eine Datenbank, dann passiert nichts.
+    """
+    if not SHARD_DIR:
+        yield db
+        return
+    with bound_database(db.database_for(shard_path(user_id))) as database:
+        yield database
+
+def current_database():
+    """Die im aktuellen Thread gebundene Datenbank"""
+    return db.obj if SHARD_DIR else db
+
+def shard_paths():
+    """Alle vorhandenen Shard-Dateien, sortiert"""
+    if not SHARD_DIR or not os.path.isdir(SHARD_DIR):
+        return []
+    return [os.path.join(SHARD_DIR, name) for name in sorted(os.listdir(SHARD_DIR)) if name.endswith('.db')]
+
+def each_database():
+    """
+    Bindet nacheinander jede Datenbank-Datei im aktuellen Thread und liefert
+    ihren Pfad: DATABASE_PATH und danach alle Shard-Dateien. Für CLI-Befehle
+    und Wartung, die über alle User laufen.
+    """
+    yield auth_db.database
+    for path in shard_paths():
+        with bound_database(db.database_for(path)):
+            yield path
 
 class BaseModel(Model):
     class Meta:
         database = db
 
-class User(BaseModel):
+class AuthModel(Model):
+    """Tabellen, die auch mit SHARD_DIR in DATABASE_PATH liegen"""
+    class Meta:
+        database = auth_db
+
+# Passwort-Hashing (werkzeug-Methode, z.B. "scrypt:32768:8:1" oder "pbkdf2:sha256:600000")
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 1))  # gleichzeitige Hashes pro Worker-Prozess
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 8))  # wartende Hashes, darüber hinaus 503
+
+class PasswordHashBusy(Exception):
+    """Alle Plätze im Hash-Pool sind belegt"""
+
+class PasswordHasher:
+    """
+    Berechnet Passwort-Hashes in einem begrenzten Thread-Pool.
+
+    scrypt und pbkdf2 geben während der Berechnung den GIL frei, mit
+    Gunicorn-Threads (gthread) bedienen die übrigen Threads des Workers also
+    weiter API-Requests. Der Pool begrenzt, wie viele CPU-Kerne Logins
+    gleichzeitig belegen; ist auch die Warteschlange voll, wird sofort
+    PasswordHashBusy geworfen statt Requests unbegrenzt aufzustauen.
+    """
+
+    def __init__(self, method=PASSWORD_HASH_METHOD, workers=PASSWORD_HASH_WORKERS, queue=PASSWORD_HASH_QUEUE):
+        self.method = method
+        # Threads werden erst beim ersten Hash gestartet (unkritisch für Gunicorn --preload)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self.slots = threading.BoundedSemaphore(workers + queue)
+        self._prefix = None
+
+    def run(self, func, *args):
+        if not self.slots.acquire(blocking=False):
+            raise PasswordHashBusy()
+        try:
+            return self.pool.submit(func, *args).result()
+        finally:
+            self.slots.release()
+
+    def hash(self, password):
+        return self.run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self.run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True, wenn der Hash mit einer anderen Methode oder anderen Kosten erzeugt wurde"""
+        if self._prefix is None:
+            # Normalisierte Schreibweise der Methode, z.B. "scrypt" -> "scrypt:32768:8:1"
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefix
+
+password_hasher = PasswordHasher()
+
+class User(AuthModel):
     username = CharField(unique=True)
     email = CharField(unique=True)
     password_hash = CharField()
@@ -43,16 +371,16 @@ class User(BaseModel):
         table_name = 'users'
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
 
-class PasswordReset(BaseModel):
+class PasswordReset(AuthModel):
     user = ForeignKeyField(User, backref='password_resets', on_delete='CASCADE')
     token = CharField(unique=True, index=True)
     created_at = DateTimeField(default=datetime.now)
-    expires_at = DateTimeField()
+    expires_at = DateTimeField(index=True)  # für das Aufräumen abgelaufener Tokens
     used = BooleanField(default=False)
 
     class Meta:
@@ -67,21 +395,648 @@ class PasswordReset(BaseModel):
     def is_valid(self):
         return not self.used and datetime.now() < self.expires_at
 
+class Konto(BaseModel):
+    user = ForeignKeyField(User, backref='konten', on_delete='CASCADE')
+    name = CharField()
+    # Standard für alle Monate, einzelne Monate können abweichen (KontoMonth)
+    exclude_from_total = BooleanField(default=False)
+    # Nur in der Datenbank gesetzt (Default und SYNC_TRIGGERS), siehe SyncSequence
+    updated_seq = IntegerField(constraints=[SQL('DEFAULT 0')])
+
+    class Meta:
+        table_name = 'konten'
+        indexes = (
+            # Kontenliste und Suche nach Name direkt aus dem Index
+            (('user', 'name'), True),
+        )
+
+class KontoMonth(BaseModel):
+    """Abweichender Ausschluss-Status eines Kontos in einem einzelnen Monat"""
+    konto = ForeignKeyField(Konto, backref='months', on_delete='CASCADE')
+    year = IntegerField()
+    month = IntegerField()
+    exclude_from_total = BooleanField()
+
+    class Meta:
+        table_name = 'konto_months'
+        indexes = (
+            (('konto', 'year', 'month'), True),
+        )
+
+def month_key(month, year):
+    """Monat als Zahl YYYYMM, für Vergleiche von Zeiträumen (auch in Abfragen)"""
+    return year * 100 + month
+
+class RecurringTemplate(BaseModel):
+    """
+    Wiederkehrende Kosten, einmal gespeichert statt als Zeile in jedem Monat.
+    Gilt in allen angelegten Monaten (KostenMonth) von valid_from bis
+    valid_to (jeweils YYYYMM, valid_to leer = unbegrenzt). Weicht ein Monat
+    ab (bezahlt, geändert, verschoben), bekommt er eine eigene Kosten-Zeile
+    mit Verweis auf die Vorlage, siehe kosten_view.
+    """
+    user = ForeignKeyField(User, backref='recurring_templates', on_delete='CASCADE')
+    bezeichnung = CharField()
+    betrag = FloatField()
+    zahlungstag = IntegerField()
+    konto = ForeignKeyField(Konto, backref='recurring_templates', on_delete='CASCADE')
+    position = IntegerField(default=0)
+    valid_from = IntegerField()
+    valid_to = IntegerField(null=True)
+    updated_seq = IntegerField(constraints=[SQL('DEFAULT 0')])
+
+    class Meta:
+        table_name = 'recurring_templates'
+        indexes = (
+            (('user', 'valid_from'), False),
+        )
+
+    def covers(self, month, year):
+        key = month_key(month, year)
+        return self.valid_from <= key and (self.valid_to is None or key <= self.valid_to)
+
+    def instance(self, month, year):
+        """Der Eintrag der Vorlage im Monat als (noch nicht gespeicherte) Kosten-Zeile"""
+        return Kosten(user=self.user_id, template=self.id, bezeichnung=self.bezeichnung, betrag=self.betrag,
+                      zahlungstag=self.zahlungstag, konto=self.konto_id, bezahlt=False, position=self.position,
+                      cost_type='recurring', month=month, year=year)
+
+class KostenMonth(BaseModel):
+    """
+    Monat eines Users, in dem die Vorlagen gelten. Wird beim Monatswechsel
+    angelegt; ein Monat ohne diesen Eintrag zeigt nur gespeicherte Kosten.
+    """
+    user = ForeignKeyField(User, backref='kosten_months', on_delete='CASCADE')
+    year = IntegerField()
+    month = IntegerField()
+    updated_seq = IntegerField(constraints=[SQL('DEFAULT 0')])
+
+    class Meta:
+        table_name = 'kosten_months'
+        indexes = (
+            (('user', 'year', 'month'), True),
+        )
+
 class Kosten(BaseModel):
+    # AUTOINCREMENT: IDs archivierter oder gelöschter Einträge werden nie neu vergeben
+    id = AutoIncrementField()
     user = ForeignKeyField(User, backref='kosten', on_delete='CASCADE')
     bezeichnung = CharField()
     betrag = FloatField()
     zahlungstag = IntegerField()
-    konto = CharField()
+    konto = ForeignKeyField(Konto, backref='kosten', on_delete='CASCADE')
     bezahlt = BooleanField(default=False)
     position = IntegerField(default=0)
     cost_type = CharField(default='recurring')  # 'recurring' oder 'one-time'
     month = IntegerField(default=lambda: datetime.now().month)  # 1-12
     year = IntegerField(default=lambda: datetime.now().year)  # z.B. 2026
-    exclude_from_total = BooleanField(default=False)  # Konto aus Gesamtkalkulation ausschließen
+    # Gesetzt, wenn die Zeile den Eintrag einer Vorlage in diesem Monat ersetzt
+    template = ForeignKeyField(RecurringTemplate, null=True, backref='overrides', index=False)
+    updated_seq = IntegerField(constraints=[SQL('DEFAULT 0')])
 
     class Meta:
         table_name = 'kosten'
+        indexes = (
+            # Monatsansicht und MAX(position) je Konto: Filter auf (user, year, month, konto)
+            (('user', 'year', 'month', 'konto', 'position', 'zahlungstag'), False),
+        )
+
+# Höchstens eine eigene Zeile je Vorlage und Monat; nur Zeilen mit Vorlage,
+# damit der Index bei vielen gespeicherten Kosten nicht mitwächst
+Kosten.add_index(Kosten.index(Kosten.template, Kosten.year, Kosten.month, unique=True)
+                 .where(SQL('"template_id" IS NOT NULL')))
+
+class KostenArchive(BaseModel):
+    """
+    Kosten aus Monaten vor dem Archiv-Horizont (siehe archive_months), damit
+    die Tabelle kosten und ihre Indizes nicht mit der ganzen Historie wachsen.
+    Gleiche Spalten und IDs wie in kosten_view, Einträge aus Vorlagen behalten
+    ihre negative ID. Lesbar über kosten_view, ändern lassen sie sich nicht mehr.
+    """
+    id = IntegerField(primary_key=True)
+    user = ForeignKeyField(User, backref='kosten_archive', on_delete='CASCADE')
+    bezeichnung = CharField()
+    betrag = FloatField()
+    zahlungstag = IntegerField()
+    konto = ForeignKeyField(Konto, backref='kosten_archive', on_delete='CASCADE')
+    bezahlt = BooleanField(default=False)
+    position = IntegerField(default=0)
+    cost_type = CharField(default='recurring')
+    month = IntegerField()
+    year = IntegerField()
+
+    class Meta:
+        table_name = 'kosten_archive'
+        indexes = (
+            (('user', 'year', 'month'), False),
+        )
+
+class KostenVersion(BaseModel):
+    """
+    Versionszähler je User und Monat für ETags der GET-Endpoints.
+    Jeder schreibende Endpoint erhöht den Zähler der betroffenen Monate,
+    der Eintrag mit month=0/year=0 steht für die Kontenliste.
+    """
+    user = ForeignKeyField(User, backref='kosten_versions', on_delete='CASCADE')
+    year = IntegerField()
+    month = IntegerField()
+    version = IntegerField(default=0)
+
+    class Meta:
+        table_name = 'kosten_versions'
+        indexes = (
+            (('user', 'year', 'month'), True),
+        )
+
+class KostenMonthSummary(BaseModel):
+    """
+    Vorberechnete Summen je User, Monat und Konto für Auswertungen über
+    mehrere Jahre. Wird bei jedem Schreibzugriff für die betroffenen
+    Monate neu berechnet (siehe refresh_month_summaries).
+    """
+    user = ForeignKeyField(User, backref='month_summaries', on_delete='CASCADE')
+    year = IntegerField()
+    month = IntegerField()
+    konto = ForeignKeyField(Konto, backref='month_summaries', on_delete='CASCADE')
+    count = IntegerField(default=0)
+    total = FloatField(default=0)
+    paid = FloatField(default=0)
+
+    class Meta:
+        table_name = 'kosten_month_summaries'
+        indexes = (
+            (('user', 'year', 'month', 'konto'), True),
+        )
+
+class SyncSequence(BaseModel):
+    """
+    Fortlaufender Änderungszähler der Datenbankdatei (eine Zeile mit id=1).
+    Die Trigger aus SYNC_TRIGGERS erhöhen ihn bei jeder Änderung an Kosten,
+    Vorlagen, angelegten Monaten und Konten und schreiben den neuen Stand
+    nach updated_seq bzw. kosten_tombstones, siehe /api/kosten/changes.
+    Bis purged_seq wurden die Tombstones bereits gelöscht.
+    """
+    seq = IntegerField(default=0)
+    purged_seq = IntegerField(default=0)
+
+    class Meta:
+        table_name = 'sync_sequence'
+
+class KostenTombstone(BaseModel):
+    """ID aus kosten_view, die gelöscht wurde oder (virtuelle Einträge) nicht mehr sichtbar ist"""
+    user = ForeignKeyField(User, backref='kosten_tombstones', on_delete='CASCADE')
+    kosten_id = IntegerField()
+    month = IntegerField()
+    year = IntegerField()
+    seq = IntegerField()
+    created_at = DateTimeField(default=datetime.now, index=True)
+
+    class Meta:
+        table_name = 'kosten_tombstones'
+        indexes = (
+            (('user', 'seq'), False),
+        )
+
+class MaintenanceRun(AuthModel):
+    """Protokoll der Wartungsläufe (flask maintenance bzw. MAINTENANCE_INTERVAL)"""
+    started_at = DateTimeField(default=datetime.now, index=True)
+    finished_at = DateTimeField(null=True)
+    report = TextField(null=True)  # JSON aus run_maintenance()
+
+    class Meta:
+        table_name = 'maintenance_runs'
+
+# Effektiver Ausschluss eines Kontos im Monat: Monats-Einstellung, sonst die des Kontos
+KONTO_EXCLUDED = fn.COALESCE(KontoMonth.exclude_from_total, Konto.exclude_from_total).python_value(bool)
+
+def join_konto(query, model=Kosten):
+    """Joint Konto und dessen Monats-Einstellung an eine Abfrage auf Kosten bzw. KostenMonthSummary"""
+    return (query
+            .join(Konto, on=(model.konto == Konto.id))
+            .join(KontoMonth, JOIN.LEFT_OUTER, on=((KontoMonth.konto == Konto.id) &
+                                                   (KontoMonth.year == model.year) &
+                                                   (KontoMonth.month == model.month))))
+
+def get_konto_ids(user_id, names):
+    """
+    Liefert {Name: Konto-ID} für die Kontonamen des Users und legt fehlende
+    Konten an. Zweiter Rückgabewert: ob neue Konten angelegt wurden.
+    Aufrufer brauchen eine IMMEDIATE-Transaktion (erst lesen, dann schreiben).
+    """
+    names = set(names)
+    ids = {}
+    for batch in chunked(sorted(names), BATCH_CHUNK_SIZE):
+        ids.update(Konto
+                   .select(Konto.name, Konto.id)
+                   .where((Konto.user == user_id) & Konto.name.in_(batch))
+                   .tuples())
+    
+    missing = sorted(names - set(ids))
+    for batch in chunked(missing, BATCH_CHUNK_SIZE):
+        ids.update(Konto
+                   .insert_many([{'user': user_id, 'name': name} for name in batch])
+                   .returning(Konto.name, Konto.id)
+                   .tuples()
+                   .execute())
+    return ids, bool(missing)
+
+# Virtuelle Einträge aus Vorlagen: ID = -(Vorlagen-ID * VIRTUAL_ID_FACTOR + YYYYMM)
+VIRTUAL_ID_FACTOR = 1000000
+
+def virtual_kosten_id(template_id, month, year):
+    return -(template_id * VIRTUAL_ID_FACTOR + month_key(month, year))
+
+def split_virtual_id(kosten_id):
+    """Zerlegt eine virtuelle ID in (Vorlagen-ID, Monat, Jahr)"""
+    template_id, key = divmod(-kosten_id, VIRTUAL_ID_FACTOR)
+    year, month = divmod(key, 100)
+    return template_id, month, year
+
+def filter_kosten_source(query, model, user_id=None, months=None, start=None, end=None):
+    """Filter nach User (ID oder Liste), Monaten [(month, year), ...] und Zeitraum auf Kosten bzw. KostenMonth"""
+    if user_id is not None:
+        query = query.where(model.user.in_(user_id) if isinstance(user_id, (list, tuple, set)) else
+                            model.user == user_id)
+    if months is not None:
+        query = query.where(Tuple(model.month, model.year).in_(list(months)))
+    return filter_period(query, model, start, end)
+
+KOSTEN_VIEW_SQL = (
+    'SELECT "k"."id", "k"."user_id" AS "user", "k"."bezeichnung", "k"."betrag", "k"."zahlungstag", '
+    '"k"."konto_id" AS "konto", "k"."bezahlt", "k"."position", "k"."cost_type", "k"."month", "k"."year", '
+    '"k"."template_id" AS "template", "k"."updated_seq", 0 AS "archived" '
+    'FROM "kosten" AS "k" WHERE {kosten} '
+    'UNION ALL '
+    'SELECT -("t"."id" * %d + "m"."year" * 100 + "m"."month"), "m"."user_id", "t"."bezeichnung", "t"."betrag", '
+    '"t"."zahlungstag", "t"."konto_id", 0, "t"."position", \'recurring\', "m"."month", "m"."year", "t"."id", '
+    'MAX("t"."updated_seq", "m"."updated_seq"), 0 '
+    'FROM "kosten_months" AS "m" '
+    'JOIN "recurring_templates" AS "t" ON "t"."user_id" = "m"."user_id" '
+    'AND "m"."year" * 100 + "m"."month" >= "t"."valid_from" '
+    'AND ("t"."valid_to" IS NULL OR "m"."year" * 100 + "m"."month" <= "t"."valid_to") '
+    'WHERE NOT EXISTS (SELECT 1 FROM "kosten" AS "o" WHERE "o"."template_id" = "t"."id" '
+    'AND "o"."year" = "m"."year" AND "o"."month" = "m"."month") AND {months}'
+) % VIRTUAL_ID_FACTOR
+
+KOSTEN_ARCHIVE_SQL = (
+    ' UNION ALL '
+    'SELECT "a"."id", "a"."user_id", "a"."bezeichnung", "a"."betrag", "a"."zahlungstag", "a"."konto_id", '
+    '"a"."bezahlt", "a"."position", "a"."cost_type", "a"."month", "a"."year", NULL, 0, 1 '
+    'FROM "kosten_archive" AS "a" WHERE {archive}'
+)
+
+# Änderungszähler für /api/kosten/changes: jede Änderung an einer Zeile von
+# kosten_view (auch über Vorlagen, angelegte Monate und Konten) bekommt in
+# SQLite-Triggern den nächsten Stand von sync_sequence. Trigger statt Code
+# in den Endpoints, damit auch Bulk-Updates, Import und Monatswechsel
+# erfasst werden. Nicht mehr sichtbare IDs landen in kosten_tombstones.
+SYNC_SQL = {
+    'next': 'UPDATE "sync_sequence" SET "seq" = "seq" + 1 WHERE "id" = 1;',
+    'seq': '(SELECT "seq" FROM "sync_sequence" WHERE "id" = 1)',
+    'tombstone': 'INSERT INTO "kosten_tombstones" ("user_id", "kosten_id", "month", "year", "seq", "created_at")',
+    'now': "datetime('now', 'localtime')",
+    'factor': VIRTUAL_ID_FACTOR,
+}
+
+SYNC_TRIGGERS = {
+    'kosten_sync_insert': (
+        'AFTER INSERT ON "kosten" BEGIN {next} '
+        'UPDATE "kosten" SET "updated_seq" = {seq} WHERE "id" = NEW."id"; '
+        # Ersetzt eine eigene Zeile den Eintrag einer Vorlage, verschwindet dessen virtuelle ID
+        '{tombstone} SELECT NEW."user_id", -(NEW."template_id" * {factor} + NEW."year" * 100 + NEW."month"), '
+        'NEW."month", NEW."year", {seq}, {now} WHERE NEW."template_id" IS NOT NULL; END'
+    ),
+    'kosten_sync_update': (
+        'AFTER UPDATE OF "bezeichnung", "betrag", "zahlungstag", "konto_id", "bezahlt", "position", "cost_type", '
+        '"month", "year", "template_id" ON "kosten" BEGIN {next} '
+        'UPDATE "kosten" SET "updated_seq" = {seq} WHERE "id" = NEW."id"; '
+        # In einen anderen Monat verschoben: im alten Monat nicht mehr sichtbar
+        '{tombstone} SELECT OLD."user_id", OLD."id", OLD."month", OLD."year", {seq}, {now} '
+        'WHERE OLD."month" != NEW."month" OR OLD."year" != NEW."year"; END'
+    ),
+    'kosten_sync_delete': (
+        'AFTER DELETE ON "kosten" BEGIN {next} '
+        '{tombstone} VALUES (OLD."user_id", OLD."id", OLD."month", OLD."year", {seq}, {now}); '
+        # Ohne die eigene Zeile ist der Eintrag der Vorlage wieder sichtbar
+        'UPDATE "kosten_months" SET "updated_seq" = {seq} WHERE OLD."template_id" IS NOT NULL '
+        'AND "user_id" = OLD."user_id" AND "year" = OLD."year" AND "month" = OLD."month"; END'
+    ),
+    'recurring_templates_sync_insert': (
+        'AFTER INSERT ON "recurring_templates" BEGIN {next} '
+        'UPDATE "recurring_templates" SET "updated_seq" = {seq} WHERE "id" = NEW."id"; END'
+    ),
+    'recurring_templates_sync_update': (
+        'AFTER UPDATE OF "bezeichnung", "betrag", "zahlungstag", "konto_id", "position", "valid_from", "valid_to" '
+        'ON "recurring_templates" BEGIN {next} '
+        'UPDATE "recurring_templates" SET "updated_seq" = {seq} WHERE "id" = NEW."id"; '
+        # Monate, die nicht mehr im Gültigkeitsbereich liegen
+        '{tombstone} SELECT "m"."user_id", -(OLD."id" * {factor} + "m"."year" * 100 + "m"."month"), '
+        '"m"."month", "m"."year", {seq}, {now} FROM "kosten_months" AS "m" WHERE "m"."user_id" = OLD."user_id" '
+        'AND "m"."year" * 100 + "m"."month" BETWEEN OLD."valid_from" AND COALESCE(OLD."valid_to", 999999) '
+        'AND "m"."year" * 100 + "m"."month" NOT BETWEEN NEW."valid_from" AND COALESCE(NEW."valid_to", 999999); END'
+    ),
+    'recurring_templates_sync_delete': (
+        'AFTER DELETE ON "recurring_templates" BEGIN {next} '
+        '{tombstone} SELECT "m"."user_id", -(OLD."id" * {factor} + "m"."year" * 100 + "m"."month"), '
+        '"m"."month", "m"."year", {seq}, {now} FROM "kosten_months" AS "m" WHERE "m"."user_id" = OLD."user_id" '
+        'AND "m"."year" * 100 + "m"."month" BETWEEN OLD."valid_from" AND COALESCE(OLD."valid_to", 999999); END'
+    ),
+    'kosten_months_sync_insert': (
+        'AFTER INSERT ON "kosten_months" BEGIN {next} '
+        'UPDATE "kosten_months" SET "updated_seq" = {seq} WHERE "id" = NEW."id"; END'
+    ),
+    'kosten_months_sync_delete': (
+        'AFTER DELETE ON "kosten_months" BEGIN {next} '
+        '{tombstone} SELECT OLD."user_id", -("t"."id" * {factor} + OLD."year" * 100 + OLD."month"), '
+        'OLD."month", OLD."year", {seq}, {now} FROM "recurring_templates" AS "t" WHERE "t"."user_id" = OLD."user_id" '
+        'AND OLD."year" * 100 + OLD."month" BETWEEN "t"."valid_from" AND COALESCE("t"."valid_to", 999999); END'
+    ),
+    # Name und Ausschluss stehen in jeder Zeile der API, /api/kosten/changes
+    # liefert dann alle Einträge des Kontos
+    'konten_sync_update': (
+        'AFTER UPDATE OF "name", "exclude_from_total" ON "konten" BEGIN {next} '
+        'UPDATE "konten" SET "updated_seq" = {seq} WHERE "id" = NEW."id"; END'
+    ),
+    'konto_months_sync_insert': (
+        'AFTER INSERT ON "konto_months" BEGIN {next} '
+        'UPDATE "konten" SET "updated_seq" = {seq} WHERE "id" = NEW."konto_id"; END'
+    ),
+    'konto_months_sync_update': (
+        'AFTER UPDATE ON "konto_months" BEGIN {next} '
+        'UPDATE "konten" SET "updated_seq" = {seq} WHERE "id" = NEW."konto_id"; END'
+    ),
+    'konto_months_sync_delete': (
+        'AFTER DELETE ON "konto_months" BEGIN {next} '
+        'UPDATE "konten" SET "updated_seq" = {seq} WHERE "id" = OLD."konto_id"; END'
+    ),
+}
+
+def create_sync_triggers():
+    """Zeile in sync_sequence und die Trigger aus SYNC_TRIGGERS anlegen (neue Datenbank und nach Migrationen)"""
+    # Start bei 1, since=0 steht bei /api/kosten/changes für "alles laden"
+    SyncSequence.insert(id=1, seq=1).on_conflict_ignore().execute()
+    for name, body in SYNC_TRIGGERS.items():
+        db.execute_sql(f'CREATE TRIGGER IF NOT EXISTS "{name}" ' + body.format(**SYNC_SQL))
+
+# Volltextsuche (/api/search): FTS5-Index über Bezeichnung und Kontoname der
+# gespeicherten Kosten, des Archivs und der Vorlagen (virtuelle Einträge
+# kommen über ihre Vorlage). rowid = ID * 4 + Quelle, owner = "u<User-ID>"
+# beschränkt die Suche auf den User. Aktuell gehalten von search_triggers().
+SEARCH_SOURCES = {'kosten': 1, 'kosten_archive': 2, 'recurring_templates': 3}
+
+SEARCH_TABLE_SQL = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS "kosten_search" USING fts5('
+    '"bezeichnung", "konto", "owner", tokenize = \'unicode61 remove_diacritics 2\', prefix = \'2 3\')'
+)
+
+def search_triggers():
+    """Trigger, die kosten_search bei Änderungen an den Quellen und am Kontonamen nachführen"""
+    konto = '(SELECT "name" FROM "konten" WHERE "id" = NEW."konto_id")'
+    triggers = {}
+    for table, source in SEARCH_SOURCES.items():
+        triggers[f'{table}_search_insert'] = (
+            f'AFTER INSERT ON "{table}" BEGIN '
+            f'INSERT INTO "kosten_search" ("rowid", "bezeichnung", "konto", "owner") '
+            f'VALUES (NEW."id" * 4 + {source}, NEW."bezeichnung", {konto}, \'u\' || NEW."user_id"); END'
+        )
+        triggers[f'{table}_search_update'] = (
+            f'AFTER UPDATE OF "bezeichnung", "konto_id" ON "{table}" BEGIN '
+            f'UPDATE "kosten_search" SET "bezeichnung" = NEW."bezeichnung", "konto" = {konto} '
+            f'WHERE "rowid" = NEW."id" * 4 + {source}; END'
+        )
+        triggers[f'{table}_search_delete'] = (
+            f'AFTER DELETE ON "{table}" BEGIN '
+            f'DELETE FROM "kosten_search" WHERE "rowid" = OLD."id" * 4 + {source}; END'
+        )
+    # Umbenennen: alle Einträge des Kontos (über den Index auf user_id)
+    triggers['konten_search_update'] = (
+        'AFTER UPDATE OF "name" ON "konten" BEGIN '
+        'UPDATE "kosten_search" SET "konto" = NEW."name" WHERE "rowid" IN (' +
+        ' UNION ALL '.join(f'SELECT "id" * 4 + {source} FROM "{table}" '
+                           f'WHERE "user_id" = NEW."user_id" AND "konto_id" = NEW."id"'
+                           for table, source in SEARCH_SOURCES.items()) +
+        '); END'
+    )
+    return triggers
+
+def search_index_exists():
+    return db.table_exists('kosten_search')
+
+def create_search_index():
+    """
+    Legt kosten_search und die Trigger an (neue Datenbank und nach Migrationen).
+    Ohne FTS5 im SQLite-Build bleibt die Suche aus, statt die Migration abzubrechen.
+    """
+    if not db.execute_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0]:
+        app.logger.warning('SQLite ohne FTS5, /api/search ist nicht verfügbar')
+        return False
+    db.execute_sql(SEARCH_TABLE_SQL)
+    for name, body in search_triggers().items():
+        db.execute_sql(f'CREATE TRIGGER IF NOT EXISTS "{name}" {body}')
+    return True
+
+def rebuild_search_index():
+    """Füllt kosten_search komplett neu aus kosten, kosten_archive und recurring_templates"""
+    db.execute_sql('DELETE FROM "kosten_search"')
+    for table, source in SEARCH_SOURCES.items():
+        db.execute_sql(
+            f'INSERT INTO "kosten_search" ("rowid", "bezeichnung", "konto", "owner") '
+            f'SELECT "s"."id" * 4 + {source}, "s"."bezeichnung", "k"."name", \'u\' || "s"."user_id" '
+            f'FROM "{table}" AS "s" JOIN "konten" AS "k" ON "k"."id" = "s"."konto_id"'
+        )
+
+class KostenView(Source):
+    """Fertiges SQL als Unterabfrage "kosten_view", Spalten über .c wie bei einer Abfrage"""
+
+    def __init__(self, sql, params):
+        super().__init__(alias='kosten_view')
+        self._sql = sql
+        self._params = params
+
+    def __sql__(self, ctx):
+        if ctx.scope == SCOPE_SOURCE:
+            ctx.literal('(').sql(SQL(self._sql, self._params)).literal(')')
+            return self.apply_alias(ctx)
+        return self.apply_column(ctx)
+
+def kosten_view_filter(table, user_id=None, months=None, start=None, end=None):
+    """WHERE-Bedingung und Parameter für User (ID oder Liste), Monate [(month, year), ...] und Zeitraum"""
+    conditions, params = ['1'], []
+    if user_id is not None:
+        user_ids = list(user_id) if isinstance(user_id, (list, tuple, set)) else [user_id]
+        conditions.append(f'"{table}"."user_id" IN ({", ".join("?" * len(user_ids))})' if user_ids else '0')
+        params.extend(user_ids)
+    if months is not None:
+        months = list(months)
+        conditions.append(f'("{table}"."month", "{table}"."year") IN ({", ".join(["(?, ?)"] * len(months))})'
+                          if months else '0')
+        params.extend(value for month, year in months for value in (month, year))
+    for operator, bound in (('>=', start), ('<=', end)):
+        if bound:
+            conditions.append(f'("{table}"."year", "{table}"."month") {operator} (?, ?)')
+            params.extend(bound)
+    return ' AND '.join(conditions), params
+
+def id_filter(column, values, sql, params):
+    """
+    Hängt "column IN (values)" an eine Bedingung aus kosten_view_filter an
+    (values None = ohne Filter). Die IDs gehen als ein JSON-Parameter an
+    SQLite, peewee verarbeitet sonst jeden der oft tausend Werte einzeln.
+    """
+    if values is None:
+        return sql, params
+    return f'{sql} AND {column} IN (SELECT "value" FROM json_each(?))', params + [json.dumps(list(values))]
+
+def kosten_view(user_id=None, months=None, start=None, end=None, archived=True, ids=None, archive_ids=None,
+                template_ids=None):
+    """
+    Alle Kosten-Einträge als Unterabfrage mit den Spalten von Kosten: die
+    gespeicherten Zeilen plus je Vorlage und angelegtem Monat ein virtueller
+    Eintrag (negative ID, unbezahlt), solange der Monat für die Vorlage
+    keine eigene Zeile hat, und (mit archived) die archivierten Einträge;
+    die Spalte archived unterscheidet sie von den übrigen.
+    Mit ids nur diese gespeicherten Einträge, mit archive_ids nur diese
+    archivierten und mit template_ids nur die virtuellen Einträge dieser
+    Vorlagen.
+    Die Filter stehen in jedem Teil der Abfrage, damit SQLite die Indizes
+    nutzt. Das SQL ist von Hand geschrieben: die gleiche Abfrage über
+    peewee zusammenzubauen dauert ein Vielfaches länger als sie auszuführen.
+    """
+    kosten, kosten_params = id_filter('"k"."id"', ids, *kosten_view_filter('k', user_id, months, start, end))
+    virtual, virtual_params = id_filter('"t"."id"', template_ids,
+                                        *kosten_view_filter('m', user_id, months, start, end))
+    sql = KOSTEN_VIEW_SQL.format(kosten=kosten, months=virtual)
+    params = kosten_params + virtual_params
+    if archived:
+        archive, archive_params = id_filter('"a"."id"', archive_ids,
+                                            *kosten_view_filter('a', user_id, months, start, end))
+        sql += KOSTEN_ARCHIVE_SQL.format(archive=archive)
+        params += archive_params
+    return KostenView(sql, params)
+
+def select_view(view, *columns):
+    """SELECT columns FROM kosten_view(...)"""
+    return Select([view], columns).bind(db)
+
+def load_kosten(user_id, kosten_ids):
+    """
+    Lädt Kosten-Einträge des Users per ID und liefert {ID: Kosten}.
+    Für virtuelle IDs (negativ) kommt die eigene Zeile der Vorlage im Monat,
+    falls es sie schon gibt, sonst eine noch nicht gespeicherte Kosten-Instanz
+    mit den Werten der Vorlage; erst save() bzw. save_new_kosten() legt die
+    Zeile an. Unbekannte IDs fehlen im Ergebnis.
+    """
+    kosten_ids = [kosten_id for kosten_id in kosten_ids if isinstance(kosten_id, int)]
+    result = {}
+    for batch in chunked([kosten_id for kosten_id in kosten_ids if kosten_id > 0], BATCH_CHUNK_SIZE):
+        result.update({k.id: k for k in Kosten.select().where(Kosten.id.in_(batch) & (Kosten.user == user_id))})
+    
+    virtual = {kosten_id: split_virtual_id(kosten_id) for kosten_id in kosten_ids if kosten_id < 0}
+    if not virtual:
+        return result
+    months = {(month, year) for _, month, year in virtual.values()}
+    templates = {}
+    overrides = {}
+    for batch in chunked(sorted({template_id for template_id, _, _ in virtual.values()}), BATCH_CHUNK_SIZE):
+        templates.update({t.id: t for t in RecurringTemplate.select().where(
+            RecurringTemplate.id.in_(batch) & (RecurringTemplate.user == user_id))})
+        overrides.update({(k.template_id, k.month, k.year): k for k in Kosten.select().where(
+            Kosten.template.in_(batch) & Tuple(Kosten.month, Kosten.year).in_(list(months)))})
+    opened = set(filter_kosten_source(KostenMonth.select(KostenMonth.month, KostenMonth.year),
+                                      KostenMonth, user_id, months).tuples())
+    
+    for kosten_id, (template_id, month, year) in virtual.items():
+        template = templates.get(template_id)
+        if template and template.covers(month, year) and (month, year) in opened:
+            result[kosten_id] = overrides.get((template_id, month, year)) or template.instance(month, year)
+    return result
+
+def delete_kosten_entries(entries):
+    """Löscht Einträge aus load_kosten; bei Vorlagen nur den jeweiligen Monat"""
+    # Spätester Monat zuerst, damit die Vorlage für frühere Monate erhalten bleibt
+    for kosten in sorted(entries, key=lambda k: month_key(k.month, k.year), reverse=True):
+        if kosten.template_id is not None:
+            remove_template_month(kosten.template_id, kosten.month, kosten.year)
+    stored = [kosten.id for kosten in entries if kosten.template_id is None]
+    for batch in chunked(stored, BATCH_CHUNK_SIZE):
+        Kosten.delete().where(Kosten.id.in_(batch)).execute()
+
+# Einträge in kosten_archive sind nur noch lesbar
+ARCHIVED_ERROR = 'Monat archiviert, Einträge lassen sich nicht mehr ändern'
+
+def archived_kosten_ids(user_id, kosten_ids):
+    """Die IDs aus kosten_ids, die im Archiv des Users stehen"""
+    kosten_ids = [kosten_id for kosten_id in kosten_ids if isinstance(kosten_id, int)]
+    result = set()
+    for batch in chunked(kosten_ids, BATCH_CHUNK_SIZE):
+        result.update(row[0] for row in (KostenArchive
+                                         .select(KostenArchive.id)
+                                         .where(KostenArchive.id.in_(batch) & (KostenArchive.user == user_id))
+                                         .tuples()))
+    return result
+
+def archived_month_keys(user_id, months):
+    """Die Monate [(month, year), ...], die für den User schon archiviert sind"""
+    result = set()
+    for batch in chunked(sorted(set(months)), BATCH_CHUNK_SIZE):
+        result.update(filter_kosten_source(KostenArchive.select(KostenArchive.month, KostenArchive.year).distinct(),
+                                           KostenArchive, user_id, batch).tuples())
+    return result
+
+def kosten_not_found(user_id, kosten_id):
+    """Antwort für eine ID, die load_kosten nicht findet: 409 für archivierte Einträge, sonst 404"""
+    if archived_kosten_ids(user_id, [kosten_id]):
+        return jsonify({'success': False, 'error': ARCHIVED_ERROR}), 409
+    return jsonify({'success': False, 'error': 'Eintrag nicht gefunden'}), 404
+
+def save_new_kosten(instances):
+    """Legt noch nicht gespeicherte Einträge aus load_kosten per insert_many an und setzt deren IDs"""
+    instances = [kosten for kosten in instances if kosten.id is None]
+    for batch in chunked(instances, BATCH_CHUNK_SIZE):
+        rows = [dict(kosten.__data__) for kosten in batch]
+        new_ids = Kosten.insert_many(rows).returning(Kosten.id).tuples().execute()
+        for kosten, (new_id,) in zip(batch, new_ids):
+            kosten.id = new_id
+
+def remove_template_month(template_id, month, year):
+    """
+    Nimmt eine Vorlage aus einem Monat heraus (Löschen des Eintrags): die
+    Vorlage endet im Vormonat. Gibt es danach noch angelegte Monate im
+    Gültigkeitsbereich, läuft dort eine Kopie weiter und übernimmt deren
+    eigene Zeilen; die virtuellen IDs dort ändern sich, daher steigt deren
+    Version. Die eigene Zeile im Monat selbst wird gelöscht.
+    """
+    template = RecurringTemplate.get_by_id(template_id)
+    key = month_key(month, year)
+    Kosten.delete().where((Kosten.template == template.id) & (Kosten.month == month) & (Kosten.year == year)).execute()
+    
+    later = (KostenMonth
+             .select(KostenMonth.month, KostenMonth.year)
+             .where((KostenMonth.user == template.user_id) &
+                    (month_key(KostenMonth.month, KostenMonth.year) > key)))
+    if template.valid_to is not None:
+        later = later.where(month_key(KostenMonth.month, KostenMonth.year) <= template.valid_to)
+    later = list(later.tuples())
+    if later:
+        next_month, next_year = get_next_month(month, year)
+        successor = RecurringTemplate.create(
+            user=template.user_id, bezeichnung=template.bezeichnung, betrag=template.betrag,
+            zahlungstag=template.zahlungstag, konto=template.konto_id, position=template.position,
+            valid_from=month_key(next_month, next_year), valid_to=template.valid_to)
+        (Kosten
+         .update(template=successor.id)
+         .where((Kosten.template == template.id) & (month_key(Kosten.month, Kosten.year) > key))
+         .execute())
+        bump_versions(template.user_id, later, summaries=False)
+    
+    if template.valid_from >= key:
+        template.delete_instance()
+    else:
+        prev_month, prev_year = get_previous_month(month, year)
+        template.valid_to = month_key(prev_month, prev_year)
+        template.save()
+
+PASSWORD_BUSY_MESSAGE = 'Zu viele Anmeldungen gleichzeitig, bitte in ein paar Sekunden erneut versuchen'
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -109,14 +1064,14 @@ def register():
         
         if error is None:
             try:
-                user = User.create(
-                    username=username,
-                    email=email,
-                    password_hash=generate_password_hash(password)
-                )
+                user = User(username=username, email=email)
+                user.set_password(password)
+                user.save()
                 session['user_id'] = user.id
                 session['username'] = user.username
                 return redirect('/')
+            except PasswordHashBusy:
+                return render_template('register.html', error=PASSWORD_BUSY_MESSAGE), 503
             except Exception as e:
                 error = f'Registrierung fehlgeschlagen: {str(e)}'
         
@@ -136,10 +1091,17 @@ def login():
         error = None
         user = User.get_or_none(User.username == username)
         
-        if user is None:
-            error = 'Ungültiger Benutzername oder Passwort'
-        elif not user.check_password(password):
-            error = 'Ungültiger Benutzername oder Passwort'
+        try:
+            if user is None:
+                error = 'Ungültiger Benutzername oder Passwort'
+            elif not user.check_password(password):
+                error = 'Ungültiger Benutzername oder Passwort'
+            elif password_hasher.needs_rehash(user.password_hash):
+                # Hash mit veralteter Methode/Kosten beim Login transparent erneuern
+                user.set_password(password)
+                User.update(password_hash=user.password_hash).where(User.id == user.id).execute()
+        except PasswordHashBusy:
+            return render_template('login.html', error=PASSWORD_BUSY_MESSAGE), 503
         
         if error is None:
             session['user_id'] = user.id
@@ -220,7 +1182,7 @@ def reset_password(token):
             try:
                 # Passwort aktualisieren
                 user = reset.user
-                user.password_hash = generate_password_hash(password)
+                user.set_password(password)
                 user.save()
                 
                 # Token als verwendet markieren
@@ -230,6 +1192,8 @@ def reset_password(token):
                 return render_template('reset_password.html', 
                                      success=True,
                                      username=user.username)
+            except PasswordHashBusy:
+                return render_template('reset_password.html', error=PASSWORD_BUSY_MESSAGE, token=token), 503
             except Exception as e:
                 error = f'Fehler beim Zurücksetzen: {str(e)}'
         
@@ -242,11 +1206,191 @@ def reset_password(token):
 @app.route('/')
 @login_required
 def index():
-    return render_template('index.html')
+    # Mit BOOTSTRAP_INLINE braucht die Seite beim ersten Anzeigen keinen API-Aufruf
+    bootstrap = None
+    if BOOTSTRAP_INLINE:
+        month, year = get_month_year_args()
+        bootstrap = build_bootstrap(get_current_user_id(), month, year)
+    response = app.make_response(render_template('index.html', bootstrap=bootstrap))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Metriken je Endpoint. Jeder Worker-Prozess schreibt seinen Stand regelmäßig
+# nach METRICS_DIR, /metrics summiert die Dateien aller Worker. Die Dateien
+# beendeter Worker fasst der Gunicorn-Master zusammen (gunicorn.conf.py).
+METRICS_DIR = os.environ.get('METRICS_DIR', 'metrics')
+METRICS_FLUSH_INTERVAL = 1.0  # Sekunden
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class RequestMetrics:
+    """Zähler des aktuellen Worker-Prozesses"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}   # "endpoint method status" -> Anzahl
+        self.durations = {}  # endpoint -> [Bucket-Zähler..., Summe, Anzahl]
+        self.queries = {}    # endpoint -> [Queries, SQL-Sekunden, langsame Queries]
+        self.last_flush = 0.0
+
+    def observe(self, endpoint, method, status, duration, query_count, query_time, slow_queries):
+        with self.lock:
+            key = f'{endpoint} {method} {status}'
+            self.requests[key] = self.requests.get(key, 0) + 1
+            
+            histogram = self.durations.setdefault(endpoint, [0] * (len(DURATION_BUCKETS) + 2))
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    histogram[index] += 1
+            histogram[-2] += duration
+            histogram[-1] += 1
+            
+            stats = self.queries.setdefault(endpoint, [0, 0.0, 0])
+            stats[0] += query_count
+            stats[1] += query_time
+            stats[2] += slow_queries
+
+    def flush(self, force=False):
+        """Schreibt den Stand dieses Workers nach METRICS_DIR (höchstens 1x pro Sekunde)"""
+        now = time.monotonic()
+        if not force and now - self.last_flush < METRICS_FLUSH_INTERVAL:
+            return
+        with self.lock:
+            if not self.requests:
+                return
+            data = json.dumps({'requests': self.requests, 'durations': self.durations, 'queries': self.queries})
+            self.last_flush = now
+        worker_metrics.write_metrics(worker_metrics.worker_path(METRICS_DIR, os.getpid()), data)
+
+request_metrics = RequestMetrics()
+# Letzter Stand beim Beenden des Workers, danach übernimmt child_exit die Datei
+atexit.register(request_metrics.flush, force=True)
+
+def collect_metrics():
+    """Summiert die Metriken aller Worker-Dateien (inkl. der beendeten Worker)"""
+    return worker_metrics.collect_metrics(METRICS_DIR)
+
+def render_metrics(merged):
+    """Prometheus-Textformat (Version 0.0.4)"""
+    lines = [
+        '# HELP verwalco_http_requests_total Anzahl HTTP-Requests',
+        '# TYPE verwalco_http_requests_total counter',
+    ]
+    for key, count in sorted(merged['requests'].items()):
+        endpoint, method, status = key.split(' ')
+        lines.append(f'verwalco_http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+    
+    lines += [
+        '# HELP verwalco_http_request_duration_seconds Laufzeit der Requests',
+        '# TYPE verwalco_http_request_duration_seconds histogram',
+    ]
+    for endpoint, histogram in sorted(merged['durations'].items()):
+        for bound, count in zip(DURATION_BUCKETS, histogram):
+            lines.append(f'verwalco_http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+        lines.append(f'verwalco_http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {histogram[-1]}')
+        lines.append(f'verwalco_http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {histogram[-2]:.6f}')
+        lines.append(f'verwalco_http_request_duration_seconds_count{{endpoint="{endpoint}"}} {histogram[-1]}')
+    
+    for index, (name, help_text) in enumerate((
+            ('verwalco_db_queries_total', 'Anzahl SQL-Queries'),
+            ('verwalco_db_query_seconds_total', 'Zeit in SQL-Queries'),
+            ('verwalco_db_slow_queries_total', 'Anzahl Queries über SLOW_QUERY_MS'))):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for endpoint, stats in sorted(merged['queries'].items()):
+            value = f'{stats[index]:.6f}' if index == 1 else stats[index]
+            lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+    
+    return '\n'.join(lines) + '\n'
+
+# Optionaler Sampling-Profiler für einzelne Requests: nur mit PROFILING_ENABLED=1
+# und Header "X-Verwalco-Profile: <ADMIN_SECRET>". Ergebnis im "folded stacks"-Format
+# (für flamegraph.pl / speedscope) in PROFILE_DIR.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED') == '1'
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_INTERVAL = 0.001  # Sekunden (Wall-Clock) zwischen zwei Samples
+
+class SamplingProfiler:
+    """
+    Ein eigener Thread liest in festen Abständen per sys._current_frames()
+    den Call-Stack des Request-Threads. SIGPROF und sys.setprofile wirken nur
+    im Haupt-Thread bzw. auf neue Threads, gthread-Worker bearbeiten Requests
+    aber in den Threads ihres Pools. Gezählt wird Wall-Clock-Zeit, Warten auf
+    SQLite-Sperren oder I/O erscheint also mit im Profil.
+    """
+
+    def __init__(self, thread_id=None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples = {}
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        stack = ';'.join(f'{f.name} ({os.path.basename(f.filename)}:{f.lineno})'
+                         for f in traceback.extract_stack(frame))
+        self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def _run(self):
+        while not self.stopped.wait(PROFILE_INTERVAL):
+            self._sample()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='verwalco-profiler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+
+    def save(self, endpoint):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f'{endpoint}-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}.folded')
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f'{stack} {count}\n')
+        return path
+
+def profiling_requested():
+    return PROFILING_ENABLED and request.headers.get('X-Verwalco-Profile') == ADMIN_SECRET
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.query_count = 0
+    g.query_time = 0.0
+    g.slow_queries = 0
+    if profiling_requested():
+        g.profiler = SamplingProfiler()
+        g.profiler.start()
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_started' not in g:
+        return response
+    if 'profiler' in g:
+        g.profiler.stop()
+        response.headers['X-Verwalco-Profile-File'] = g.profiler.save(request.endpoint or 'none')
+        del g.profiler
+    
+    duration = time.perf_counter() - g.request_started
+    request_metrics.observe(request.endpoint or 'none', request.method, response.status_code,
+                            duration, g.query_count, g.query_time, g.slow_queries)
+    request_metrics.flush()
+    
+    response.headers['Server-Timing'] = (f'app;dur={duration * 1000:.1f}, '
+                                         f'db;dur={g.query_time * 1000:.1f};desc="{g.query_count} queries"')
+    return response
 
 @app.before_request
 def before_request():
-    db.connect(reuse_if_open=True)
+    auth_db.connect(reuse_if_open=True)
+    if SHARD_DIR and 'user_id' in session:
+        # Kosten-Tabellen des eingeloggten Users (Verbindung aus dem Pool der Shard-Datei)
+        db.use(db.database_for(shard_path(session['user_id'])))
+        db.connect(reuse_if_open=True)
+    maintenance_scheduler.start()
     
     if not request.endpoint:
         return
@@ -255,142 +1399,610 @@ def before_request():
         return
 
     # Öffentliche Routen, die ohne Login erreichbar sind
-    public_routes = ['login', 'register', 'forgot_password', 'reset_password']
+    # (metrics ist über ADMIN_SECRET geschützt, damit Prometheus ohne Session abfragen kann)
+    public_routes = ['login', 'register', 'forgot_password', 'reset_password', 'metrics']
     
     if request.endpoint not in public_routes and 'user_id' not in session:
         return redirect('/login')
 
-@app.after_request
-def after_request(response):
-    db.close()
-    return response
+@app.teardown_request
+def teardown_request(exc):
+    # Läuft auch bei Exceptions, gibt die Verbindung an den Pool zurück
+    if 'profiler' in g:
+        g.profiler.stop()
+    if SHARD_DIR:
+        if not db.is_closed():
+            db.close()
+        db.use(None)
+    if not auth_db.is_closed():
+        auth_db.close()
 
-@app.route('/api/kosten', methods=['GET'])
-@login_required
-def get_kosten():
-    user = get_current_user()
-    if not user:
-        return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
-    
-    # Monat und Jahr aus Query-Parametern holen
+# Abstand zwischen Positionen, damit beim Verschieben nur eine Zeile geändert werden muss
+POSITION_STEP = 1024
+
+def get_next_position(user_id, konto_id, month, year):
+    """Position hinter dem letzten Eintrag des Kontos im Monat (inkl. Vorlagen)"""
+    view = kosten_view(user_id, months=[(month, year)])
+    max_position = select_view(view, fn.MAX(view.c.position)).where(view.c.konto == konto_id).scalar()
+    if max_position is None:
+        return POSITION_STEP
+    return max_position + POSITION_STEP
+
+def parse_betrag(value):
+    """Wandelt einen Betrag im deutschen Zahlenformat (z.B. 1.234,56) in float um"""
+    betrag_str = str(value).strip()
+    if ',' in betrag_str:
+        # Replace only the last comma with a dot and remove all dots (thousand separators)
+        parts = betrag_str.rsplit(',', 1)  # Split at last comma
+        integer_part = parts[0].replace('.', '')
+        decimal_part = parts[1] if len(parts) > 1 else '0'
+        betrag_str = f"{integer_part}.{decimal_part}"
+    return float(betrag_str)
+
+def get_month_year_args():
+    """Liest month/year aus den Query-Parametern, Fallback ist der aktuelle Monat"""
     month = request.args.get('month', type=int)
     year = request.args.get('year', type=int)
-    
-    # Wenn Monat und Jahr angegeben sind, filtern
     if month and year:
-        kosten = list(Kosten.select().where(
-            (Kosten.user == user) & 
-            (Kosten.month == month) & 
-            (Kosten.year == year)
-        ).order_by(Kosten.konto, Kosten.position, Kosten.zahlungstag))
-    else:
-        # Fallback: Alle Kosten des aktuellen Monats
-        now = datetime.now()
-        kosten = list(Kosten.select().where(
-            (Kosten.user == user) & 
-            (Kosten.month == now.month) & 
-            (Kosten.year == now.year)
-        ).order_by(Kosten.konto, Kosten.position, Kosten.zahlungstag))
-    
-    return jsonify([model_to_dict(k) for k in kosten])
+        return month, year
+    now = datetime.now()
+    return now.month, now.year
 
-@app.route('/api/kosten', methods=['POST'])
-@login_required
-def add_kosten():
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
-        
-        data = request.get_json()
-        app.logger.debug(f'Received data: {data}')
-        if not all(key in data for key in ['bezeichnung', 'betrag', 'zahlungstag', 'konto']):
-            return jsonify({'success': False, 'error': 'Fehlende Felder'}), 400
+def compute_month_totals(user_id, month, year):
+    """
+    Berechnet offene, bezahlte und Gesamtsummen je Konto und insgesamt
+    in einer einzigen GROUP BY-Abfrage.
 
-        max_position = (Kosten
-                       .select(fn.MAX(Kosten.position))
-                       .where((Kosten.user == user) & (Kosten.konto == data['konto']))
-                       .scalar() or -1)
+    Die Gesamtsummen berücksichtigen nur Konten, die im Monat nicht über
+    exclude_from_total ausgeschlossen sind.
+    """
+    view = kosten_view(user_id, months=[(month, year)])
+    paid = Case(None, [(view.c.bezahlt == True, view.c.betrag)], 0)
 
-        # Stelle sicher, dass betrag ein gültiger Float ist
-        try:
-            betrag_str = str(data['betrag']).strip()
-            if ',' in betrag_str:
-                # Replace only the last comma with a dot and remove all dots (thousand separators)
-                parts = betrag_str.rsplit(',', 1)  # Split at last comma
-                integer_part = parts[0].replace('.', '')
-                decimal_part = parts[1] if len(parts) > 1 else '0'
-                betrag_str = f"{integer_part}.{decimal_part}"
-            betrag = float(betrag_str)
-            app.logger.debug(f'Final betrag value: {betrag}')
+    rows = (join_konto(select_view(view,
+                                   Konto.name.alias('konto'),
+                                   fn.COUNT(view.c.id).alias('count'),
+                                   fn.SUM(view.c.betrag).alias('total'),
+                                   fn.SUM(paid).alias('paid'),
+                                   fn.MAX(KONTO_EXCLUDED).alias('excluded')),
+                       model=view.c)
+            .group_by(Konto.id)
+            .order_by(Konto.name)
+            .dicts())
+
+    konten = []
+    total = 0
+    total_paid = 0
+    for row in rows:
+        konten.append({
+            'konto': row['konto'],
+            'count': row['count'],
+            'total': round(row['total'] or 0, 2),
+            'paid': round(row['paid'] or 0, 2),
+            'open': round((row['total'] or 0) - (row['paid'] or 0), 2),
+            'excluded': bool(row['excluded'])
+        })
+        if not row['excluded']:
+            total += row['total'] or 0
+            total_paid += row['paid'] or 0
+
+    return {
+        'month': month,
+        'year': year,
+        'total': round(total, 2),
+        'paid': round(total_paid, 2),
+        'open': round(total - total_paid, 2),
+        'konten': konten
+    }
+
+# Schlüssel der Kontenliste in kosten_versions
+KONTEN_VERSION_KEY = (0, 0)
+
+def bump_versions(user_id, months, konten=False, summaries=True):
+    """
+    Erhöht die Versionszähler der betroffenen Monate und berechnet deren
+    Monatssummen neu.
+
+    `months` ist eine Liste von (month, year)-Tupeln. Mit konten=True wird
+    zusätzlich die Version der Kontenliste erhöht (neue, umbenannte Konten
+    oder Ausschluss auf Konto-Ebene), die in alle ETags eingeht.
+    summaries=False für Änderungen, die keine Beträge betreffen
+    (Sortierung, Kontoname, Ausschluss).
+    """
+    keys = set(months)
+    if summaries:
+        refresh_month_summaries(user_id, keys)
+    if konten:
+        keys.add(KONTEN_VERSION_KEY)
+    
+    for month, year in keys:
+        (KostenVersion
+         .insert(user=user_id, year=year, month=month, version=1)
+         .on_conflict(
+             conflict_target=[KostenVersion.user, KostenVersion.year, KostenVersion.month],
+             update={KostenVersion.version: KostenVersion.version + 1})
+         .execute())
+
+def refresh_month_summaries(user_id, months):
+    """
+    Berechnet die Zeilen in kosten_month_summaries für die angegebenen
+    (month, year)-Tupel aus den Kosten neu (DELETE + INSERT ... SELECT).
+    Der Aufwand hängt nur von der Größe der betroffenen Monate ab,
+    nicht von der gesamten Historie.
+    """
+    months = [key for key in sorted(months) if key != KONTEN_VERSION_KEY]
+    for batch in chunked(months, BATCH_CHUNK_SIZE):
+        (KostenMonthSummary
+         .delete()
+         .where((KostenMonthSummary.user == user_id) &
+                Tuple(KostenMonthSummary.month, KostenMonthSummary.year).in_(batch))
+         .execute())
+        insert_month_summaries(user_id, batch)
+
+def insert_month_summaries(user_id=None, months=None):
+    """
+    Schreibt die Summen je (user, year, month, konto) aller Einträge aus
+    kosten_view (inkl. Vorlagen), gefiltert nach User und Monaten.
+    Der Ausschluss wird erst beim Lesen über das Konto bestimmt, Umschalten
+    und Umbenennen ändern die Summen also nicht.
+    """
+    view = kosten_view(user_id, months)
+    paid = Case(None, [(view.c.bezahlt == True, view.c.betrag)], 0)
+    query = (select_view(view, view.c.user, view.c.year, view.c.month, view.c.konto,
+                         fn.COUNT(view.c.id), fn.SUM(view.c.betrag), fn.SUM(paid))
+             .group_by(view.c.user, view.c.year, view.c.month, view.c.konto))
+    KostenMonthSummary.insert_from(query, [
+        KostenMonthSummary.user, KostenMonthSummary.year, KostenMonthSummary.month,
+        KostenMonthSummary.konto, KostenMonthSummary.count, KostenMonthSummary.total,
+        KostenMonthSummary.paid]).execute()
+
+def rebuild_month_summaries(user_ids):
+    """Berechnet alle Monatssummen der angegebenen User neu"""
+    KostenMonthSummary.delete().where(KostenMonthSummary.user.in_(user_ids)).execute()
+    insert_month_summaries(list(user_ids))
+
+def get_etag(user_id, month, year, prefix='kosten', extra=()):
+    """
+    Starker ETag aus den Versionszählern, ohne die Kosten selbst zu lesen.
+    Der Zähler der Kontenliste zählt immer mit (Kontonamen und Ausschluss
+    auf Konto-Ebene stehen in allen Monaten), `extra` sind weitere
+    (month, year), von denen die Antwort abhängt. Die Zähler steigen nur,
+    die Summe ändert sich also bei jeder Änderung.
+    """
+    keys = {(month, year), KONTEN_VERSION_KEY, *extra}
+    version = (KostenVersion
+               .select(fn.SUM(KostenVersion.version))
+               .where((KostenVersion.user == user_id) &
+                      Tuple(KostenVersion.month, KostenVersion.year).in_(list(keys)))
+               .scalar() or 0)
+    return f'{prefix}-{user_id}-{year}-{month}-{version}'
+
+def not_modified(etag):
+    """Liefert 304 Not Modified, wenn der Client den aktuellen Stand hat"""
+    if request.if_none_match.contains(etag):
+        return with_etag(app.response_class(status=304), etag)
+    return None
+
+def with_etag(response, etag):
+    # no-cache: Browser speichert die Antwort, fragt aber jedes Mal mit If-None-Match nach
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Felder der Kosten in API-Antworten (ohne die User-Relation, Konto als Name)
+# archived: Eintrag aus kosten_archive, nur lesbar (Schreibzugriffe antworten mit 409)
+KOSTEN_API_COLUMNS = ['id', 'bezeichnung', 'betrag', 'zahlungstag', 'konto', 'bezahlt', 'position',
+                      'cost_type', 'month', 'year', 'exclude_from_total', 'archived']
+KOSTEN_BOOL_INDEXES = [KOSTEN_API_COLUMNS.index(name) for name in ('bezahlt', 'exclude_from_total', 'archived')]
+
+def kosten_api_query(view):
+    """Die Spalten aus KOSTEN_API_COLUMNS über kosten_view, sortiert wie in der Monatsansicht"""
+    return (join_konto(select_view(view, view.c.id, view.c.bezeichnung, view.c.betrag, view.c.zahlungstag,
+                                   Konto.name, view.c.bezahlt, view.c.position, view.c.cost_type,
+                                   view.c.month, view.c.year, KONTO_EXCLUDED, view.c.archived),
+                       model=view.c)
+            .order_by(Konto.name, view.c.position, view.c.zahlungstag))
+
+def get_kosten_dict(user_id, kosten):
+    """Ein gespeicherter Kosten-Eintrag als dict, wie in der Liste von GET /api/kosten"""
+    view = kosten_view(user_id, months=[(kosten.month, kosten.year)])
+    rows = fetch_kosten_rows(kosten_api_query(view).where(view.c.id == kosten.id))
+    return dict(zip(KOSTEN_API_COLUMNS, rows[0])) if rows else None
+
+def fetch_kosten_rows(query):
+    """
+    Führt eine Abfrage über KOSTEN_API_COLUMNS direkt auf dem Cursor aus.
+    peewee ruft sonst für jeden einzelnen Wert python_value() auf, was bei
+    großen Monaten den Großteil der Zeit kostet; umgewandelt werden nur
+    die Bool-Spalten (SQLite liefert 0/1).
+    """
+    rows = []
+    for row in db.execute(query).fetchall():
+        row = list(row)
+        for i in KOSTEN_BOOL_INDEXES:
+            row[i] = bool(row[i])
+        rows.append(row)
+    return rows
+
+@app.route('/api/kosten', methods=['GET'])
+@login_required
+def get_kosten():
+    """
+    Kosten eines Monats. Query-Parameter: month, year und optional
+    format=columns ({"columns": [...], "rows": [[...], ...]}, kleiner bei großen Monaten)
+    """
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
+    
+    response_format = request.args.get('format', 'objects')
+    if response_format not in ('objects', 'columns'):
+        return jsonify({'success': False, 'error': 'Format muss objects oder columns sein'}), 400
+    
+    # Monat und Jahr aus Query-Parametern holen (Fallback: aktueller Monat)
+    month, year = get_month_year_args()
+    
+    etag = get_etag(user_id, month, year, prefix='kosten' if response_format == 'objects' else 'kosten-columns')
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    # Nur die benötigten Spalten, ohne Model-Instanzen und ohne User
+    rows = fetch_kosten_rows(kosten_api_query(kosten_view(user_id, months=[(month, year)])))
+    if response_format == 'columns':
+        data = {'columns': KOSTEN_API_COLUMNS, 'rows': rows}
+    else:
+        data = [dict(zip(KOSTEN_API_COLUMNS, row)) for row in rows]
+    return with_etag(jsonify(data), etag)
+
+@app.route('/api/kosten/summary', methods=['GET'])
+@login_required
+def get_kosten_summary():
+    """
+    Offene, bezahlte und Gesamtsummen je Konto und insgesamt für einen Monat.
+    Query-Parameter: month, year
+    """
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
+    
+    month, year = get_month_year_args()
+    
+    etag = get_etag(user_id, month, year, prefix='summary')
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    return with_etag(jsonify(compute_month_totals(user_id, month, year)), etag)
+
+def current_sync_seq():
+    """Aktueller Stand von sync_sequence in der gebundenen Datenbank"""
+    return SyncSequence.select(SyncSequence.seq).where(SyncSequence.id == 1).scalar()
+
+def collect_kosten_changes(user_id, since, months=None):
+    """
+    Änderungen an kosten_view seit dem Stand `since`: geänderte Einträge
+    (Zeilen im Format von KOSTEN_API_COLUMNS) und IDs, die gelöscht wurden
+    bzw. nicht mehr sichtbar sind. Eine Änderung am Konto liefert alle
+    Einträge des Kontos. Ist `since` älter als die aufgeräumten Tombstones
+    oder neuer als der aktuelle Stand (z.B. nach split-shards), muss der
+    Client komplett neu laden (reset). Läuft in einer Lese-Transaktion,
+    damit Stand und Daten zusammenpassen.
+    """
+    with db.atomic():
+        sequence = SyncSequence.get_by_id(1)
+        if since > sequence.seq or (since and since < sequence.purged_seq):
+            return {'seq': sequence.seq, 'reset': True}
+        
+        view = kosten_view(user_id, months)
+        query = kosten_api_query(view)
+        if since:
+            query = query.where((view.c.updated_seq > since) | (Konto.updated_seq > since))
+        rows = fetch_kosten_rows(query)
+        
+        deleted = set()
+        if since:
+            tombstones = filter_kosten_source(KostenTombstone
+                                              .select(KostenTombstone.kosten_id)
+                                              .where(KostenTombstone.seq > since)
+                                              .distinct(),
+                                              KostenTombstone, user_id, months)
+            deleted = {kosten_id for kosten_id, in tombstones.tuples()} - {row[0] for row in rows}
+            # Archivierte Einträge behalten ihre ID und bleiben sichtbar
+            for batch in chunked(sorted(deleted), BATCH_CHUNK_SIZE):
+                visible = fetch_kosten_rows(kosten_api_query(view).where(view.c.id.in_(batch)))
+                rows.extend(visible)
+                deleted -= {row[0] for row in visible}
+    
+    return {
+        'seq': sequence.seq,
+        'reset': False,
+        'columns': KOSTEN_API_COLUMNS,
+        'rows': rows,
+        'deleted': sorted(deleted),
+    }
+
+@app.route('/api/kosten/changes', methods=['GET'])
+@login_required
+def get_kosten_changes():
+    """
+    Geänderte und gelöschte Einträge seit einem Stand, statt nach jeder
+    Änderung den ganzen Monat neu zu laden. Query-Parameter: since (Stand
+    aus der letzten Antwort bzw. aus /api/bootstrap, 0 = alle Einträge),
+    optional month und year.
+    Antwort: {"seq": ..., "reset": false, "columns": [...], "rows": [...], "deleted": [IDs]}
+    """
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
+    
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        since = -1
+    if since < 0:
+        return jsonify({'success': False, 'error': 'since muss eine Zahl >= 0 sein'}), 400
+    months = [get_month_year_args()] if 'month' in request.args else None
+    
+    try:
+        return jsonify(collect_kosten_changes(user_id, since, months))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def events_connection_limit(configured, threads):
+    """
+    Offene Streams pro Worker-Prozess. Jeder Stream belegt bis zu
+    EVENTS_MAX_SECONDS einen der Gunicorn-Threads, deshalb ohne Angabe ein
+    Viertel und höchstens die Hälfte der Threads (--threads 4: 1 bzw. 2),
+    der Rest bleibt für normale Requests. threads=0 (ohne Gunicorn, z.B.
+    flask run): configured bzw. 2.
+    """
+    if not threads:
+        return 2 if configured is None else configured
+    limit = threads // 2
+    if configured is None:
+        return threads // 4
+    if configured > limit:
+        app.logger.warning(f'EVENTS_MAX_CONNECTIONS={configured} bei {threads} Threads, begrenzt auf {limit}')
+    return min(configured, limit)
+
+# Live-Updates per Server-Sent Events, begrenzt pro Worker-Prozess (0 = Endpoint aus).
+# GUNICORN_THREADS setzt gunicorn.conf.py im Worker auf --threads.
+GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 0))
+EVENTS_MAX_CONNECTIONS = events_connection_limit(
+    int(os.environ['EVENTS_MAX_CONNECTIONS']) if os.environ.get('EVENTS_MAX_CONNECTIONS') else None,
+    GUNICORN_THREADS)
+EVENTS_MAX_PER_USER = int(os.environ.get('EVENTS_MAX_PER_USER', 1))
+EVENTS_MAX_SECONDS = int(os.environ.get('EVENTS_MAX_SECONDS', 300))  # danach verbindet sich der Client neu
+EVENTS_POLL_INTERVAL = 1.0  # Sekunden zwischen zwei Blicken auf sync_sequence
+EVENTS_HEARTBEAT = 15  # Sekunden, hält Proxys offen und erkennt geschlossene Verbindungen
+EVENTS_RETRY_MS = 3000  # Wartezeit des Browsers vor dem Neuverbinden
+
+class EventStreams:
+    """
+    Zählt die offenen /api/events-Streams des Worker-Prozesses, insgesamt
+    und pro User. Sind alle Plätze belegt, bekommt der Client sofort 503
+    und gleicht stattdessen per /api/kosten/changes ab.
+    """
+
+    def __init__(self, max_connections=EVENTS_MAX_CONNECTIONS, max_per_user=EVENTS_MAX_PER_USER):
+        self.max_connections = max_connections
+        self.max_per_user = max_per_user
+        self.lock = threading.Lock()
+        self.users = {}
+
+    def acquire(self, user_id):
+        with self.lock:
+            if (sum(self.users.values()) >= self.max_connections or
+                    self.users.get(user_id, 0) >= self.max_per_user):
+                return False
+            self.users[user_id] = self.users.get(user_id, 0) + 1
+            return True
+
+    def release(self, user_id):
+        with self.lock:
+            self.users[user_id] -= 1
+            if not self.users[user_id]:
+                del self.users[user_id]
+
+event_streams = EventStreams()
+
+def format_event(data, event='changes', event_id=None):
+    """Eine SSE-Nachricht; mit event_id setzt der Browser beim Neuverbinden Last-Event-ID"""
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {app.json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+def release_connections():
+    """Gibt die Verbindungen des aktuellen Threads zurück, die Bindung an die Shard-Datei bleibt"""
+    database = current_database()
+    if not database.is_closed():
+        database.close()
+    if not auth_db.is_closed():
+        auth_db.close()
+
+def generate_events(user_id, month, year, since):
+    """
+    Fan-out über die Datenbank statt über einen Broker: alle Worker schreiben
+    ihre Änderungen ohnehin in sync_sequence/updated_seq/kosten_tombstones
+    (siehe SYNC_TRIGGERS). Der Stream schaut jede EVENTS_POLL_INTERVAL
+    Sekunden nach dem Zähler und schickt nur bei Änderungen des Users im
+    Monat ein Event mit den Zeilen aus collect_kosten_changes und den neuen
+    Summen. Nach EVENTS_MAX_SECONDS endet der Stream, der Browser verbindet
+    sich mit Last-Event-ID neu (evtl. bei einem anderen Worker).
+    """
+    deadline = time.monotonic() + EVENTS_MAX_SECONDS
+    last_sent = time.monotonic()
+    yield f'retry: {EVENTS_RETRY_MS}\n\n'
+    
+    while time.monotonic() < deadline:
+        if current_sync_seq() != since:
+            changes = collect_kosten_changes(user_id, since, [(month, year)])
+            if changes['reset']:
+                # Der Client lädt den Monat neu und verbindet sich mit dem neuen Stand
+                yield format_event(changes)
+                return
+            since = changes['seq']
+            if changes['rows'] or changes['deleted']:
+                changes.update(month=month, year=year, totals=compute_month_totals(user_id, month, year))
+                yield format_event(changes, event_id=since)
+                last_sent = time.monotonic()
+        # Verbindung bis zum nächsten Blick an den Pool zurückgeben (die nächste
+        # Query verbindet neu), sonst hielte jeder Stream eine davon dauerhaft
+        release_connections()
+        if time.monotonic() - last_sent >= EVENTS_HEARTBEAT:
+            # Ohne data kein Event im Browser, aber der Stand für Last-Event-ID wird übernommen
+            yield f': ping\nid: {since}\n\n'
+            last_sent = time.monotonic()
+        time.sleep(EVENTS_POLL_INTERVAL)
+
+@app.route('/api/events', methods=['GET'])
+@login_required
+def get_events():
+    """
+    Server-Sent Events mit den Änderungen eines Monats, z.B. von anderen
+    Geräten desselben Logins. Query-Parameter: month, year und since (Stand
+    aus /api/bootstrap bzw. /api/kosten/changes); beim Neuverbinden hat der
+    Header Last-Event-ID Vorrang. Event "changes": wie /api/kosten/changes
+    (rows = neue bzw. geänderte Einträge, deleted = gelöschte IDs) plus
+    month, year und totals wie /api/kosten/summary.
+    """
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
+    
+    try:
+        since = int(request.headers.get('Last-Event-ID') or request.args.get('since', 0))
+    except ValueError:
+        since = -1
+    if since < 0:
+        return jsonify({'success': False, 'error': 'since muss eine Zahl >= 0 sein'}), 400
+    month, year = get_month_year_args()
+    
+    if not event_streams.acquire(user_id):
+        response = jsonify({'success': False, 'error': 'Zu viele offene Verbindungen'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    try:
+        # Ohne Stand: erst Änderungen ab jetzt
+        since = since or current_sync_seq()
+        response = app.response_class(stream_with_context(generate_events(user_id, month, year, since)),
+                                      mimetype='text/event-stream')
+    except Exception as e:
+        event_streams.release(user_id)
+        return jsonify({'success': False, 'error': str(e)}), 500
+    # Wird auch bei abgebrochener Verbindung aufgerufen, sonst bliebe der Platz belegt
+    response.call_on_close(lambda: event_streams.release(user_id))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: sofort an den Client weiterreichen
+    return response
+
+@app.route('/api/kosten', methods=['POST'])
+@login_required
+def add_kosten():
+    try:
+        user = get_current_user()
+        if not user:
+            return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
+        
+        data = request.get_json()
+        app.logger.debug(f'Received data: {data}')
+        if not all(key in data for key in ['bezeichnung', 'betrag', 'zahlungstag', 'konto']):
+            return jsonify({'success': False, 'error': 'Fehlende Felder'}), 400
+
+        month = data.get('month', datetime.now().month)
+        year = data.get('year', datetime.now().year)
+
+        # Stelle sicher, dass betrag ein gültiger Float ist
+        try:
+            betrag = parse_betrag(data['betrag'])
+            app.logger.debug(f'Final betrag value: {betrag}')
         except ValueError as e:
             app.logger.debug(f'ValueError during conversion: {str(e)}')
             return jsonify({'success': False, 'error': 'Ungültiges Zahlenformat für Betrag'}), 400
 
-        kosten = Kosten.create(
-            user=user,
-            bezeichnung=data['bezeichnung'],
-            betrag=betrag,
-            zahlungstag=int(data['zahlungstag']),
-            konto=data['konto'],
-            position=max_position + 1,
-            cost_type=data.get('cost_type', 'recurring'),
-            month=data.get('month', datetime.now().month),
-            year=data.get('year', datetime.now().year)
-        )
+        # IMMEDIATE: Konto und Position werden gelesen, bevor geschrieben wird
+        with db.atomic('IMMEDIATE'):
+            if archived_month_keys(user.id, [(month, year)]):
+                return jsonify({'success': False, 'error': ARCHIVED_ERROR}), 409
+            konto_ids, konto_created = get_konto_ids(user.id, [data['konto']])
+            konto_id = konto_ids[data['konto']]
+            kosten = Kosten.create(
+                user=user,
+                bezeichnung=data['bezeichnung'],
+                betrag=betrag,
+                zahlungstag=int(data['zahlungstag']),
+                konto=konto_id,
+                position=get_next_position(user.id, konto_id, month, year),
+                cost_type=data.get('cost_type', 'recurring'),
+                month=month,
+                year=year
+            )
+            bump_versions(user.id, [(kosten.month, kosten.year)], konten=konto_created)
         
         return jsonify({
             'success': True,
-            'data': model_to_dict(kosten)
+            'data': get_kosten_dict(user.id, kosten)
         })
     except ValueError as e:
         return jsonify({'success': False, 'error': f'Ungültige Werte: {str(e)}'}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/kosten/<int:id>', methods=['PUT'])
+@app.route('/api/kosten/<int(signed=True):id>', methods=['PUT'])
 @login_required
 def update_kosten(id):
+    """
+    Ändert einen Eintrag. Einträge aus Vorlagen (negative ID) bekommen
+    dabei eine eigene Zeile für ihren Monat, die Vorlage bleibt unverändert.
+    """
     try:
         user = get_current_user()
         if not user:
             return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
         
         data = request.get_json()
-        kosten = Kosten.get_or_none((Kosten.id == id) & (Kosten.user == user))
         
-        if not kosten:
-            return jsonify({'success': False, 'error': 'Eintrag nicht gefunden'}), 404
+        # IMMEDIATE: der Eintrag wird ggf. erst aus der Vorlage angelegt
+        with db.atomic('IMMEDIATE'):
+            kosten = load_kosten(user.id, [id]).get(id)
+            if not kosten:
+                return kosten_not_found(user.id, id)
 
-        if 'bezahlt' in data and len(data) == 1:
-            kosten.bezahlt = data['bezahlt']
-        elif 'cost_type' in data and len(data) == 1:
-            kosten.cost_type = data['cost_type']
-        else:
-            kosten.bezeichnung = data['bezeichnung']
-            # Convert German number format to Python float
-            betrag_str = str(data['betrag'])
-            if ',' in betrag_str:
-                # Replace only the last comma with a dot and remove all dots (thousand separators)
-                parts = betrag_str.rsplit(',', 1)  # Split at last comma
-                integer_part = parts[0].replace('.', '')
-                decimal_part = parts[1] if len(parts) > 1 else '0'
-                betrag_str = f"{integer_part}.{decimal_part}"
-            kosten.betrag = float(betrag_str)
-            kosten.zahlungstag = int(data['zahlungstag'])
-            kosten.konto = data['konto']
-            if 'cost_type' in data:
+            konto_name = None
+            if 'bezahlt' in data and len(data) == 1:
+                kosten.bezahlt = data['bezahlt']
+            elif 'cost_type' in data and len(data) == 1:
                 kosten.cost_type = data['cost_type']
-        
-        kosten.save()
-        return jsonify({
+            else:
+                kosten.bezeichnung = data['bezeichnung']
+                # Convert German number format to Python float
+                kosten.betrag = parse_betrag(data['betrag'])
+                kosten.zahlungstag = int(data['zahlungstag'])
+                konto_name = data['konto']
+                if 'cost_type' in data:
+                    kosten.cost_type = data['cost_type']
+            
+            konto_created = False
+            if konto_name is not None:
+                konto_ids, konto_created = get_konto_ids(user.id, [konto_name])
+                kosten.konto = konto_ids[konto_name]
+            kosten.save()
+            bump_versions(user.id, [(kosten.month, kosten.year)], konten=konto_created)
+        response = {
             'success': True,
-            'data': model_to_dict(kosten)
-        })
+            'data': get_kosten_dict(user.id, kosten)
+        }
+        # Optional: aktualisierte Monatssummen direkt mitliefern (?totals=1)
+        if request.args.get('totals', type=int):
+            response['totals'] = compute_month_totals(user.id, kosten.month, kosten.year)
+        return jsonify(response)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/kosten/<int:id>', methods=['DELETE'])
+@app.route('/api/kosten/<int(signed=True):id>', methods=['DELETE'])
 @login_required
 def delete_kosten(id):
     try:
@@ -398,110 +2010,921 @@ def delete_kosten(id):
         if not user:
             return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
         
-        kosten = Kosten.get_or_none((Kosten.id == id) & (Kosten.user == user))
-        if not kosten:
-            return jsonify({'success': False, 'error': 'Eintrag nicht gefunden'}), 404
+        with db.atomic('IMMEDIATE'):
+            kosten = load_kosten(user.id, [id]).get(id)
+            if not kosten:
+                return kosten_not_found(user.id, id)
             
-        kosten.delete_instance()
+            delete_kosten_entries([kosten])
+            bump_versions(user.id, [(kosten.month, kosten.year)])
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+BATCH_MAX_OPERATIONS = 500
+BATCH_CHUNK_SIZE = 80
+KOSTEN_REQUIRED_FIELDS = ('bezeichnung', 'betrag', 'zahlungstag', 'konto')
+KOSTEN_EDITABLE_FIELDS = ('bezeichnung', 'betrag', 'zahlungstag', 'konto', 'bezahlt', 'cost_type')
+
+# month_key und die virtuellen IDs (YYYYMM) setzen vierstellige Jahre voraus
+MIN_YEAR = 1900
+MAX_YEAR = 9999
+
+def parse_month_year(month, year):
+    """Monat und Jahr als int, ValueError mit deutscher Fehlermeldung bei ungültigen Werten"""
+    try:
+        month = int(month)
+    except (TypeError, ValueError):
+        raise ValueError('Ungültiger Monat')
+    if not 1 <= month <= 12:
+        raise ValueError('Ungültiger Monat')
+    try:
+        year = int(year)
+    except (TypeError, ValueError):
+        raise ValueError('Ungültiges Jahr')
+    if not MIN_YEAR <= year <= MAX_YEAR:
+        raise ValueError('Ungültiges Jahr')
+    return month, year
+
+def is_kosten_id(value):
+    """IDs in JSON-Bodys: nur ganze Zahlen (keine Listen, Strings oder true/false)"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def validate_kosten_fields(data, required=()):
+    """
+    Prüft und konvertiert die Felder einer Kosten-Operation.
+    Wirft ValueError mit deutscher Fehlermeldung bei ungültigen Werten.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Ungültige Daten')
+    if not all(key in data for key in required):
+        raise ValueError('Fehlende Felder')
+    
+    fields = {}
+    for key in KOSTEN_EDITABLE_FIELDS:
+        if key not in data:
+            continue
+        value = data[key]
+        if key == 'betrag':
+            try:
+                value = parse_betrag(value)
+            except ValueError:
+                raise ValueError('Ungültiges Zahlenformat für Betrag')
+        elif key == 'zahlungstag':
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError('Ungültiger Zahlungstag')
+        elif key == 'bezahlt':
+            value = bool(value)
+        elif key == 'cost_type' and value not in ('recurring', 'one-time'):
+            raise ValueError('Ungültiger Kostentyp')
+        fields[key] = value
+    return fields
+
+@app.route('/api/kosten/batch', methods=['POST'])
+@login_required
+def batch_kosten():
+    """
+    Führt mehrere Operationen in einer Transaktion aus.
+    Erwartet: {"operations": [
+        {"op": "create", "data": {"bezeichnung": ..., "betrag": "12,50", ...}},
+        {"op": "update", "id": 1, "data": {"betrag": "10,00"}},
+        {"op": "toggle", "id": 2, "bezahlt": true},   # ohne bezahlt: umschalten
+        {"op": "delete", "id": 3}
+    ]}
+    Ist eine Operation ungültig, wird nichts ausgeführt (400, bei Einträgen
+    archivierter Monate 409). Mit ?totals=1
+    und month/year werden die neuen Monatssummen mitgeliefert.
+    """
+    try:
+        user = get_current_user()
+        if not user:
+            return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
+        
+        data = request.get_json()
+        operations = data.get('operations') if isinstance(data, dict) else data
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'success': False, 'error': 'Keine Operationen angegeben'}), 400
+        if len(operations) > BATCH_MAX_OPERATIONS:
+            return jsonify({'success': False, 'error': f'Maximal {BATCH_MAX_OPERATIONS} Operationen pro Batch'}), 400
+        
+        # Alle referenzierten Einträge mit einer Abfrage laden (Vorlagen-Einträge noch ungespeichert)
+        ids = [op.get('id') for op in operations
+               if isinstance(op, dict) and op.get('op') != 'create' and is_kosten_id(op.get('id'))]
+        existing = load_kosten(user.id, ids)
+        archived = archived_kosten_ids(user.id, set(ids) - set(existing))
+        
+        # 1. Validieren, noch nichts schreiben
+        results = []
+        creates = []   # (result, fields)
+        changed = {}   # id -> (kosten, Menge geänderter Felder, result)
+        deletes = []   # Kosten-Objekte
+        konto_updates = {}  # id -> neuer Kontoname (Konto-ID erst beim Schreiben)
+        seen_ids = set()
+        for index, op in enumerate(operations):
+            result = {'index': index, 'op': op.get('op') if isinstance(op, dict) else None}
+            results.append(result)
+            try:
+                if not isinstance(op, dict):
+                    raise ValueError('Ungültige Operation')
+                kind = op.get('op')
+                if kind == 'create':
+                    fields = validate_kosten_fields(op.get('data'), required=KOSTEN_REQUIRED_FIELDS)
+                    fields['month'], fields['year'] = parse_month_year(op['data'].get('month', datetime.now().month),
+                                                                       op['data'].get('year', datetime.now().year))
+                    if archived_month_keys(user.id, [(fields['month'], fields['year'])]):
+                        raise ValueError(ARCHIVED_ERROR)
+                    creates.append((result, fields))
+                elif kind in ('update', 'toggle', 'delete'):
+                    if not is_kosten_id(op.get('id')):
+                        raise ValueError('Ungültige ID')
+                    kosten = existing.get(op.get('id'))
+                    if not kosten:
+                        raise ValueError(ARCHIVED_ERROR if op.get('id') in archived else 'Eintrag nicht gefunden')
+                    key = kosten.id if kosten.id is not None else op['id']
+                    if key in seen_ids:
+                        raise ValueError('Eintrag mehrfach im Batch')
+                    seen_ids.add(key)
+                    result['id'] = op['id']
+                    
+                    if kind == 'delete':
+                        deletes.append(kosten)
+                    else:
+                        if kind == 'toggle':
+                            fields = {'bezahlt': bool(op['bezahlt']) if 'bezahlt' in op else not kosten.bezahlt}
+                        else:
+                            fields = validate_kosten_fields(op.get('data'))
+                            if not fields:
+                                raise ValueError('Fehlende Felder')
+                        for field, value in fields.items():
+                            if field == 'konto':
+                                konto_updates[key] = value
+                            else:
+                                setattr(kosten, field, value)
+                        changed[key] = (kosten, frozenset(fields), result)
+                else:
+                    raise ValueError('Unbekannte Operation')
+                result['success'] = True
+            except (KeyError, TypeError, ValueError) as e:
+                result['success'] = False
+                result['error'] = str(e) if isinstance(e, ValueError) else 'Ungültige Werte'
+        
+        if not all(r['success'] for r in results):
+            status = 409 if any(r.get('error') == ARCHIVED_ERROR for r in results) else 400
+            return jsonify({'success': False, 'error': 'Ungültige Operationen', 'results': results}), status
+        
+        # 2. Alles in einer Transaktion schreiben (IMMEDIATE, da auch gelesen wird)
+        months = set()
+        with db.atomic('IMMEDIATE'):
+            # Kontonamen aller Creates und Updates in IDs umwandeln, neue Konten anlegen
+            konto_names = [fields['konto'] for _, fields in creates] + list(konto_updates.values())
+            konto_ids, konten_changed = get_konto_ids(user.id, konto_names) if konto_names else ({}, False)
+            for key, konto_name in konto_updates.items():
+                changed[key][0].konto = konto_ids[konto_name]
+            for _, fields in creates:
+                fields['konto'] = konto_ids[fields['konto']]
+            
+            # Updates/Toggles: ein UPDATE ... SET feld = CASE id ... END je Feldkombination,
+            # geänderte Vorlagen-Einträge werden als eigene Zeile für ihren Monat angelegt
+            groups = {}
+            new_entries = []
+            for kosten, field_names, _ in changed.values():
+                if kosten.id is None:
+                    new_entries.append(kosten)
+                else:
+                    groups.setdefault(field_names, []).append(kosten)
+                months.add((kosten.month, kosten.year))
+            for field_names, instances in groups.items():
+                Kosten.bulk_update(instances, fields=sorted(field_names), batch_size=BATCH_CHUNK_SIZE)
+            save_new_kosten(new_entries)
+            for kosten, _, result in changed.values():
+                result['id'] = kosten.id
+            
+            delete_kosten_entries(deletes)
+            months.update((k.month, k.year) for k in deletes)
+            
+            if creates:
+                # Positionen je Konto und Monat hinter dem bisherigen Maximum vergeben
+                next_positions = {}
+                rows = []
+                for _, fields in creates:
+                    key = (fields['konto'], fields['month'], fields['year'])
+                    if key not in next_positions:
+                        next_positions[key] = get_next_position(user.id, *key)
+                    rows.append(dict(fields, user=user.id, position=next_positions[key]))
+                    next_positions[key] += POSITION_STEP
+                    months.add((fields['month'], fields['year']))
+                
+                new_ids = []
+                for batch in chunked(rows, BATCH_CHUNK_SIZE):
+                    new_ids.extend(row[0] for row in Kosten.insert_many(batch).returning(Kosten.id).tuples().execute())
+                for (result, _), new_id in zip(creates, new_ids):
+                    result['id'] = new_id
+            
+            bump_versions(user.id, months, konten=konten_changed)
+        
+        response = {'success': True, 'results': results}
+        if request.args.get('totals', type=int):
+            month, year = get_month_year_args()
+            response['totals'] = compute_month_totals(user.id, month, year)
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def renumber_positions(user_id, ordered_ids):
+    """
+    Vergibt für die Einträge in der angegebenen Reihenfolge neue Positionen mit
+    POSITION_STEP Abstand, in einem UPDATE ... SET position = CASE id ... END.
+    Einträge aus Vorlagen bekommen dafür eine eigene Zeile.
+    """
+    virtual = load_kosten(user_id, [kosten_id for kosten_id in ordered_ids if kosten_id < 0])
+    save_new_kosten(virtual.values())
+    ordered_ids = [virtual[kosten_id].id if kosten_id < 0 else kosten_id for kosten_id in ordered_ids]
+    
+    positions = [(kosten_id, (index + 1) * POSITION_STEP) for index, kosten_id in enumerate(ordered_ids)]
+    for batch in chunked(positions, BATCH_CHUNK_SIZE):
+        (Kosten
+         .update(position=Case(Kosten.id, batch))
+         .where(Kosten.id.in_([kosten_id for kosten_id, _ in batch]))
+         .execute())
+
+def move_kosten(kosten, after_id=None, before_id=None, index=None):
+    """
+    Verschiebt einen Eintrag innerhalb seines Kontos im Monat.
+
+    Die neue Position liegt zwischen den Positionen der Nachbarn, dadurch
+    wird im Normalfall genau eine Zeile geschrieben. Nur wenn zwischen den
+    Nachbarn keine Lücke mehr frei ist, wird das Konto neu durchnummeriert.
+    Gibt True zurück, wenn neu durchnummeriert wurde.
+    """
+    own_id = kosten.id if kosten.id is not None else virtual_kosten_id(kosten.template_id, kosten.month, kosten.year)
+    view = kosten_view(kosten.user_id, months=[(kosten.month, kosten.year)])
+    siblings = list(select_view(view, view.c.id, view.c.position, view.c.template)
+                    .where((view.c.konto == kosten.konto_id) & (view.c.id != own_id))
+                    .order_by(view.c.position, view.c.zahlungstag, view.c.id)
+                    .tuples())
+    sibling_ids = [sibling_id for sibling_id, _, _ in siblings]
+    # Der Client kennt eigene Zeilen von Vorlagen evtl. noch unter der virtuellen ID
+    aliases = {virtual_kosten_id(template_id, kosten.month, kosten.year): sibling_id
+               for sibling_id, _, template_id in siblings if template_id is not None and sibling_id > 0}
+    
+    if after_id is not None:
+        target = sibling_ids.index(aliases.get(after_id, after_id)) + 1
+    elif before_id is not None:
+        target = sibling_ids.index(aliases.get(before_id, before_id))
+    else:
+        target = max(0, min(int(index or 0), len(siblings)))
+    
+    prev_position = siblings[target - 1][1] if target > 0 else None
+    next_position = siblings[target][1] if target < len(siblings) else None
+    
+    if prev_position is None and next_position is None:
+        new_position = POSITION_STEP
+    elif prev_position is None:
+        new_position = next_position - POSITION_STEP
+    elif next_position is None:
+        new_position = prev_position + POSITION_STEP
+    elif next_position - prev_position > 1:
+        new_position = (prev_position + next_position) // 2
+    else:
+        # Keine Lücke mehr frei: ganzes Konto im Monat neu durchnummerieren
+        save_new_kosten([kosten])
+        sibling_ids.insert(target, kosten.id)
+        renumber_positions(kosten.user_id, sibling_ids)
+        return True
+    
+    if kosten.id is None:
+        kosten.position = new_position
+        save_new_kosten([kosten])
+    else:
+        Kosten.update(position=new_position).where(Kosten.id == kosten.id).execute()
+    return False
+
 @app.route('/api/kosten/reorder', methods=['POST'])
 @login_required
 def reorder_kosten():
+    """
+    Einzelne Verschiebung: {"id": 5, "after_id": 3} oder {"id": 5, "before_id": 7}
+    oder {"id": 5, "index": 0} (Index innerhalb des Kontos im Monat).
+    Komplette Liste (weiterhin unterstützt): [{"id": 5, "position": 1}, ...]
+    """
     try:
         user = get_current_user()
         if not user:
             return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
         
         data = request.get_json()
-        with db.atomic():
-            for item in data:
-                Kosten.update(position=item['position']).where((Kosten.id == item['id']) & (Kosten.user == user)).execute()
+        
+        if isinstance(data, dict):
+            if not is_kosten_id(data.get('id')):
+                return jsonify({'success': False, 'error': 'Ungültige ID'}), 400
+            if not all(data.get(key) is None or is_kosten_id(data[key]) for key in ('after_id', 'before_id', 'index')):
+                return jsonify({'success': False, 'error': 'after_id, before_id und index müssen Zahlen sein'}), 400
+            try:
+                # IMMEDIATE: erst lesen, dann schreiben - im WAL-Modus sonst SQLITE_BUSY
+                with db.atomic('IMMEDIATE'):
+                    kosten = load_kosten(user.id, [data.get('id')]).get(data.get('id'))
+                    if not kosten:
+                        return kosten_not_found(user.id, data.get('id'))
+                    renumbered = move_kosten(kosten, data.get('after_id'), data.get('before_id'), data.get('index'))
+                    bump_versions(user.id, [(kosten.month, kosten.year)], summaries=False)
+            except ValueError:
+                return jsonify({'success': False, 'error': 'Nachbar-Eintrag nicht gefunden'}), 400
+            return jsonify({'success': True, 'renumbered': renumbered})
+        
+        # Komplette Liste: ein UPDATE mit CASE statt einem UPDATE pro Zeile
+        try:
+            positions = dict((int(item['id']), int(item['position'])) for item in data)
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Ungültige Werte'}), 400
+        with db.atomic('IMMEDIATE'):
+            entries = load_kosten(user.id, list(positions))
+            if archived_kosten_ids(user.id, set(positions) - set(entries)):
+                return jsonify({'success': False, 'error': ARCHIVED_ERROR}), 409
+            for kosten_id, kosten in entries.items():
+                kosten.position = positions[kosten_id]
+            stored = [(kosten.id, kosten.position) for kosten in entries.values() if kosten.id is not None]
+            save_new_kosten(entries.values())
+            for batch in chunked(stored, BATCH_CHUNK_SIZE):
+                (Kosten
+                 .update(position=Case(Kosten.id, batch))
+                 .where(Kosten.id.in_([kosten_id for kosten_id, _ in batch]))
+                 .execute())
+            bump_versions(user.id, {(k.month, k.year) for k in entries.values()}, summaries=False)
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Zeilen pro INSERT beim Monatswechsel (SQLite erlaubt je nach Version nur 999 Parameter)
+ROLLOVER_CHUNK_SIZE = 80
+
+def get_previous_month(month, year):
+    """Liefert (Monat, Jahr) des Vormonats"""
+    if month == 1:
+        return 12, year - 1
+    return month - 1, year
+
+def get_next_month(month, year):
+    """Liefert (Monat, Jahr) des Folgemonats"""
+    if month == 12:
+        return 1, year + 1
+    return month + 1, year
+
+def copy_konto_months(where, source, target):
+    """
+    Kopiert die Monats-Einstellungen (KontoMonth) der Konten aus `where` vom
+    Monat source in den Monat target, jeweils (Monat, Jahr). Bestehende
+    Einstellungen im Zielmonat werden überschrieben.
+    """
+    (source_month, source_year), (target_month, target_year) = source, target
+    query = (KontoMonth
+             .select(KontoMonth.konto, Value(target_year), Value(target_month), KontoMonth.exclude_from_total)
+             .where(where & (KontoMonth.year == source_year) & (KontoMonth.month == source_month)))
+    (KontoMonth
+     .insert_from(query, [KontoMonth.konto, KontoMonth.year, KontoMonth.month, KontoMonth.exclude_from_total])
+     .on_conflict_replace()
+     .execute())
+
+# Felder, in denen eine eigene Zeile von ihrer Vorlage abweichen kann
+TEMPLATE_FIELDS = ('bezeichnung', 'betrag', 'zahlungstag', 'konto', 'position')
+
 def create_new_month(user, target_month, target_year):
     """
     Erstellt einen neuen Monat mit Kosten aus dem Vormonat.
     
     Logik:
-    - Wiederkehrende Kosten: werden kopiert, bezahlt=False
-    - Einmalige Kosten: werden kopiert, bezahlt-Status bleibt erhalten
+    - Wiederkehrende Kosten: gelten über ihre Vorlage weiter, bezahlt=False
+    - Einmalige Kosten: nur unbezahlte werden in den neuen Monat verschoben
+
+    Kopiert wird nichts: der Monat wird nur angelegt (KostenMonth), die
+    Vorlagen gelten dort automatisch. Geschrieben wird nur, was im Vormonat
+    von seiner Vorlage abweicht (neue Vorlage ab dem Zielmonat) oder noch
+    keine Vorlage hat, z.B. im Vormonat neu eingetragene Kosten.
+    `user` kann ein User-Objekt oder eine User-ID sein.
     """
-    # Vormonat berechnen
-    if target_month == 1:
-        prev_month = 12
-        prev_year = target_year - 1
-    else:
-        prev_month = target_month - 1
-        prev_year = target_year
-    
-    # Prüfe ob der Zielmonat bereits existiert
-    existing = Kosten.select().where(
-        (Kosten.user == user) & 
-        (Kosten.month == target_month) & 
-        (Kosten.year == target_year)
-    ).count()
-    
-    if existing > 0:
-        return {'success': False, 'error': f'Monat {target_month}/{target_year} existiert bereits'}
-    
-    # Hole alle Kosten aus dem Vormonat
-    prev_kosten = list(Kosten.select().where(
-        (Kosten.user == user) & 
-        (Kosten.month == prev_month) & 
-        (Kosten.year == prev_year)
-    ))
-    
-    if not prev_kosten:
-        return {'success': False, 'error': f'Keine Kosten im Vormonat {prev_month}/{prev_year} gefunden'}
-    
-    # Kopiere Kosten in den neuen Monat
-    created_count = 0
-    one_time_ids_to_delete = []  # IDs der unbezahlten einmaligen Kosten zum Löschen
-    
-    for kosten in prev_kosten:
-        # Bestimme bezahlt-Status und ob Kosten übernommen werden sollen
-        if kosten.cost_type == 'recurring':
-            # Wiederkehrende Kosten: immer übernehmen, unbezahlt
-            bezahlt = False
-        else:  # one-time
-            # Einmalige Kosten: nur übernehmen wenn unbezahlt
-            if kosten.bezahlt:
-                continue  # Überspringe bezahlte einmalige Kosten
-            bezahlt = False  # Unbezahlte einmalige Kosten bleiben unbezahlt
-            one_time_ids_to_delete.append(kosten.id)  # Merke ID zum Löschen
-        
-        # Erstelle neue Kosten für den Zielmonat
-        Kosten.create(
-            user=user,
-            bezeichnung=kosten.bezeichnung,
-            betrag=kosten.betrag,
-            zahlungstag=kosten.zahlungstag,
-            konto=kosten.konto,
-            bezahlt=bezahlt,
-            position=kosten.position,
-            cost_type=kosten.cost_type,
-            month=target_month,
-            year=target_year,
-            exclude_from_total=kosten.exclude_from_total  # Ausschluss-Status übernehmen
-        )
-        created_count += 1
+    prev_month, prev_year = get_previous_month(target_month, target_year)
+    user_id = user.id if isinstance(user, User) else user
+    target_key = month_key(target_month, target_year)
     
-    # Lösche unbezahlte einmalige Kosten aus dem alten Monat
-    if one_time_ids_to_delete:
-        Kosten.delete().where(Kosten.id.in_(one_time_ids_to_delete)).execute()
+    with db.atomic('IMMEDIATE'):
+        # Prüfe ob der Zielmonat bereits existiert (angelegt oder schon Kosten eingetragen)
+        existing = (KostenMonth.select().where(
+            (KostenMonth.user == user_id) &
+            (KostenMonth.month == target_month) &
+            (KostenMonth.year == target_year)
+        ).exists() or Kosten.select().where(
+            (Kosten.user == user_id) & 
+            (Kosten.month == target_month) & 
+            (Kosten.year == target_year)
+        ).exists() or KostenArchive.select().where(
+            (KostenArchive.user == user_id) &
+            (KostenArchive.month == target_month) &
+            (KostenArchive.year == target_year)
+        ).exists())
+        
+        if existing:
+            return {'success': False, 'error': f'Monat {target_month}/{target_year} existiert bereits'}
+        
+        # Hole alle Einträge aus dem Vormonat, inkl. Vorlagen
+        view = kosten_view(user_id, months=[(prev_month, prev_year)])
+        prev_kosten = list(select_view(view, view.c.id, view.c.bezeichnung, view.c.betrag, view.c.zahlungstag,
+                                       view.c.konto, view.c.bezahlt, view.c.position, view.c.cost_type,
+                                       view.c.template)
+                           .dicts())
+        
+        if not prev_kosten:
+            return {'success': False, 'error': f'Keine Kosten im Vormonat {prev_month}/{prev_year} gefunden'}
+        
+        template_ids = {kosten['template'] for kosten in prev_kosten if kosten['template']}
+        templates = {}
+        for batch in chunked(sorted(template_ids), BATCH_CHUNK_SIZE):
+            templates.update({t.id: t for t in RecurringTemplate.select().where(RecurringTemplate.id.in_(batch))})
+        # Gibt es schon spätere Monate, gelten neue Vorlagen nur für den Zielmonat
+        later_exists = KostenMonth.select().where(
+            (KostenMonth.user == user_id) &
+            (month_key(KostenMonth.month, KostenMonth.year) > target_key)
+        ).exists()
+        
+        count = 0
+        new_templates = []
+        moved = []  # (id, Vorlage) der unbezahlten einmaligen Kosten
+        for kosten in prev_kosten:
+            template = templates.get(kosten['template'])
+            continues = template is not None and template.covers(target_month, target_year)
+            
+            if kosten['cost_type'] != 'recurring':
+                # Einmalige Kosten: nur übernehmen wenn unbezahlt
+                if not kosten['bezahlt']:
+                    moved.append((kosten['id'], template))
+                    count += 1
+                elif continues:
+                    remove_template_month(template.id, target_month, target_year)
+                continue
+            
+            count += 1
+            if continues and all(kosten[field] == template.__data__[field] for field in TEMPLATE_FIELDS):
+                continue  # Vorlage gilt im Zielmonat unverändert weiter
+            if continues:
+                remove_template_month(template.id, target_month, target_year)
+            new_templates.append(dict({field: kosten[field] for field in TEMPLATE_FIELDS}, user=user_id,
+                                      valid_from=target_key, valid_to=target_key if later_exists else None))
+        
+        for batch in chunked(new_templates, ROLLOVER_CHUNK_SIZE):
+            RecurringTemplate.insert_many(batch).execute()
+        
+        # Unbezahlte einmalige Kosten in den Zielmonat verschieben; war es der
+        # Eintrag einer Vorlage, gilt die Vorlage im Vormonat nicht mehr
+        for batch in chunked([kosten_id for kosten_id, _ in moved], ROLLOVER_CHUNK_SIZE):
+            (Kosten
+             .update(month=target_month, year=target_year, template=None)
+             .where(Kosten.id.in_(batch))
+             .execute())
+        for _, template in moved:
+            if template is not None:
+                remove_template_month(template.id, prev_month, prev_year)
+        
+        KostenMonth.insert(user=user_id, month=target_month, year=target_year).execute()
+        
+        # Abweichenden Ausschluss-Status der Konten in den neuen Monat übernehmen
+        copy_konto_months(KontoMonth.konto.in_(Konto.select(Konto.id).where(Konto.user == user_id)),
+                          (prev_month, prev_year), (target_month, target_year))
+        
+        bump_versions(user_id, [(target_month, target_year), (prev_month, prev_year)])
     
     return {
         'success': True, 
-        'message': f'{created_count} Kosten für {target_month}/{target_year} erstellt',
-        'count': created_count,
-        'deleted_one_time': len(one_time_ids_to_delete)
+        'message': f'{count} Kosten für {target_month}/{target_year} erstellt',
+        'count': count,
+        'deleted_one_time': len(moved)
     }
 
+@app.cli.command('rollover')
+@click.option('--month', type=click.IntRange(1, 12), help='Zielmonat (Standard: nächster Monat)')
+@click.option('--year', type=int, help='Zieljahr (Standard: Jahr des nächsten Monats)')
+@click.option('--batch-size', default=50, show_default=True, help='Anzahl User pro Durchlauf')
+def rollover_command(month, year, batch_size):
+    """Legt den Zielmonat für alle User mit Kosten im Vormonat an."""
+    if not month or not year:
+        now = datetime.now()
+        next_month, next_year = get_next_month(now.month, now.year)
+        month = month or next_month
+        year = year or next_year
+    
+    prev_month, prev_year = get_previous_month(month, year)
+    
+    db.connect(reuse_if_open=True)
+    try:
+        started = time.perf_counter()
+        created_total = 0
+        skipped = 0
+        user_count = 0
+        
+        for path in each_database():
+            # Nur User mit Kosten oder angelegtem Vormonat kommen für den Monatswechsel in Frage
+            users = (Kosten.select(Kosten.user).where((Kosten.month == prev_month) & (Kosten.year == prev_year)) |
+                     KostenMonth.select(KostenMonth.user).where((KostenMonth.month == prev_month) &
+                                                                (KostenMonth.year == prev_year)))
+            user_ids = sorted(row[0] for row in users.tuples())
+            if not user_ids:
+                continue
+            user_count += len(user_ids)
+            
+            click.echo(f'Monatswechsel {prev_month}/{prev_year} -> {month}/{year} ({path}): {len(user_ids)} User')
+            
+            # Ein Batch teilt sich eine Transaktion (ein Commit für viele User),
+            # zwischen den Batches wird die Schreibsperre wieder freigegeben
+            for batch in chunked(user_ids, batch_size):
+                with db.atomic('IMMEDIATE'):
+                    for user_id in batch:
+                        user_started = time.perf_counter()
+                        try:
+                            result = create_new_month(user_id, month, year)
+                        except Exception as e:
+                            result = {'success': False, 'error': str(e)}
+                        elapsed_ms = (time.perf_counter() - user_started) * 1000
+                        
+                        if result['success']:
+                            created_total += result['count']
+                            click.echo(f'  User {user_id}: {result["count"]} erstellt, '
+                                       f'{result["deleted_one_time"]} einmalige verschoben ({elapsed_ms:.1f} ms)')
+                        else:
+                            skipped += 1
+                            click.echo(f'  User {user_id}: übersprungen - {result["error"]} ({elapsed_ms:.1f} ms)')
+        
+        total_s = time.perf_counter() - started
+        click.echo(f'Fertig: {created_total} Kosten für {user_count - skipped} User erstellt, '
+                   f'{skipped} übersprungen ({total_s:.2f} s)')
+    finally:
+        db.close()
+
+@app.cli.command('rebuild-summaries')
+@click.option('--batch-size', default=50, show_default=True, help='Anzahl User pro Transaktion')
+def rebuild_summaries_command(batch_size):
+    """Berechnet kosten_month_summaries für alle User aus den Kosten neu."""
+    db.connect(reuse_if_open=True)
+    try:
+        started = time.perf_counter()
+        summaries = users = 0
+        for _ in each_database():
+            # Alle User mit Daten in dieser Datei (Kosten gibt es nur mit Konto)
+            user_ids = sorted(row[0] for row in (Konto.select(Konto.user) |
+                                                 KostenMonthSummary.select(KostenMonthSummary.user)).tuples())
+            for batch in chunked(user_ids, batch_size):
+                with db.atomic('IMMEDIATE'):
+                    rebuild_month_summaries(batch)
+            summaries += KostenMonthSummary.select().count()
+            users += len(user_ids)
+        click.echo(f'{summaries} Monatssummen für {users} User '
+                   f'neu berechnet ({time.perf_counter() - started:.2f} s)')
+    finally:
+        db.close()
+
+@app.cli.command('rebuild-search')
+def rebuild_search_command():
+    """Baut den Suchindex kosten_search aus Kosten, Archiv und Vorlagen neu auf."""
+    db.connect(reuse_if_open=True)
+    try:
+        started = time.perf_counter()
+        entries = 0
+        for _ in each_database():
+            if not create_search_index():
+                raise click.ClickException('SQLite ohne FTS5, Suchindex nicht möglich')
+            with db.atomic('IMMEDIATE'):
+                rebuild_search_index()
+            entries += db.execute_sql('SELECT COUNT(*) FROM "kosten_search"').fetchone()[0]
+        click.echo(f'Suchindex mit {entries} Einträgen neu aufgebaut ({time.perf_counter() - started:.2f} s)')
+    finally:
+        db.close()
+
+def reserve_kosten_ids(source):
+    """
+    Setzt den AUTOINCREMENT-Zähler von kosten mindestens auf den der
+    Datenbank `source` (Name einer angehängten Datenbank), damit die Datei
+    keine dort schon vergebenen IDs (archiviert oder gelöscht) neu vergibt.
+    """
+    high = db.execute_sql(
+        'SELECT MAX(COALESCE((SELECT MAX("seq") FROM "main"."sqlite_sequence" WHERE "name" = \'kosten\'), 0), '
+        f'COALESCE((SELECT MAX("seq") FROM "{source}"."sqlite_sequence" WHERE "name" = \'kosten\'), 0))'
+    ).fetchone()[0]
+    db.execute_sql('DELETE FROM "main"."sqlite_sequence" WHERE "name" = \'kosten\'')
+    db.execute_sql('INSERT INTO "main"."sqlite_sequence" ("name", "seq") VALUES (\'kosten\', ?)', (high,))
+
+@app.cli.command('split-shards')
+def split_shards_command():
+    """Verschiebt die Kosten-Daten aller User aus DATABASE_PATH in ihre Dateien unter SHARD_DIR."""
+    if not SHARD_DIR:
+        raise click.UsageError('SHARD_DIR ist nicht gesetzt')
+    
+    # Zähler und Tombstones gehören zur Datei, nicht zum User
+    models = [model for model in MODELS if model._meta.database is db and model not in (SyncSequence, KostenTombstone)]
+    db.connect(reuse_if_open=True)
+    try:
+        user_ids = sorted(row[0] for row in (Konto.select(Konto.user) |
+                                             KostenVersion.select(KostenVersion.user)).tuples())
+        started = time.perf_counter()
+        for user_id in user_ids:
+            with user_database(user_id):
+                # Kopieren per INSERT ... SELECT aus der angehängten Haupt-Datenbank,
+                # IDs bleiben erhalten (OR IGNORE: ein abgebrochener Lauf kann wiederholt werden)
+                db.execute_sql('ATTACH DATABASE ? AS "source"', (auth_db.database,))
+                try:
+                    with db.atomic('IMMEDIATE'):
+                        for model in models:
+                            table = model._meta.table_name
+                            columns = ', '.join(f'"{field.column_name}"' for field in model._meta.sorted_fields)
+                            if model is KontoMonth:
+                                where = '"konto_id" IN (SELECT "id" FROM "source"."konten" WHERE "user_id" = ?)'
+                            else:
+                                where = '"user_id" = ?'
+                            db.execute_sql(f'INSERT OR IGNORE INTO "main"."{table}" ({columns}) '
+                                           f'SELECT {columns} FROM "source"."{table}" WHERE {where}', (user_id,))
+                        reserve_kosten_ids('source')
+                finally:
+                    db.execute_sql('DETACH DATABASE "source"')
+            
+            delete_user_data(user_id)
+            click.echo(f'  User {user_id}: {shard_path(user_id)}')
+        click.echo(f'{len(user_ids)} User verschoben ({time.perf_counter() - started:.2f} s)')
+    finally:
+        db.close()
+
+# Wartung: Tokens aufräumen, alte Monate archivieren, VACUUM und ANALYZE
+ARCHIVE_AFTER_MONTHS = int(os.environ.get('ARCHIVE_AFTER_MONTHS', 0))  # 0 = nicht archivieren
+MAINTENANCE_INTERVAL = int(os.environ.get('MAINTENANCE_INTERVAL', 0))  # Sekunden, 0 = nur per CLI
+MAINTENANCE_VACUUM_PAGES = int(os.environ.get('MAINTENANCE_VACUUM_PAGES', 0))  # 0 = alle freien Seiten
+MAINTENANCE_RUNS_KEEP_DAYS = 90
+TOMBSTONE_KEEP_DAYS = 30  # ältere Stände bekommen bei /api/kosten/changes einen reset
+
+def purge_password_resets(now=None):
+    """Löscht benutzte und abgelaufene Reset-Tokens, gibt die Anzahl zurück"""
+    now = now or datetime.now()
+    with auth_db.atomic('IMMEDIATE'):
+        # Zwei DELETEs statt OR, damit der Index auf expires_at greift
+        deleted = PasswordReset.delete().where(PasswordReset.expires_at < now).execute()
+        deleted += PasswordReset.delete().where(PasswordReset.used == True).execute()
+        MaintenanceRun.delete().where(
+            MaintenanceRun.started_at < now - timedelta(days=MAINTENANCE_RUNS_KEEP_DAYS)).execute()
+    return deleted
+
+def purge_tombstones(now=None):
+    """
+    Löscht Tombstones, die älter als TOMBSTONE_KEEP_DAYS sind, und merkt
+    sich deren Stand in sync_sequence.purged_seq. Gibt die Anzahl zurück.
+    """
+    horizon = (now or datetime.now()) - timedelta(days=TOMBSTONE_KEEP_DAYS)
+    deleted = 0
+    for _ in each_database():
+        with db.atomic('IMMEDIATE'):
+            purged = (KostenTombstone
+                      .select(fn.MAX(KostenTombstone.seq))
+                      .where(KostenTombstone.created_at < horizon)
+                      .scalar())
+            if purged:
+                deleted += KostenTombstone.delete().where(KostenTombstone.seq <= purged).execute()
+                SyncSequence.update(purged_seq=purged).where(SyncSequence.id == 1).execute()
+    return deleted
+
+def archive_horizon(months, now=None):
+    """(month, year) des ersten Monats, der bei `months` Monaten Aufbewahrung nicht archiviert wird"""
+    now = now or datetime.now()
+    index = now.year * 12 + now.month - 1 - months
+    return index % 12 + 1, index // 12
+
+def archive_months(before, batch_size=50):
+    """
+    Verschiebt alle Einträge aus Monaten vor `before` (month, year) aus
+    kosten_view nach kosten_archive, inkl. der virtuellen Einträge aus
+    Vorlagen. Danach fehlen die Monate in kosten und kosten_months, Vorlagen
+    die vorher enden werden gelöscht. Die Monatssummen bleiben gleich, weil
+    kosten_view das Archiv mitliest. Gibt (Monate, Zeilen) zurück.
+    """
+    prev_month, prev_year = get_previous_month(*before)
+    end = (prev_year, prev_month)
+    user_ids = sorted(row[0] for row in
+                      (filter_period(Kosten.select(Kosten.user), Kosten, end=end) |
+                       filter_period(KostenMonth.select(KostenMonth.user), KostenMonth, end=end)).tuples())
+    
+    archived_months = archived_rows = 0
+    for batch in chunked(user_ids, batch_size):
+        with db.atomic('IMMEDIATE'):
+            months = {}
+            for model in (Kosten, KostenMonth):
+                query = filter_period(model.select(model.user, model.month, model.year).distinct()
+                                      .where(model.user.in_(batch)), model, end=end)
+                for user_id, month, year in query.tuples():
+                    months.setdefault(user_id, set()).add((month, year))
+            
+            view = kosten_view(batch, end=end, archived=False)
+            archived_rows += (KostenArchive
+                              .insert_from(select_view(view, view.c.id, view.c.user, view.c.bezeichnung,
+                                                       view.c.betrag, view.c.zahlungstag, view.c.konto,
+                                                       view.c.bezahlt, view.c.position, view.c.cost_type,
+                                                       view.c.month, view.c.year),
+                                           [KostenArchive.id, KostenArchive.user, KostenArchive.bezeichnung,
+                                            KostenArchive.betrag, KostenArchive.zahlungstag, KostenArchive.konto,
+                                            KostenArchive.bezahlt, KostenArchive.position,
+                                            KostenArchive.cost_type, KostenArchive.month, KostenArchive.year])
+                              .as_rowcount()
+                              .execute())
+            filter_period(Kosten.delete().where(Kosten.user.in_(batch)), Kosten, end=end).execute()
+            filter_period(KostenMonth.delete().where(KostenMonth.user.in_(batch)), KostenMonth, end=end).execute()
+            (RecurringTemplate
+             .delete()
+             .where(RecurringTemplate.user.in_(batch) &
+                    (RecurringTemplate.valid_to < month_key(*before)))
+             .execute())
+            
+            # Einträge sind jetzt nur noch lesbar, gecachte Listen verwerfen
+            for user_id, user_months in months.items():
+                bump_versions(user_id, user_months, summaries=False)
+                archived_months += len(user_months)
+    return archived_months, archived_rows
+
+def vacuum_database(pages=0, full=False):
+    """
+    Gibt freie Seiten an das Dateisystem zurück. Mit auto_vacuum=incremental
+    reicht PRAGMA incremental_vacuum (höchstens `pages` Seiten, 0 = alle).
+    full baut die Datei per VACUUM komplett neu und stellt dabei auf
+    incremental um; das sperrt die Datenbank für die Dauer des Laufs.
+    Gibt den verwendeten Modus zurück.
+    """
+    if full:
+        db.execute_sql('PRAGMA auto_vacuum = INCREMENTAL')
+        db.execute_sql('VACUUM')
+        mode = 'full'
+    elif db.execute_sql('PRAGMA auto_vacuum').fetchone()[0] == 2:
+        # Läuft schrittweise, fetchall() führt alle Schritte aus
+        db.execute_sql(f'PRAGMA incremental_vacuum({int(pages)})').fetchall()
+        mode = 'incremental'
+    else:
+        mode = 'skipped'  # auto_vacuum aus: einmalig mit --full-vacuum umstellen
+    db.execute_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+    return mode
+
+def database_stats():
+    """Dateigrößen, Seiten und Zeilen der großen Tabellen (mit SHARD_DIR über alle Dateien summiert)"""
+    def file_size(path):
+        return os.path.getsize(path) if os.path.exists(path) else 0
+    
+    stats = dict.fromkeys(['file_bytes', 'wal_bytes', 'pages', 'free_bytes', 'kosten', 'kosten_archive'], 0)
+    for path in each_database():
+        page_size = db.execute_sql('PRAGMA page_size').fetchone()[0]
+        stats['file_bytes'] += file_size(path)
+        stats['wal_bytes'] += file_size(path + '-wal')
+        stats['pages'] += db.execute_sql('PRAGMA page_count').fetchone()[0]
+        stats['free_bytes'] += db.execute_sql('PRAGMA freelist_count').fetchone()[0] * page_size
+        stats['kosten'] += Kosten.select().count()
+        stats['kosten_archive'] += KostenArchive.select().count()
+    stats['password_resets'] = PasswordReset.select().count()
+    return stats
+
+def run_maintenance(archive_after=ARCHIVE_AFTER_MONTHS, vacuum_pages=MAINTENANCE_VACUUM_PAGES,
+                    full_vacuum=False, analyze=True, batch_size=50, run=None):
+    """
+    Führt alle Wartungsschritte aus und gibt einen Bericht mit Größen
+    vorher/nachher und der Laufzeit je Schritt zurück. Der Lauf wird in
+    maintenance_runs protokolliert (`run`: bereits angelegter Eintrag).
+    """
+    run = run or MaintenanceRun.create()
+    report = {'before': database_stats(), 'steps': {}}
+    
+    def step(name, func):
+        started = time.perf_counter()
+        result = func()
+        report['steps'][name] = {'result': result, 'seconds': round(time.perf_counter() - started, 3)}
+    
+    def archive():
+        before = archive_horizon(archive_after)
+        months = rows = 0
+        for _ in each_database():
+            archived_months, archived_rows = archive_months(before, batch_size)
+            months += archived_months
+            rows += archived_rows
+        return {'before': f'{before[1]}-{before[0]:02d}', 'months': months, 'rows': rows}
+    
+    def vacuum():
+        modes = {vacuum_database(vacuum_pages, full_vacuum) for _ in each_database()}
+        return ', '.join(sorted(modes))
+    
+    def analyze():
+        for _ in each_database():
+            db.execute_sql('ANALYZE')
+            if search_index_exists():
+                # Segmente des Suchindex zusammenführen
+                db.execute_sql('INSERT INTO "kosten_search" ("kosten_search") VALUES (\'optimize\')')
+    
+    step('password_resets', purge_password_resets)
+    step('tombstones', purge_tombstones)
+    if archive_after > 0:
+        step('archive', archive)
+    step('vacuum', vacuum)
+    if analyze:
+        step('analyze', analyze)
+    report['after'] = database_stats()
+    
+    run.finished_at = datetime.now()
+    run.report = json.dumps(report)
+    run.save()
+    return report
+
+def claim_maintenance_run(interval):
+    """Legt einen Lauf an, wenn seit dem letzten mehr als `interval` Sekunden vergangen sind (sonst None)"""
+    now = datetime.now()
+    with auth_db.atomic('IMMEDIATE'):
+        if MaintenanceRun.select().where(MaintenanceRun.started_at > now - timedelta(seconds=interval)).exists():
+            return None
+        return MaintenanceRun.create(started_at=now)
+
+class MaintenanceScheduler:
+    """
+    Startet run_maintenance alle MAINTENANCE_INTERVAL Sekunden in einem
+    Hintergrund-Thread des Workers. Jeder Worker prüft regelmäßig, welcher
+    tatsächlich läuft, entscheidet maintenance_runs in einer IMMEDIATE-
+    Transaktion: höchstens ein Lauf pro Intervall. VACUUM nur inkrementell.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def start(self):
+        """Startet den Thread einmal pro Prozess (nach einem Fork erneut)"""
+        if self.interval <= 0 or self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            threading.Thread(target=self.loop, name='maintenance', daemon=True).start()
+
+    def loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                db.connect(reuse_if_open=True)
+                run = claim_maintenance_run(self.interval)
+                if run:
+                    report = run_maintenance(run=run)
+                    app.logger.info(f'Wartung ausgeführt: {json.dumps(report["steps"])}')
+            except Exception:
+                app.logger.exception('Wartung fehlgeschlagen')
+            finally:
+                db.close()
+
+maintenance_scheduler = MaintenanceScheduler(MAINTENANCE_INTERVAL)
+
+@app.cli.command('maintenance')
+@click.option('--archive-after', type=click.IntRange(0), default=ARCHIVE_AFTER_MONTHS, show_default=True,
+              help='Monate vor dem aktuellen Monat archivieren, ältere wandern nach kosten_archive (0 = aus)')
+@click.option('--vacuum-pages', type=click.IntRange(0), default=MAINTENANCE_VACUUM_PAGES, show_default=True,
+              help='Höchstens so viele freie Seiten zurückgeben (0 = alle)')
+@click.option('--full-vacuum', is_flag=True, help='Volles VACUUM, stellt auf auto_vacuum=incremental um (sperrt die DB)')
+@click.option('--no-analyze', is_flag=True, help='ANALYZE überspringen')
+@click.option('--batch-size', default=50, show_default=True, help='Anzahl User pro Transaktion beim Archivieren')
+def maintenance_command(archive_after, vacuum_pages, full_vacuum, no_analyze, batch_size):
+    """Räumt Reset-Tokens auf, archiviert alte Monate, VACUUM und ANALYZE."""
+    db.connect(reuse_if_open=True)
+    try:
+        report = run_maintenance(archive_after, vacuum_pages, full_vacuum, not no_analyze, batch_size)
+        for name, values in report['steps'].items():
+            result = '' if values['result'] is None else f' {values["result"]}'
+            click.echo(f'{name}:{result} ({values["seconds"]:.2f} s)')
+        for key in report['before']:
+            before, after = report['before'][key], report['after'][key]
+            click.echo(f'  {key}: {before} -> {after}')
+    finally:
+        db.close()
+
+# Statische Dateien: build_assets.py schreibt minifizierte Kopien mit dem
+# Inhalts-Hash im Namen nach static/dist (plus .gz/.br für nginx gzip_static
+# bzw. brotli_static). asset_url() liefert in den Templates die URL aus dem
+# Manifest, ohne Build die Originaldatei.
+ASSET_MANIFEST = os.path.join(app.static_folder, build_assets.ASSET_DIST, 'manifest.json')
+_asset_manifest = None
+
+def load_asset_manifest():
+    """Manifest von build_assets.py (leer ohne Build), einmal pro Prozess gelesen"""
+    global _asset_manifest
+    if _asset_manifest is None:
+        try:
+            with open(ASSET_MANIFEST, encoding='utf-8') as f:
+                _asset_manifest = json.load(f)
+        except (OSError, ValueError):
+            _asset_manifest = {}
+    return _asset_manifest
+
+@app.template_global()
+def asset_url(name):
+    """URL einer statischen Datei, nach build_assets.py die minifizierte Kopie mit Hash"""
+    return url_for('static', filename=load_asset_manifest().get(name, name))
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Wie python build_assets.py, das ohne App-Import und Migrationen auskommt."""
+    build_assets.main(['--static-folder', app.static_folder])
+
 @app.route('/api/create-month', methods=['POST'])
 @login_required
 def api_create_month():
@@ -534,23 +2957,122 @@ def api_create_month():
 @app.route('/api/konten', methods=['GET'])
 @login_required
 def get_konten():
-    user = get_current_user()
-    if not user:
+    user_id = get_current_user_id()
+    if not user_id:
         return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
     
-    konten = (Kosten
-              .select(Kosten.konto)
-              .where(Kosten.user == user)
-              .distinct()
-              .order_by(Kosten.konto))
-    return jsonify([k.konto for k in konten])
+    etag = get_etag(user_id, *KONTEN_VERSION_KEY, prefix='konten')
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    konten = (Konto
+              .select(Konto.name)
+              .where(Konto.user == user_id)
+              .order_by(Konto.name)
+              .tuples())
+    return with_etag(jsonify([konto for konto, in konten]), etag)
+
+# Wie weit die Monatsansicht zurück navigieren kann
+NAVIGATION_MONTHS_BACK = 6
+# Daten für die Startseite direkt ins HTML schreiben (0 = per /api/bootstrap nachladen)
+BOOTSTRAP_INLINE = os.environ.get('BOOTSTRAP_INLINE', '1') == '1'
+
+def navigation_months(month, year, now=None):
+    """Vor- und Folgemonat sowie (month, year) der Grenzen der Navigation relativ zu heute"""
+    now = now or datetime.now()
+    first = (now.month, now.year)
+    for _ in range(NAVIGATION_MONTHS_BACK):
+        first = get_previous_month(*first)
+    return {
+        'prev': get_previous_month(month, year),
+        'next': get_next_month(month, year),
+        'min': first,
+        'current': (now.month, now.year),
+        'current_next': get_next_month(now.month, now.year),
+    }
+
+def build_bootstrap(user_id, month, year, months=None):
+    """
+    Alles, was die Monatsansicht beim Laden braucht: Kosten des Monats im
+    Spaltenformat, Kontenliste, Summen und die Navigation (welche
+    Nachbarmonate Einträge haben, frühester und spätester erreichbarer
+    Monat). Ob ein Monat Einträge hat, steht in den Monatssummen. `seq`
+    ist der Stand für den nächsten Aufruf von /api/kosten/changes.
+    """
+    months = months or navigation_months(month, year)
+    # Vor den Daten lesen: spätere Änderungen kommen beim nächsten Abgleich höchstens doppelt
+    seq = current_sync_seq()
+    rows = fetch_kosten_rows(kosten_api_query(kosten_view(user_id, months=[(month, year)])))
+    konten = Konto.select(Konto.name).where(Konto.user == user_id).order_by(Konto.name).tuples()
+    
+    lookup = {months['prev'], months['next'], months['current_next']}
+    existing = set(KostenMonthSummary
+                   .select(KostenMonthSummary.month, KostenMonthSummary.year)
+                   .where((KostenMonthSummary.user == user_id) & (KostenMonthSummary.count > 0) &
+                          Tuple(KostenMonthSummary.month, KostenMonthSummary.year).in_(list(lookup)))
+                   .distinct()
+                   .tuples())
+    
+    def month_dict(key, exists=None):
+        result = {'month': key[0], 'year': key[1]}
+        if exists is not None:
+            result['exists'] = exists
+        return result
+    
+    # Vorwärts bis zum aktuellen Monat, darüber hinaus nur in einen bereits angelegten Folgemonat
+    last = months['current_next'] if months['current_next'] in existing else months['current']
+    return {
+        'month': month,
+        'year': year,
+        'kosten': {'columns': KOSTEN_API_COLUMNS, 'rows': rows},
+        'seq': seq,
+        'konten': [konto for konto, in konten],
+        'totals': compute_month_totals(user_id, month, year),
+        'navigation': {
+            'prev': month_dict(months['prev'], months['prev'] in existing),
+            'next': month_dict(months['next'], months['next'] in existing),
+            'min': month_dict(months['min']),
+            'max': month_dict(last),
+        },
+    }
+
+@app.route('/api/bootstrap', methods=['GET'])
+@login_required
+def get_bootstrap():
+    """
+    Erstes Laden der Monatsansicht in einer Antwort statt einzelner Aufrufe
+    von /api/kosten, /api/konten und /api/kosten/summary.
+    Query-Parameter: month, year (Fallback: aktueller Monat)
+    """
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
+    
+    month, year = get_month_year_args()
+    
+    try:
+        months = navigation_months(month, year)
+        # Die Navigation hängt auch vom heutigen Datum ab
+        current = month_key(*months['current'])
+        etag = get_etag(user_id, month, year, prefix=f'bootstrap-{current}',
+                        extra=(months['prev'], months['next'], months['current_next']))
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        return with_etag(jsonify(build_bootstrap(user_id, month, year, months)), etag)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/konto/toggle-exclude', methods=['POST'])
 @login_required
 def toggle_konto_exclude():
     """
-    Schaltet das exclude_from_total Flag für alle Kosten eines Kontos um.
+    Schaltet den Ausschluss eines Kontos aus der Gesamtsumme um.
     Erwartet: {"konto": "Kontoname", "month": 1, "year": 2026}
+    Mit Monat und Jahr gilt die Einstellung nur für diesen Monat, ohne
+    beide wird der Standard des Kontos für alle übrigen Monate umgeschaltet.
     """
     try:
         user = get_current_user()
@@ -558,39 +3080,39 @@ def toggle_konto_exclude():
             return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
         
         data = request.get_json()
-        konto = data.get('konto')
+        konto_name = data.get('konto')
         month = data.get('month')
         year = data.get('year')
         
-        if not konto or not month or not year:
+        if not konto_name or bool(month) != bool(year):
             return jsonify({'success': False, 'error': 'Konto, Monat und Jahr erforderlich'}), 400
         
-        # Hole eine Kosten des Kontos um den aktuellen Status zu prüfen
-        sample = Kosten.get_or_none(
-            (Kosten.user == user) & 
-            (Kosten.konto == konto) & 
-            (Kosten.month == month) & 
-            (Kosten.year == year)
-        )
-        
-        if not sample:
-            return jsonify({'success': False, 'error': 'Konto nicht gefunden'}), 404
-        
-        # Toggle den Status
-        new_status = not sample.exclude_from_total
-        
-        # Update alle Kosten dieses Kontos im aktuellen Monat
-        Kosten.update(exclude_from_total=new_status).where(
-            (Kosten.user == user) & 
-            (Kosten.konto == konto) & 
-            (Kosten.month == month) & 
-            (Kosten.year == year)
-        ).execute()
+        with db.atomic('IMMEDIATE'):
+            konto = Konto.get_or_none((Konto.user == user) & (Konto.name == konto_name))
+            if not konto:
+                return jsonify({'success': False, 'error': 'Konto nicht gefunden'}), 404
+            
+            if month:
+                override = KontoMonth.get_or_none((KontoMonth.konto == konto) &
+                                                  (KontoMonth.year == year) &
+                                                  (KontoMonth.month == month))
+                current = konto.exclude_from_total if override is None else override.exclude_from_total
+                new_status = not current
+                (KontoMonth
+                 .insert(konto=konto, year=year, month=month, exclude_from_total=new_status)
+                 .on_conflict_replace()
+                 .execute())
+                # Nur die Gesamtsumme ändert sich, die Summen je Konto bleiben gleich
+                bump_versions(user.id, [(month, year)], summaries=False)
+            else:
+                new_status = not konto.exclude_from_total
+                Konto.update(exclude_from_total=new_status).where(Konto.id == konto.id).execute()
+                bump_versions(user.id, [], konten=True, summaries=False)
         
         return jsonify({
             'success': True,
             'excluded': new_status,
-            'konto': konto
+            'konto': konto_name
         })
         
     except Exception as e:
@@ -599,6 +3121,11 @@ def toggle_konto_exclude():
 @app.route('/api/konten/rename', methods=['POST'])
 @login_required
 def rename_konto():
+    """
+    Benennt ein Konto um. Ist der neue Name frei, wird nur die eine Zeile in
+    `konten` geändert. Gibt es das Zielkonto schon, werden beide Konten
+    zusammengeführt und die Kosten auf das Zielkonto umgehängt.
+    """
     try:
         user = get_current_user()
         if not user:
@@ -613,36 +3140,653 @@ def rename_konto():
 
         if not old_name or not new_name:
             return jsonify({'success': False, 'error': 'Kontoname darf nicht leer sein'}), 400
+        if old_name == new_name:
+            return jsonify({'success': True})
 
-        with db.atomic():
-            Kosten.update(konto=new_name).where((Kosten.konto == old_name) & (Kosten.user == user)).execute()
+        with db.atomic('IMMEDIATE'):
+            source = Konto.get_or_none((Konto.user == user) & (Konto.name == old_name))
+            if not source:
+                return jsonify({'success': False, 'error': 'Konto nicht gefunden'}), 404
+            target = Konto.get_or_none((Konto.user == user) & (Konto.name == new_name))
+            
+            if target is None:
+                # Name ist nur in `konten` gespeichert, alle ETags hängen an der Konten-Version
+                Konto.update(name=new_name).where(Konto.id == source.id).execute()
+                bump_versions(user.id, [], konten=True, summaries=False)
+            else:
+                # Die Monatssummen kennen alle Monate des Kontos, auch die nur aus Vorlagen
+                months = list(KostenMonthSummary
+                              .select(KostenMonthSummary.month, KostenMonthSummary.year)
+                              .where(KostenMonthSummary.konto == source.id)
+                              .tuples())
+                Kosten.update(konto=target.id).where(Kosten.konto == source.id).execute()
+                KostenArchive.update(konto=target.id).where(KostenArchive.konto == source.id).execute()
+                RecurringTemplate.update(konto=target.id).where(RecurringTemplate.konto == source.id).execute()
+                # Monats-Einstellungen des alten Kontos übernehmen, die des Zielkontos haben Vorrang
+                (KontoMonth
+                 .insert_from(KontoMonth
+                              .select(Value(target.id), KontoMonth.year, KontoMonth.month,
+                                      KontoMonth.exclude_from_total)
+                              .where(KontoMonth.konto == source.id),
+                              [KontoMonth.konto, KontoMonth.year, KontoMonth.month,
+                               KontoMonth.exclude_from_total])
+                 .on_conflict_ignore()
+                 .execute())
+                KontoMonth.delete().where(KontoMonth.konto == source.id).execute()
+                Konto.delete().where(Konto.id == source.id).execute()
+                bump_versions(user.id, months, konten=True)
             
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/report', methods=['GET'])
+@login_required
+def get_report():
+    """
+    Summen je Konto und Monat über einen Zeitraum, z.B. für Diagramme.
+    Liest nur die vorberechnete Tabelle kosten_month_summaries, die Laufzeit
+    hängt also von der Anzahl der Monate ab, nicht von der Anzahl der Kosten.
+    Query-Parameter: from=YYYY-MM, to=YYYY-MM (beide optional)
+    """
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
+    
+    try:
+        start = parse_year_month(request.args.get('from'))
+        end = parse_year_month(request.args.get('to'))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Zeitraum im Format YYYY-MM angeben'}), 400
+    
+    # Die Versionszähler steigen nur, ihre Summe ändert sich also bei jeder Änderung im Zeitraum
+    # (plus Kontenliste für Umbenennen und Ausschluss auf Konto-Ebene)
+    version = filter_period(KostenVersion
+                            .select(fn.SUM(KostenVersion.version))
+                            .where(KostenVersion.user == user_id),
+                            KostenVersion, start, end).scalar() or 0
+    konten_version = (KostenVersion
+                      .select(KostenVersion.version)
+                      .where((KostenVersion.user == user_id) &
+                             (Tuple(KostenVersion.month, KostenVersion.year) == Tuple(*KONTEN_VERSION_KEY)))
+                      .scalar() or 0)
+    period = '_'.join(f'{y}-{m:02d}' for y, m in filter(None, (start, end))) or 'alle'
+    etag = f'report-{user_id}-{period}-{version}-{konten_version}'
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    rows = filter_period(join_konto(KostenMonthSummary
+                                    .select(KostenMonthSummary.year, KostenMonthSummary.month, Konto.name,
+                                            KostenMonthSummary.count, KostenMonthSummary.total,
+                                            KostenMonthSummary.paid, KONTO_EXCLUDED),
+                                    model=KostenMonthSummary)
+                         .where(KostenMonthSummary.user == user_id)
+                         .order_by(KostenMonthSummary.year, KostenMonthSummary.month, Konto.name)
+                         .tuples(),
+                         KostenMonthSummary, start, end)
+    
+    # Gleiche Struktur wie compute_month_totals, ein Eintrag pro Monat
+    months = []
+    for (year, month), konten in itertools.groupby(rows, key=lambda row: (row[0], row[1])):
+        entry = {'month': month, 'year': year, 'total': 0, 'paid': 0, 'open': 0, 'konten': []}
+        for _, _, konto, count, total, paid, excluded in konten:
+            entry['konten'].append({
+                'konto': konto,
+                'count': count,
+                'total': round(total, 2),
+                'paid': round(paid, 2),
+                'open': round(total - paid, 2),
+                'excluded': excluded
+            })
+            if not excluded:
+                entry['total'] += total
+                entry['paid'] += paid
+        entry['open'] = round(entry['total'] - entry['paid'], 2)
+        entry['total'] = round(entry['total'], 2)
+        entry['paid'] = round(entry['paid'], 2)
+        months.append(entry)
+    
+    return with_etag(jsonify({'success': True, 'months': months}), etag)
+
+SEARCH_DEFAULT_LIMIT = 50
+SEARCH_MAX_LIMIT = 200
+SEARCH_MAX_MATCHES = 1000  # Treffer aus dem Index (nach Rang), bevor Vorlagen auf ihre Monate verteilt werden
+SEARCH_TOKEN_RE = re.compile(r'\w+')
+
+def search_match_expression(user_id, text):
+    """
+    FTS5-Ausdruck für die Eingabe: jedes Wort als Präfix ("mie" findet
+    "Miete"), alle Wörter müssen in Bezeichnung oder Kontoname vorkommen.
+    Nur Wortzeichen werden übernommen, die FTS5-Syntax bleibt so geschlossen.
+    None, wenn die Eingabe kein Wort enthält.
+    """
+    tokens = SEARCH_TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    terms = ' AND '.join(f'"{token}"*' for token in tokens)
+    return f'owner : "u{user_id}" AND {{bezeichnung konto}} : ({terms})'
+
+def search_kosten(user_id, text, limit=SEARCH_DEFAULT_LIMIT):
+    """
+    Sucht in allen Monaten des Users (inkl. Archiv). Treffer auf eine
+    Vorlage gelten für jeden Monat, in dem ihr Eintrag virtuell sichtbar
+    ist. Gibt (Anzahl, Zeilen im Format von KOSTEN_API_COLUMNS) zurück,
+    neueste Monate zuerst und innerhalb eines Monats nach Rang (bm25,
+    Bezeichnung zählt mehr als der Kontoname), höchstens `limit` Zeilen.
+    """
+    expression = search_match_expression(user_id, text)
+    if expression is None:
+        return 0, []
+    
+    ranks = {}  # (Quelle, ID) -> Rang, kleiner ist besser
+    matches = db.execute_sql(
+        'SELECT "rowid", bm25("kosten_search", 10.0, 2.0, 0.0) AS "rank" FROM "kosten_search" '
+        'WHERE "kosten_search" MATCH ? ORDER BY "rank" LIMIT ?', (expression, SEARCH_MAX_MATCHES))
+    for rowid, rank in matches.fetchall():
+        kosten_id, source = divmod(rowid, 4)
+        ranks[(source, kosten_id)] = rank
+    if not ranks:
+        return 0, []
+    
+    ids = {source: [kosten_id for match_source, kosten_id in ranks if match_source == source]
+           for source in SEARCH_SOURCES.values()}
+    # Archiv getrennt abfragen: jede Zeile wird mit der Quelle ihres Treffers
+    # bewertet. Eigene Zeilen einer Vorlage zählen nur, wenn sie selbst passen.
+    current = kosten_view(user_id, archived=False, ids=ids[SEARCH_SOURCES['kosten']],
+                          template_ids=ids[SEARCH_SOURCES['recurring_templates']])
+    archive = kosten_view(user_id, ids=[], template_ids=[], archive_ids=ids[SEARCH_SOURCES['kosten_archive']])
+    ranked = []
+    for source, view in ((SEARCH_SOURCES['kosten'], current), (SEARCH_SOURCES['kosten_archive'], archive)):
+        for row in fetch_kosten_rows(kosten_api_query(view)):
+            kosten_id = row[0]
+            if kosten_id < 0 and source == SEARCH_SOURCES['kosten']:
+                rank = ranks.get((SEARCH_SOURCES['recurring_templates'], split_virtual_id(kosten_id)[0]), 0)
+            else:
+                rank = ranks.get((source, kosten_id), 0)
+            ranked.append((rank, row))
+    
+    year, month = KOSTEN_API_COLUMNS.index('year'), KOSTEN_API_COLUMNS.index('month')
+    ranked.sort(key=lambda item: (-item[1][year], -item[1][month], item[0]))
+    return len(ranked), [row for _, row in ranked[:limit]]
+
+@app.route('/api/search', methods=['GET'])
+@login_required
+def search():
+    """
+    Volltextsuche über alle Monate. Query-Parameter: q (Wörter als Präfix,
+    alle müssen passen), limit (Standard 50, höchstens 200).
+    Antwort: {"success": true, "total": N, "groups": [{"year", "month", "kosten": [...]}]},
+    Gruppen neueste zuerst, Einträge innerhalb eines Monats nach Relevanz.
+    """
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
+    
+    text = request.args.get('q', '').strip()
+    if not SEARCH_TOKEN_RE.search(text):
+        return jsonify({'success': False, 'error': 'Suchbegriff fehlt'}), 400
+    limit = min(max(request.args.get('limit', SEARCH_DEFAULT_LIMIT, type=int), 1), SEARCH_MAX_LIMIT)
+    
+    try:
+        if not search_index_exists():
+            return jsonify({'success': False, 'error': 'Volltextsuche nicht verfügbar (SQLite ohne FTS5)'}), 503
+        total, rows = search_kosten(user_id, text, limit)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    groups = []
+    for row in rows:
+        kosten = dict(zip(KOSTEN_API_COLUMNS, row))
+        if not groups or (groups[-1]['year'], groups[-1]['month']) != (kosten['year'], kosten['month']):
+            groups.append({'year': kosten['year'], 'month': kosten['month'], 'kosten': []})
+        groups[-1]['kosten'].append(kosten)
+    return jsonify({'success': True, 'total': total, 'limit': limit, 'groups': groups})
+
+# Spalten des Exports (und des Imports, siehe /api/import)
+EXPORT_COLUMNS = ('year', 'month', 'konto', 'bezeichnung', 'betrag', 'zahlungstag',
+                  'bezahlt', 'cost_type', 'exclude_from_total')
+# SQLite liefert 0/1: CSV schreibt 0/1, NDJSON true/false
+EXPORT_BOOL_INDEXES = [EXPORT_COLUMNS.index('bezahlt'), EXPORT_COLUMNS.index('exclude_from_total')]
+EXPORT_BATCH_ROWS = 500  # Zeilen pro gesendetem Block
+
+def parse_year_month(value):
+    """Parst 'YYYY-MM' zu (year, month), None bei leerem Wert"""
+    if not value:
+        return None
+    year, month = value.split('-')
+    year, month = int(year), int(month)
+    if not 1 <= month <= 12:
+        raise ValueError(value)
+    return year, month
+
+def filter_period(query, model, start=None, end=None):
+    """Schränkt eine Abfrage auf (year, month) zwischen start und end ein (jeweils optional)"""
+    if start:
+        query = query.where(Tuple(model.year, model.month) >= Tuple(*start))
+    if end:
+        query = query.where(Tuple(model.year, model.month) <= Tuple(*end))
+    return query
+
+def export_query(user_id, start=None, end=None):
+    """Alle Kosten eines Users im Zeitraum (inkl. Vorlagen) als Tupel, sortiert wie die Monatsansicht"""
+    view = kosten_view(user_id, start=start, end=end)
+    return (join_konto(select_view(view, view.c.year, view.c.month, Konto.name, view.c.bezeichnung,
+                                   view.c.betrag, view.c.zahlungstag, view.c.bezahlt, view.c.cost_type,
+                                   KONTO_EXCLUDED),
+                       model=view.c)
+            .order_by(view.c.year, view.c.month, Konto.name, view.c.position, view.c.zahlungstag)
+            .tuples())
+
+def generate_csv(query):
+    """CSV mit Semikolon und Dezimalkomma (öffnet direkt in deutschem Excel)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    writer.writerow(EXPORT_COLUMNS)
+    yield '\ufeff' + buffer.getvalue()  # BOM, damit Excel UTF-8 erkennt
+    
+    for batch in chunked(query.iterator(), EXPORT_BATCH_ROWS):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in batch:
+            row = list(row)
+            row[4] = f'{row[4]:.2f}'.replace('.', ',')
+            for i in EXPORT_BOOL_INDEXES:
+                row[i] = int(row[i])
+            writer.writerow(row)
+        yield buffer.getvalue()
+
+def generate_ndjson(query):
+    """Eine JSON-Zeile pro Eintrag"""
+    for batch in chunked(query.iterator(), EXPORT_BATCH_ROWS):
+        lines = []
+        for row in batch:
+            row = list(row)
+            for i in EXPORT_BOOL_INDEXES:
+                row[i] = bool(row[i])
+            lines.append(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n')
+        yield ''.join(lines)
+
+@app.route('/api/export', methods=['GET'])
+@login_required
+def export_kosten():
+    """
+    Streamt die komplette Kosten-Historie des Users.
+    Query-Parameter: format=csv|ndjson, from=YYYY-MM, to=YYYY-MM (beide optional)
+    """
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'success': False, 'error': 'Format muss csv oder ndjson sein'}), 400
+    
+    try:
+        start = parse_year_month(request.args.get('from'))
+        end = parse_year_month(request.args.get('to'))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Zeitraum im Format YYYY-MM angeben'}), 400
+    
+    query = export_query(user_id, start, end)
+    
+    period = '_'.join(f'{y}-{m:02d}' for y, m in filter(None, (start, end))) or 'alle'
+    if export_format == 'csv':
+        generator, mimetype = generate_csv(query), 'text/csv; charset=utf-8'
+    else:
+        generator, mimetype = generate_ndjson(query), 'application/x-ndjson'
+    
+    # stream_with_context hält die Request- und DB-Verbindung bis zum letzten Block offen
+    response = app.response_class(stream_with_context(generator), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=verwalco-export-{period}.{export_format}'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: sofort an den Client weiterreichen
+    return response
+
+IMPORT_MAX_ROWS = 50000
+IMPORT_MAX_ERRORS = 100  # Nur die ersten Fehler/Duplikate in der Antwort melden
+IMPORT_TRUE_VALUES = ('1', 'true', 'ja', 'yes', 'x')
+
+def parse_import_bool(value):
+    """Bool aus CSV ('1', 'ja', 'true', ...) oder NDJSON (true/false)"""
+    if isinstance(value, str):
+        return value.strip().lower() in IMPORT_TRUE_VALUES
+    return bool(value)
+
+def read_import_rows(stream):
+    """
+    Liest CSV (Komma oder Semikolon, mit Kopfzeile) oder NDJSON zeilenweise
+    aus dem Upload und liefert (zeilennummer, dict) ohne die Datei komplett
+    in den Speicher zu laden. Das Format wird an der ersten Zeile erkannt.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    first_line = text.readline()
+    if not first_line.strip():
+        return
+    
+    if first_line.lstrip().startswith('{'):
+        for line_no, line in enumerate(itertools.chain([first_line], text), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_no, row
+        return
+    
+    delimiter = ';' if first_line.count(';') >= first_line.count(',') else ','
+    reader = csv.reader(itertools.chain([first_line], text), delimiter=delimiter)
+    header = [column.strip().lower() for column in next(reader)]
+    missing = [key for key in KOSTEN_REQUIRED_FIELDS if key not in header]
+    if missing:
+        raise ValueError(f'Fehlende Spalten: {", ".join(missing)}')
+    for row in reader:
+        if not any(value.strip() for value in row):
+            continue
+        # Zeilennummer inkl. Kopfzeile, wie in Excel angezeigt
+        yield reader.line_num, {key: value.strip() for key, value in zip(header, row)}
+
+def validate_import_row(row, default_month, default_year):
+    """Prüft eine Import-Zeile und liefert die Felder für insert_many"""
+    if not isinstance(row, dict):
+        raise ValueError('Ungültige Zeile')
+    fields = validate_kosten_fields(
+        {key: value for key, value in row.items()
+         if key in KOSTEN_EDITABLE_FIELDS and key != 'bezahlt' and value not in ('', None)},
+        required=KOSTEN_REQUIRED_FIELDS)
+    fields['bezeichnung'] = str(fields['bezeichnung']).strip()
+    fields['konto'] = str(fields['konto']).strip()
+    if not fields['bezeichnung'] or not fields['konto']:
+        raise ValueError('Bezeichnung und Konto dürfen nicht leer sein')
+    if not 1 <= fields['zahlungstag'] <= 31:
+        raise ValueError('Ungültiger Zahlungstag')
+    fields.setdefault('cost_type', 'recurring')
+    fields['bezahlt'] = parse_import_bool(row.get('bezahlt') or False)
+    fields['exclude_from_total'] = parse_import_bool(row.get('exclude_from_total') or False)
+    fields['month'], fields['year'] = parse_month_year(row.get('month') or default_month,
+                                                       row.get('year') or default_year)
+    return fields
+
+def load_import_state(user_id, months):
+    """
+    Bestehende (bezeichnung, konto_id, month, year)-Schlüssel und die nächste
+    freie Position je (konto_id, month, year) für alle Monate des Imports,
+    mit einer Abfrage pro Block von Monaten statt einer pro Zeile.
+    """
+    existing = set()
+    next_positions = {}
+    for batch in chunked(sorted(months), BATCH_CHUNK_SIZE):
+        view = kosten_view(user_id, months=batch)
+        existing.update(select_view(view, view.c.bezeichnung, view.c.konto, view.c.month, view.c.year).tuples())
+        for konto, month, year, max_position in (select_view(view, view.c.konto, view.c.month, view.c.year,
+                                                             fn.MAX(view.c.position))
+                                                 .group_by(view.c.konto, view.c.month, view.c.year)
+                                                 .tuples()):
+            next_positions[(konto, month, year)] = max_position + POSITION_STEP
+    return existing, next_positions
+
+IMPORT_FIELDS = (Kosten.user, Kosten.bezeichnung, Kosten.betrag, Kosten.zahlungstag, Kosten.konto,
+                 Kosten.bezahlt, Kosten.position, Kosten.cost_type, Kosten.month, Kosten.year)
+
+def bulk_insert_kosten(rows):
+    """
+    Schreibt viele Kosten mit einem einzigen vorbereiteten INSERT per executemany.
+    Bei insert_many baut peewee für jeden einzelnen Wert einen SQL-Ausdruck,
+    was bei tausenden Zeilen den Großteil der Laufzeit ausmacht.
+    """
+    sql, _ = Kosten.insert({field: None for field in IMPORT_FIELDS}).sql()
+    started = time.perf_counter()
+    try:
+        db.cursor().executemany(sql, ([row[field.name] for field in IMPORT_FIELDS] for row in rows))
+    finally:
+        record_query(sql, None, time.perf_counter() - started)
+
+@app.route('/api/import', methods=['POST'])
+@login_required
+def import_kosten():
+    """
+    Importiert Kosten aus einer CSV- oder NDJSON-Datei (z.B. aus /api/export).
+    Pflichtspalten: bezeichnung, betrag, zahlungstag, konto. Optional: cost_type,
+    bezahlt, exclude_from_total, month, year (Fallback: Query-Parameter month/year).
+    Die Datei kommt als Multipart-Feld "file" oder direkt als Request-Body.
+
+    Einträge, die es mit gleicher (bezeichnung, konto, month, year) schon gibt,
+    werden übersprungen, mit ?duplicates=import trotzdem angelegt; gemeldet
+    werden sie in beiden Fällen. Ist eine Zeile ungültig, wird nichts importiert (400),
+    ebenso bei Zeilen für archivierte Monate (409).
+    """
+    try:
+        user_id = get_current_user_id()
+        if not user_id:
+            return jsonify({'success': False, 'error': 'Nicht authentifiziert'}), 401
+        
+        skip_duplicates = request.args.get('duplicates', 'skip') != 'import'
+        default_month, default_year = get_month_year_args()
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        
+        # 1. Datei zeilenweise lesen und validieren, noch nichts schreiben
+        rows = []
+        errors = []
+        try:
+            for line_no, row in read_import_rows(stream):
+                if len(rows) + len(errors) >= IMPORT_MAX_ROWS:
+                    return jsonify({'success': False, 'error': f'Maximal {IMPORT_MAX_ROWS} Zeilen pro Import'}), 400
+                try:
+                    rows.append((line_no, validate_import_row(row, default_month, default_year)))
+                except (TypeError, ValueError) as e:
+                    errors.append({'line': line_no, 'error': str(e) if isinstance(e, ValueError) else 'Ungültige Werte'})
+        except (UnicodeDecodeError, csv.Error):
+            return jsonify({'success': False, 'error': 'Datei ist keine gültige UTF-8 CSV/NDJSON-Datei'}), 400
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        if errors:
+            return jsonify({'success': False, 'error': f'{len(errors)} ungültige Zeilen',
+                            'errors': errors[:IMPORT_MAX_ERRORS]}), 400
+        if not rows:
+            return jsonify({'success': False, 'error': 'Keine Einträge in der Datei'}), 400
+        
+        months = {(fields['month'], fields['year']) for _, fields in rows}
+        
+        # 2. Duplikate prüfen, Positionen vergeben und in einer Transaktion schreiben
+        duplicates = []
+        with db.atomic('IMMEDIATE'):
+            closed = archived_month_keys(user_id, months)
+            if closed:
+                return jsonify({'success': False, 'error': ARCHIVED_ERROR,
+                                'months': [{'month': month, 'year': year} for month, year in sorted(closed)]}), 409
+            konto_ids, _ = get_konto_ids(user_id, {fields['konto'] for _, fields in rows})
+            for _, fields in rows:
+                fields['konto'] = konto_ids[fields['konto']]
+            existing, next_positions = load_import_state(user_id, months)
+            
+            inserts = []
+            for line_no, fields in rows:
+                key = (fields['bezeichnung'], fields['konto'], fields['month'], fields['year'])
+                if key in existing:
+                    duplicates.append(line_no)
+                    if skip_duplicates:
+                        continue
+                existing.add(key)  # Duplikate innerhalb der Datei
+                
+                position_key = (fields['konto'], fields['month'], fields['year'])
+                position = next_positions.get(position_key, POSITION_STEP)
+                next_positions[position_key] = position + POSITION_STEP
+                inserts.append(dict(fields, user=user_id, position=position))
+            
+            if inserts:
+                bulk_insert_kosten(inserts)
+                # Ausgeschlossene Konten als Monats-Einstellung übernehmen
+                excluded = sorted({(row['konto'], row['year'], row['month'])
+                                   for row in inserts if row['exclude_from_total']})
+                for batch in chunked(excluded, BATCH_CHUNK_SIZE):
+                    (KontoMonth
+                     .insert_many([{'konto': konto_id, 'year': year, 'month': month, 'exclude_from_total': True}
+                                   for konto_id, year, month in batch])
+                     .on_conflict_replace()
+                     .execute())
+                bump_versions(user_id, {(row['month'], row['year']) for row in inserts}, konten=True)
+        
+        return jsonify({
+            'success': True,
+            'imported': len(inserts),
+            'duplicates': len(duplicates),
+            'skipped': len(duplicates) if skip_duplicates else 0,
+            'duplicate_lines': duplicates[:IMPORT_MAX_ERRORS]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # Admin-Bereich mit Secret-Token
 ADMIN_SECRET = os.environ.get('ADMIN_SECRET', 'verwalco-admin-2026-secret')  # Ändern Sie dies zu einem sicheren Token
 
+ADMIN_PAGE_SIZE = 50
+ADMIN_DELETE_CHUNK_SIZE = 5000  # Kosten pro DELETE beim Löschen eines Users
+
+def count_user_data(user_ids):
+    """
+    Anzahl Kosten, Anzahl Monate und letzter Monat mit Daten je User, gelesen
+    aus den Monatssummen (zählen auch die Einträge aus Vorlagen). Eine
+    Abfrage pro Datenbank-Datei, die User der Seite enthält.
+    """
+    key = month_key(KostenMonthSummary.month, KostenMonthSummary.year)
+    
+    def query(ids):
+        return (KostenMonthSummary
+                .select(KostenMonthSummary.user, fn.SUM(KostenMonthSummary.count),
+                        fn.COUNT(key.distinct()), fn.MAX(key))
+                .where(KostenMonthSummary.user.in_(ids))
+                .group_by(KostenMonthSummary.user)
+                .tuples())
+    
+    if not SHARD_DIR:
+        return {row[0]: row[1:] for row in query(user_ids)}
+    
+    groups = {}
+    for user_id in user_ids:
+        groups.setdefault(shard_path(user_id), []).append(user_id)
+    counts = {}
+    for path, ids in groups.items():
+        # User ohne eigene Datei haben noch keine Daten
+        if os.path.exists(path):
+            with bound_database(db.database_for(path)):
+                counts.update((row[0], row[1:]) for row in query(ids))
+    return counts
+
+def query_admin_users(search=None, after_id=0, limit=ADMIN_PAGE_SIZE):
+    """
+    User-Liste für den Admin-Bereich mit Anzahl Kosten, Anzahl Monate und
+    letztem Monat mit Daten (siehe count_user_data).
+
+    Keyset-Pagination über die User-ID: es werden die nächsten `limit`
+    User mit id > after_id geliefert.
+    """
+    query = (User
+             .select(User.id, User.username, User.email, User.created_at)
+             .where(User.id > after_id)
+             .order_by(User.id)
+             .limit(limit)
+             .dicts())
+    
+    if search:
+        query = query.where(User.username.contains(search) | User.email.contains(search))
+    
+    rows = list(query)
+    counts = count_user_data([row['id'] for row in rows])
+    
+    users_data = []
+    for row in rows:
+        kosten_count, month_count, last_month = counts.get(row['id'], (0, 0, None))
+        users_data.append({
+            'id': row['id'],
+            'username': row['username'],
+            'email': row['email'],
+            'created_at': row['created_at'].strftime('%d.%m.%Y %H:%M') if row['created_at'] else 'N/A',
+            'kosten_count': kosten_count,
+            'month_count': month_count,
+            'last_activity': f'{last_month % 100:02d}/{last_month // 100}' if last_month else None
+        })
+    return users_data
+
+def get_admin_users_page():
+    """Liest Suche und Keyset-Parameter aus der Anfrage und liefert eine Seite"""
+    search = request.args.get('q', '').strip() or None
+    after_id = request.args.get('after', 0, type=int)
+    limit = min(request.args.get('limit', ADMIN_PAGE_SIZE, type=int), 500)
+    
+    users_data = query_admin_users(search, after_id, limit)
+    
+    total_query = User.select()
+    if search:
+        total_query = total_query.where(User.username.contains(search) | User.email.contains(search))
+    
+    return {
+        'users': users_data,
+        'total': total_query.count(),
+        'search': search,
+        'next_after': users_data[-1]['id'] if len(users_data) == limit else None
+    }
+
 @app.route('/admin/users/<secret>')
 def admin_users(secret):
     """Admin-Seite zur User-Verwaltung mit Secret-Token"""
     if secret != ADMIN_SECRET:
         return "Zugriff verweigert", 403
     
-    # Hole alle User mit Anzahl ihrer Kosten
-    users_data = []
-    for user in User.select():
-        kosten_count = Kosten.select().where(Kosten.user == user).count()
-        users_data.append({
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'created_at': user.created_at.strftime('%d.%m.%Y %H:%M') if hasattr(user, 'created_at') else 'N/A',
-            'kosten_count': kosten_count
-        })
+    page = get_admin_users_page()
+    return render_template('admin_users.html', secret=secret, **page)
+
+@app.route('/admin/users/<secret>/json')
+def admin_users_json(secret):
+    """JSON-Variante der User-Liste (gleiche Parameter: q, after, limit)"""
+    if secret != ADMIN_SECRET:
+        return jsonify({'success': False, 'error': 'Zugriff verweigert'}), 403
+    
+    return jsonify(get_admin_users_page())
+
+def delete_user_data(user_id):
+    """Löscht alle Kosten-Daten des Users aus der gebundenen Datenbank"""
+    # Lösche alle Kosten des Users in Blöcken, jeder Block in einer eigenen
+    # Transaktion, damit die Schreibsperre nicht lange gehalten wird
+    while True:
+        with db.atomic():
+            chunk = (Kosten
+                     .select(Kosten.id)
+                     .where(Kosten.user == user_id)
+                     .limit(ADMIN_DELETE_CHUNK_SIZE))
+            deleted = Kosten.delete().where(Kosten.id.in_(chunk)).execute()
+        if deleted < ADMIN_DELETE_CHUNK_SIZE:
+            break
     
-    return render_template('admin_users.html', users=users_data, secret=secret)
+    # Lösche alle übrigen zugehörigen Daten
+    with db.atomic():
+        # Restliche Kosten (falls zwischenzeitlich neue angelegt wurden)
+        Kosten.delete().where(Kosten.user == user_id).execute()
+        
+        # Lösche Versionszähler und Monatssummen
+        KostenVersion.delete().where(KostenVersion.user == user_id).execute()
+        KostenMonthSummary.delete().where(KostenMonthSummary.user == user_id).execute()
+        
+        # Lösche Vorlagen, angelegte Monate und das Archiv
+        RecurringTemplate.delete().where(RecurringTemplate.user == user_id).execute()
+        KostenMonth.delete().where(KostenMonth.user == user_id).execute()
+        KostenArchive.delete().where(KostenArchive.user == user_id).execute()
+        
+        # Lösche die Konten samt Monats-Einstellungen
+        KontoMonth.delete().where(KontoMonth.konto.in_(Konto.select(Konto.id).where(Konto.user == user_id))).execute()
+        Konto.delete().where(Konto.user == user_id).execute()
+        
+        # Zuletzt: die Löschungen oben legen selbst Tombstones an
+        KostenTombstone.delete().where(KostenTombstone.user == user_id).execute()
+
+def remove_user_database(user_id):
+    """Löscht die Shard-Datei des Users samt WAL (nur bei einer Datei pro User)"""
+    path = shard_path(user_id)
+    db.forget(path)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
 
 @app.route('/admin/users/<secret>/delete/<int:user_id>', methods=['POST'])
 def admin_delete_user(secret, user_id):
@@ -657,16 +3801,18 @@ def admin_delete_user(secret, user_id):
         
         username = user.username
         
-        # Lösche alle zugehörigen Daten
-        with db.atomic():
-            # Lösche alle Kosten des Users
-            Kosten.delete().where(Kosten.user == user).execute()
-            
-            # Lösche alle PasswordReset-Einträge
+        if SHARD_DIR and SHARD_BUCKETS == 0:
+            # Eigene Datei pro User: die Datei löschen statt der Zeilen
+            remove_user_database(user_id)
+        else:
+            with user_database(user_id):
+                delete_user_data(user_id)
+        
+        # Lösche alle PasswordReset-Einträge und den User
+        with auth_db.atomic():
             PasswordReset.delete().where(PasswordReset.user == user).execute()
-            
-            # Lösche den User
             user.delete_instance()
+        invalidate_user_cache(user_id)
         
         return jsonify({
             'success': True,
@@ -675,12 +3821,400 @@ def admin_delete_user(secret, user_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/metrics')
+def metrics():
+    """
+    Prometheus-Metriken aller Worker.
+    Geschützt über ADMIN_SECRET: Header "Authorization: Bearer <secret>" oder ?secret=
+    """
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ').strip() or request.args.get('secret')
+    if not token or not secrets.compare_digest(token, ADMIN_SECRET):
+        return "Zugriff verweigert", 403
+    
+    request_metrics.flush(force=True)
+    return app.response_class(render_metrics(collect_metrics()),
+                              mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+# Schema-Migrationen
+# Die aktuelle Schema-Version steht in PRAGMA user_version der SQLite-Datei.
+# Neue Migrationen werden unten mit fortlaufender Nummer angehängt und laufen
+# beim App-Start genau einmal pro Datenbank.
+#
+# Migrationen enthalten das Schema ihrer Version als festes SQL und rufen
+# weder Models (create_tables) noch kosten_view oder andere Abfragen auf:
+# die kennen immer nur das neueste Schema, eine ältere Datenbank hat die
+# Tabellen und Spalten späterer Migrationen noch nicht. Trigger und
+# abgeleitete Daten (Monatssummen, Suchindex) baut refresh_derived_data()
+# nach der letzten Migration mit dem aktuellen Code neu auf.
+MODELS = [User, PasswordReset, Konto, KontoMonth, RecurringTemplate, KostenMonth, Kosten, KostenArchive,
+          KostenVersion, KostenMonthSummary, MaintenanceRun, SyncSequence, KostenTombstone]
+MIGRATIONS = []
+
+def migration(version, rebuild=()):
+    """
+    Registriert eine Migrationsfunktion für die angegebene Schema-Version.
+    rebuild: abgeleitete Daten ('summaries', 'search'), die nach der letzten
+    Migration neu berechnet werden müssen.
+    """
+    def decorator(f):
+        MIGRATIONS.append((version, f, frozenset(rebuild)))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return f
+    return decorator
+
+def get_schema_version():
+    return db.execute_sql('PRAGMA user_version').fetchone()[0]
+
+def set_schema_version(version):
+    db.execute_sql(f'PRAGMA user_version = {int(version)}')
+
+def execute_statements(*statements):
+    for statement in statements:
+        db.execute_sql(statement)
+
+def table_columns(table):
+    return [column.name for column in db.get_columns(table)]
+
+@migration(1)
+def migrate_kosten_indexes():
+    """Composite-Indizes für die Monatsabfragen auf der kosten-Tabelle"""
+    db.execute_sql(
+        'CREATE INDEX IF NOT EXISTS "kosten_user_id_year_month_konto_position_zahlungstag" '
+        'ON "kosten" ("user_id", "year", "month", "konto", "position", "zahlungstag")'
+    )
+    db.execute_sql(
+        'CREATE INDEX IF NOT EXISTS "kosten_user_id_konto_position" '
+        'ON "kosten" ("user_id", "konto", "position")'
+    )
+    db.execute_sql('ANALYZE "kosten"')
+
+@migration(2)
+def migrate_kosten_versions():
+    """Tabelle für die ETag-Versionszähler"""
+    execute_statements(
+        'CREATE TABLE IF NOT EXISTS "kosten_versions" ("id" INTEGER NOT NULL PRIMARY KEY, '
+        '"user_id" INTEGER NOT NULL, "year" INTEGER NOT NULL, "month" INTEGER NOT NULL, '
+        '"version" INTEGER NOT NULL, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE)',
+        'CREATE INDEX IF NOT EXISTS "kostenversion_user_id" ON "kosten_versions" ("user_id")',
+        'CREATE UNIQUE INDEX IF NOT EXISTS "kostenversion_user_id_year_month" '
+        'ON "kosten_versions" ("user_id", "year", "month")',
+    )
+
+@migration(3)
+def migrate_month_summaries():
+    """Tabelle für die Monatssummen (in Migration 4 auf Konto-IDs umgebaut)"""
+    execute_statements(
+        'CREATE TABLE IF NOT EXISTS "kosten_month_summaries" ("id" INTEGER NOT NULL PRIMARY KEY, '
+        '"user_id" INTEGER NOT NULL, "year" INTEGER NOT NULL, "month" INTEGER NOT NULL, '
+        '"konto" VARCHAR(255) NOT NULL, "count" INTEGER NOT NULL, "total" REAL NOT NULL, "paid" REAL NOT NULL, '
+        '"included_total" REAL NOT NULL, "included_paid" REAL NOT NULL, "excluded" INTEGER NOT NULL, '
+        'FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE)',
+        'CREATE INDEX IF NOT EXISTS "kostenmonthsummary_user_id" ON "kosten_month_summaries" ("user_id")',
+        'CREATE UNIQUE INDEX IF NOT EXISTS "kostenmonthsummary_user_id_year_month_konto" '
+        'ON "kosten_month_summaries" ("user_id", "year", "month", "konto")',
+    )
+
+@migration(4)
+def migrate_konten():
+    """
+    Eigene Tabelle für Konten: kosten.konto (Name) wird zu kosten.konto_id,
+    der Ausschluss je Monat landet in konto_months. SQLite kann Spalten nicht
+    umbauen, daher wird die kosten-Tabelle neu angelegt und kopiert.
+    """
+    execute_statements(
+        'CREATE TABLE IF NOT EXISTS "konten" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, '
+        '"name" VARCHAR(255) NOT NULL, "exclude_from_total" INTEGER NOT NULL, '
+        'FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE)',
+        'CREATE INDEX IF NOT EXISTS "konto_user_id" ON "konten" ("user_id")',
+        'CREATE UNIQUE INDEX IF NOT EXISTS "konto_user_id_name" ON "konten" ("user_id", "name")',
+        'CREATE TABLE IF NOT EXISTS "konto_months" ("id" INTEGER NOT NULL PRIMARY KEY, '
+        '"konto_id" INTEGER NOT NULL, "year" INTEGER NOT NULL, "month" INTEGER NOT NULL, '
+        '"exclude_from_total" INTEGER NOT NULL, '
+        'FOREIGN KEY ("konto_id") REFERENCES "konten" ("id") ON DELETE CASCADE)',
+        'CREATE INDEX IF NOT EXISTS "kontomonth_konto_id" ON "konto_months" ("konto_id")',
+        'CREATE UNIQUE INDEX IF NOT EXISTS "kontomonth_konto_id_year_month" '
+        'ON "konto_months" ("konto_id", "year", "month")',
+    )
+    db.execute_sql(
+        'INSERT INTO "konten" ("user_id", "name", "exclude_from_total") '
+        'SELECT "user_id", "konto", 0 FROM "kosten" GROUP BY "user_id", "konto"'
+    )
+    # Bisher stand der Ausschluss an jeder einzelnen Kosten-Zeile
+    db.execute_sql(
+        'INSERT INTO "konto_months" ("konto_id", "year", "month", "exclude_from_total") '
+        'SELECT "k"."id", "o"."year", "o"."month", 1 FROM "kosten" AS "o" '
+        'JOIN "konten" AS "k" ON "k"."user_id" = "o"."user_id" AND "k"."name" = "o"."konto" '
+        'GROUP BY "k"."id", "o"."year", "o"."month" HAVING MAX("o"."exclude_from_total") = 1'
+    )
+    
+    indexes = db.execute_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'kosten' AND sql IS NOT NULL"
+    ).fetchall()
+    for name, in indexes:
+        db.execute_sql(f'DROP INDEX "{name}"')
+    db.execute_sql('ALTER TABLE "kosten" RENAME TO "kosten_old"')
+    execute_statements(
+        'CREATE TABLE "kosten" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, '
+        '"bezeichnung" VARCHAR(255) NOT NULL, "betrag" REAL NOT NULL, "zahlungstag" INTEGER NOT NULL, '
+        '"konto_id" INTEGER NOT NULL, "bezahlt" INTEGER NOT NULL, "position" INTEGER NOT NULL, '
+        '"cost_type" VARCHAR(255) NOT NULL, "month" INTEGER NOT NULL, "year" INTEGER NOT NULL, '
+        'FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE, '
+        'FOREIGN KEY ("konto_id") REFERENCES "konten" ("id") ON DELETE CASCADE)',
+        'CREATE INDEX "kosten_user_id" ON "kosten" ("user_id")',
+        'CREATE INDEX "kosten_konto_id" ON "kosten" ("konto_id")',
+        'CREATE INDEX "kosten_user_id_year_month_konto_id_position_zahlungstag" '
+        'ON "kosten" ("user_id", "year", "month", "konto_id", "position", "zahlungstag")',
+    )
+    db.execute_sql(
+        'INSERT INTO "kosten" ("id", "user_id", "bezeichnung", "betrag", "zahlungstag", "konto_id", '
+        '"bezahlt", "position", "cost_type", "month", "year") '
+        'SELECT "o"."id", "o"."user_id", "o"."bezeichnung", "o"."betrag", "o"."zahlungstag", "k"."id", '
+        '"o"."bezahlt", "o"."position", "o"."cost_type", "o"."month", "o"."year" FROM "kosten_old" AS "o" '
+        'JOIN "konten" AS "k" ON "k"."user_id" = "o"."user_id" AND "k"."name" = "o"."konto"'
+    )
+    db.execute_sql('DROP TABLE "kosten_old"')
+    
+    # Monatssummen jetzt je Konto-ID (befüllt nach der letzten Migration, siehe Migration 5)
+    execute_statements(
+        'DROP TABLE IF EXISTS "kosten_month_summaries"',
+        'CREATE TABLE "kosten_month_summaries" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, '
+        '"year" INTEGER NOT NULL, "month" INTEGER NOT NULL, "konto_id" INTEGER NOT NULL, '
+        '"count" INTEGER NOT NULL, "total" REAL NOT NULL, "paid" REAL NOT NULL, '
+        'FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE, '
+        'FOREIGN KEY ("konto_id") REFERENCES "konten" ("id") ON DELETE CASCADE)',
+        'CREATE INDEX "kostenmonthsummary_user_id" ON "kosten_month_summaries" ("user_id")',
+        'CREATE INDEX "kostenmonthsummary_konto_id" ON "kosten_month_summaries" ("konto_id")',
+        'CREATE UNIQUE INDEX "kostenmonthsummary_user_id_year_month_konto_id" '
+        'ON "kosten_month_summaries" ("user_id", "year", "month", "konto_id")',
+    )
+
+@migration(5, rebuild=['summaries'])
+def migrate_recurring_templates():
+    """
+    Vorlagen für wiederkehrende Kosten und angelegte Monate. Bestehende
+    Zeilen bleiben unverändert, beim nächsten Monatswechsel werden ihre
+    wiederkehrenden Kosten zu Vorlagen. Die Monatssummen werden danach
+    komplett neu berechnet (mit den Einträgen aus Vorlagen).
+    """
+    execute_statements(
+        'CREATE TABLE IF NOT EXISTS "recurring_templates" ("id" INTEGER NOT NULL PRIMARY KEY, '
+        '"user_id" INTEGER NOT NULL, "bezeichnung" VARCHAR(255) NOT NULL, "betrag" REAL NOT NULL, '
+        '"zahlungstag" INTEGER NOT NULL, "konto_id" INTEGER NOT NULL, "position" INTEGER NOT NULL, '
+        '"valid_from" INTEGER NOT NULL, "valid_to" INTEGER, '
+        'FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE, '
+        'FOREIGN KEY ("konto_id") REFERENCES "konten" ("id") ON DELETE CASCADE)',
+        'CREATE INDEX IF NOT EXISTS "recurringtemplate_user_id" ON "recurring_templates" ("user_id")',
+        'CREATE INDEX IF NOT EXISTS "recurringtemplate_konto_id" ON "recurring_templates" ("konto_id")',
+        'CREATE INDEX IF NOT EXISTS "recurringtemplate_user_id_valid_from" '
+        'ON "recurring_templates" ("user_id", "valid_from")',
+        'CREATE TABLE IF NOT EXISTS "kosten_months" ("id" INTEGER NOT NULL PRIMARY KEY, '
+        '"user_id" INTEGER NOT NULL, "year" INTEGER NOT NULL, "month" INTEGER NOT NULL, '
+        'FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE)',
+        'CREATE INDEX IF NOT EXISTS "kostenmonth_user_id" ON "kosten_months" ("user_id")',
+        'CREATE UNIQUE INDEX IF NOT EXISTS "kostenmonth_user_id_year_month" '
+        'ON "kosten_months" ("user_id", "year", "month")',
+    )
+    # Frühere Fassungen von Migration 4 haben kosten im damals neuesten Schema angelegt
+    if 'template_id' not in table_columns('kosten'):
+        db.execute_sql('ALTER TABLE "kosten" ADD COLUMN "template_id" INTEGER '
+                       'REFERENCES "recurring_templates" ("id")')
+    db.execute_sql(
+        'CREATE UNIQUE INDEX IF NOT EXISTS "kosten_template_id_year_month" '
+        'ON "kosten" ("template_id", "year", "month") WHERE "template_id" IS NOT NULL'
+    )
+    db.execute_sql('ANALYZE')
+
+@migration(6)
+def migrate_maintenance():
+    """Archiv-Tabelle, Protokoll der Wartungsläufe und Index auf password_resets.expires_at"""
+    execute_statements(
+        'CREATE TABLE IF NOT EXISTS "kosten_archive" ("id" INTEGER NOT NULL PRIMARY KEY, '
+        '"user_id" INTEGER NOT NULL, "bezeichnung" VARCHAR(255) NOT NULL, "betrag" REAL NOT NULL, '
+        '"zahlungstag" INTEGER NOT NULL, "konto_id" INTEGER NOT NULL, "bezahlt" INTEGER NOT NULL, '
+        '"position" INTEGER NOT NULL, "cost_type" VARCHAR(255) NOT NULL, "month" INTEGER NOT NULL, '
+        '"year" INTEGER NOT NULL, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE, '
+        'FOREIGN KEY ("konto_id") REFERENCES "konten" ("id") ON DELETE CASCADE)',
+        'CREATE INDEX IF NOT EXISTS "kostenarchive_user_id" ON "kosten_archive" ("user_id")',
+        'CREATE INDEX IF NOT EXISTS "kostenarchive_konto_id" ON "kosten_archive" ("konto_id")',
+        'CREATE INDEX IF NOT EXISTS "kostenarchive_user_id_year_month" '
+        'ON "kosten_archive" ("user_id", "year", "month")',
+    )
+    # Shard-Dateien enthalten nur die Kosten-Tabellen
+    if current_database() is auth_db:
+        execute_statements(
+            'CREATE TABLE IF NOT EXISTS "maintenance_runs" ("id" INTEGER NOT NULL PRIMARY KEY, '
+            '"started_at" DATETIME NOT NULL, "finished_at" DATETIME, "report" TEXT)',
+            'CREATE INDEX IF NOT EXISTS "maintenancerun_started_at" ON "maintenance_runs" ("started_at")',
+            'CREATE INDEX IF NOT EXISTS "passwordreset_expires_at" ON "password_resets" ("expires_at")',
+        )
+
+@migration(7)
+def migrate_sync():
+    """Änderungszähler updated_seq und Tombstones für /api/kosten/changes (Trigger: refresh_derived_data)"""
+    execute_statements(
+        'CREATE TABLE IF NOT EXISTS "sync_sequence" ("id" INTEGER NOT NULL PRIMARY KEY, '
+        '"seq" INTEGER NOT NULL, "purged_seq" INTEGER NOT NULL)',
+        # Start bei 1, since=0 steht bei /api/kosten/changes für "alles laden"
+        'INSERT OR IGNORE INTO "sync_sequence" ("id", "seq", "purged_seq") VALUES (1, 1, 0)',
+        'CREATE TABLE IF NOT EXISTS "kosten_tombstones" ("id" INTEGER NOT NULL PRIMARY KEY, '
+        '"user_id" INTEGER NOT NULL, "kosten_id" INTEGER NOT NULL, "month" INTEGER NOT NULL, '
+        '"year" INTEGER NOT NULL, "seq" INTEGER NOT NULL, "created_at" DATETIME NOT NULL, '
+        'FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE)',
+        'CREATE INDEX IF NOT EXISTS "kostentombstone_user_id" ON "kosten_tombstones" ("user_id")',
+        'CREATE INDEX IF NOT EXISTS "kostentombstone_created_at" ON "kosten_tombstones" ("created_at")',
+        'CREATE INDEX IF NOT EXISTS "kostentombstone_user_id_seq" ON "kosten_tombstones" ("user_id", "seq")',
+    )
+    # Frühere Fassungen von Migration 4 und 5 haben die Tabellen schon mit der Spalte angelegt
+    for table in ('konten', 'recurring_templates', 'kosten_months', 'kosten'):
+        if 'updated_seq' not in table_columns(table):
+            db.execute_sql(f'ALTER TABLE "{table}" ADD COLUMN "updated_seq" INTEGER NOT NULL DEFAULT 0')
+
+@migration(8, rebuild=['search'])
+def migrate_search():
+    """FTS5-Index für /api/search, befüllt nach der letzten Migration aus den vorhandenen Kosten"""
+    # Ohne FTS5 im SQLite-Build bleibt die Suche aus (siehe create_search_index)
+    if db.execute_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0]:
+        db.execute_sql(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS "kosten_search" USING fts5("bezeichnung", "konto", "owner", '
+            'tokenize = \'unicode61 remove_diacritics 2\', prefix = \'2 3\')'
+        )
+
+@migration(9, rebuild=['search'])
+def migrate_kosten_autoincrement():
+    """
+    kosten.id mit AUTOINCREMENT: ohne vergibt SQLite die ID des höchsten
+    archivierten oder gelöschten Eintrags neu. Die Tabelle wird neu angelegt,
+    Zeilen, deren ID schon im Archiv steht, bekommen eine neue ID. Clients
+    laden dann über einen reset von /api/kosten/changes alles neu.
+    """
+    # Die Trigger verweisen auf kosten, refresh_derived_data legt sie neu an
+    triggers = db.execute_sql("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall()
+    for name, in triggers:
+        db.execute_sql(f'DROP TRIGGER "{name}"')
+    indexes = db.execute_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'kosten' AND sql IS NOT NULL"
+    ).fetchall()
+    for name, in indexes:
+        db.execute_sql(f'DROP INDEX "{name}"')
+    db.execute_sql('ALTER TABLE "kosten" RENAME TO "kosten_old"')
+    execute_statements(
+        'CREATE TABLE "kosten" ("id" INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, "user_id" INTEGER NOT NULL, '
+        '"bezeichnung" VARCHAR(255) NOT NULL, "betrag" REAL NOT NULL, "zahlungstag" INTEGER NOT NULL, '
+        '"konto_id" INTEGER NOT NULL, "bezahlt" INTEGER NOT NULL, "position" INTEGER NOT NULL, '
+        '"cost_type" VARCHAR(255) NOT NULL, "month" INTEGER NOT NULL, "year" INTEGER NOT NULL, '
+        '"template_id" INTEGER, "updated_seq" INTEGER NOT NULL DEFAULT 0, '
+        'FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE, '
+        'FOREIGN KEY ("konto_id") REFERENCES "konten" ("id") ON DELETE CASCADE, '
+        'FOREIGN KEY ("template_id") REFERENCES "recurring_templates" ("id"))',
+        'INSERT INTO "kosten" ("id", "user_id", "bezeichnung", "betrag", "zahlungstag", "konto_id", "bezahlt", '
+        '"position", "cost_type", "month", "year", "template_id", "updated_seq") '
+        'SELECT "id", "user_id", "bezeichnung", "betrag", "zahlungstag", "konto_id", "bezahlt", '
+        '"position", "cost_type", "month", "year", "template_id", "updated_seq" FROM "kosten_old"',
+        'DROP TABLE "kosten_old"',
+        'CREATE INDEX "kosten_user_id" ON "kosten" ("user_id")',
+        'CREATE INDEX "kosten_konto_id" ON "kosten" ("konto_id")',
+        'CREATE INDEX "kosten_user_id_year_month_konto_id_position_zahlungstag" '
+        'ON "kosten" ("user_id", "year", "month", "konto_id", "position", "zahlungstag")',
+        'CREATE UNIQUE INDEX "kosten_template_id_year_month" '
+        'ON "kosten" ("template_id", "year", "month") WHERE "template_id" IS NOT NULL',
+    )
+    
+    # Höchste je vergebene ID: auch archivierte und gelöschte (Tombstones) Einträge
+    high = db.execute_sql(
+        'SELECT MAX(COALESCE((SELECT MAX("id") FROM "kosten"), 0), '
+        'COALESCE((SELECT MAX("id") FROM "kosten_archive"), 0), '
+        'COALESCE((SELECT MAX("kosten_id") FROM "kosten_tombstones"), 0))'
+    ).fetchone()[0]
+    reused = db.execute_sql(
+        'SELECT "id" FROM "kosten" WHERE "id" IN (SELECT "id" FROM "kosten_archive") ORDER BY "id"'
+    ).fetchall()
+    for kosten_id, in reused:
+        high += 1
+        db.execute_sql('UPDATE "kosten" SET "id" = ? WHERE "id" = ?', (high, kosten_id))
+    execute_statements(
+        'DELETE FROM "sqlite_sequence" WHERE "name" = \'kosten\'',
+        f'INSERT INTO "sqlite_sequence" ("name", "seq") VALUES (\'kosten\', {int(high)})',
+    )
+    if reused:
+        # Clients kennen die alten IDs: alle Stände davor bekommen einen reset
+        db.execute_sql('UPDATE "sync_sequence" SET "seq" = "seq" + 1, "purged_seq" = "seq" + 1 WHERE "id" = 1')
+
+def refresh_derived_data(rebuild=()):
+    """
+    Läuft nach den Migrationen: legt alle Trigger aus dem aktuellen Code neu
+    an (SYNC_TRIGGERS, search_triggers) und berechnet die abgeleiteten Daten
+    aus `rebuild` ('summaries', 'search') über kosten_view neu.
+    """
+    triggers = db.execute_sql("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall()
+    for name, in triggers:
+        db.execute_sql(f'DROP TRIGGER "{name}"')
+    create_sync_triggers()
+    if search_index_exists():
+        create_search_index()
+        if 'search' in rebuild:
+            rebuild_search_index()
+    if 'summaries' in rebuild:
+        KostenMonthSummary.delete().execute()
+        insert_month_summaries()
+
+def run_migrations():
+    """
+    Bringt das Datenbankschema auf den neuesten Stand.
+
+    - Neue Datenbank: alle Tabellen werden direkt im aktuellen Schema erstellt
+    - Bestehende Datenbank: alle Migrationen mit höherer Version als
+      user_version werden der Reihe nach ausgeführt, danach
+      refresh_derived_data()
+
+    Alle ausstehenden Migrationen laufen zusammen in einer IMMEDIATE-Transaktion:
+    schlägt eine fehl, bleibt die Datenbank auf dem alten Stand, und mehrere
+    Gunicorn-Worker migrieren beim gleichzeitigen Start nicht doppelt.
+    """
+    latest = MIGRATIONS[-1][0] if MIGRATIONS else 0
+    executed = []
+
+    with db.atomic('IMMEDIATE'):
+        if not Kosten.table_exists():
+            # Shard-Dateien enthalten nur die Kosten-Tabellen
+            models = MODELS if current_database() is auth_db else [m for m in MODELS if m._meta.database is db]
+            db.create_tables(models, safe=True)
+            create_sync_triggers()
+            create_search_index()
+            set_schema_version(latest)
+            return
+        
+        # Version innerhalb der Schreibsperre lesen
+        current = get_schema_version()
+        rebuild = set()
+        for version, func, derived in MIGRATIONS:
+            if version <= current:
+                continue
+            func()
+            set_schema_version(version)
+            rebuild |= derived
+            executed.append((version, func))
+        if executed:
+            refresh_derived_data(rebuild)
+
+    for version, func in executed:
+        app.logger.info(f'Migration {version} ({func.__name__}) ausgeführt')
+
 # Datenbank-Initialisierung (wird auch mit Gunicorn ausgeführt)
 def init_db():
-    """Erstellt die Datenbank-Tabellen, falls sie nicht existieren"""
-    db.connect()
-    db.create_tables([User, PasswordReset, Kosten], safe=True)
-    db.close()
+    """
+    Erstellt die Datenbank-Tabellen bzw. migriert bestehende Datenbanken.
+    Shard-Dateien werden erst beim ersten Zugriff im Worker migriert.
+    """
+    if SHARD_DIR:
+        os.makedirs(SHARD_DIR, exist_ok=True)
+    auth_db.connect(reuse_if_open=True)
+    try:
+        run_migrations()
+    finally:
+        auth_db.close()
+        # Keine Verbindung im Pool behalten, falls der Prozess danach forkt
+        if isinstance(auth_db, PooledSqliteDatabase):
+            auth_db.close_all()
 
 # Initialisiere Datenbank beim App-Start
 init_db()
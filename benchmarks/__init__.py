@@ -0,0 +1,85 @@
+"""
+Last- und Micro-Benchmarks für Verwalco.
+
+Aufruf über `python -m benchmarks <befehl>`, siehe `python -m benchmarks --help`.
+Die Datenbank wird über DATABASE_PATH gewählt, deshalb wird app.py erst
+importiert, nachdem der Pfad gesetzt ist (siehe load_app).
+"""
+import importlib
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import time
+from datetime import datetime
+
+BENCHMARK_PASSWORD = 'benchmark'
+
+
+def load_app(db_path):
+    """Importiert app.py mit der angegebenen Benchmark-Datenbank"""
+    os.environ['DATABASE_PATH'] = db_path
+    return importlib.import_module('app')
+
+
+def percentile(sorted_values, p):
+    """Perzentil (0-100) einer bereits sortierten Liste, lineare Interpolation"""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def summarize(latencies, elapsed=None):
+    """Kennzahlen einer Liste von Latenzen in Sekunden, Ergebnis in Millisekunden"""
+    values = sorted(latency * 1000 for latency in latencies)
+    result = {
+        'n': len(values),
+        'mean_ms': round(statistics.fmean(values), 3) if values else 0.0,
+        'min_ms': round(values[0], 3) if values else 0.0,
+        'p50_ms': round(percentile(values, 50), 3),
+        'p95_ms': round(percentile(values, 95), 3),
+        'p99_ms': round(percentile(values, 99), 3),
+        'max_ms': round(values[-1], 3) if values else 0.0,
+    }
+    if elapsed:
+        result['throughput_rps'] = round(len(values) / elapsed, 1)
+    return result
+
+
+def seed_parameters_path(db_path):
+    return db_path + '.seed.json'
+
+
+def seed_parameters(db_path):
+    """Parameter, mit denen seed_database die Datenbank erzeugt hat, None wenn unbekannt"""
+    try:
+        with open(seed_parameters_path(db_path), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def run_metadata():
+    """Umgebungsdaten, damit Ergebnisse verschiedener Läufe vergleichbar bleiben"""
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+class Timer:
+    """Kontextmanager, misst die Laufzeit in Sekunden (perf_counter)"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,117 @@
+"""
+Kommandozeile der Benchmarks.
+
+    python -m benchmarks seed --users 200 --months 24 --rows 40 --end 2026-10
+    python -m benchmarks micro --output bench.json
+    python -m benchmarks concurrent --workers 3 --duration 20 --output bench.json
+    python -m benchmarks all --output bench.json
+    python -m benchmarks compare bench.json benchmarks/baseline.json
+    python -m benchmarks passwords --threads 4 --duration 5
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from . import run_metadata, seed_parameters
+
+DEFAULT_DB = os.path.join('benchmarks', 'bench.db')
+
+
+def write_result(result, output):
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f'Ergebnis gespeichert: {output}')
+    else:
+        print(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Verwalco Benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    seed = commands.add_parser('seed', help='Synthetische Datenbank erzeugen')
+    seed.add_argument('--db', default=DEFAULT_DB)
+    seed.add_argument('--users', type=int, default=50)
+    seed.add_argument('--months', type=int, default=12)
+    seed.add_argument('--rows', type=int, default=30, help='Kosten pro User und Monat')
+    seed.add_argument('--seed', type=int, default=42)
+    seed.add_argument('--end', type=lambda value: datetime.strptime(value, '%Y-%m'),
+                      help='Letzter Monat als YYYY-MM (Standard: aktueller Monat)')
+    seed.add_argument('--force', action='store_true', help='Bestehende Datenbank überschreiben')
+    
+    for name, help_text in (('micro', 'Micro-Benchmarks je Route'),
+                            ('concurrent', 'Parallel-Benchmark mit mehreren Prozessen'),
+                            ('all', 'Micro- und Parallel-Benchmark')):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--db', default=DEFAULT_DB)
+        command.add_argument('--output', help='JSON-Datei für das Ergebnis (Standard: stdout)')
+        command.add_argument('--iterations', type=int, default=200)
+        command.add_argument('--routes', nargs='*', help='Nur diese Routen (micro)')
+        command.add_argument('--workers', type=int, default=3)
+        command.add_argument('--duration', type=float, default=10.0, help='Sekunden (concurrent)')
+    
+    passwords = commands.add_parser('passwords', help='Login-Durchsatz je Hash-Einstellung')
+    passwords.add_argument('--db', default=DEFAULT_DB)
+    passwords.add_argument('--output', help='JSON-Datei für das Ergebnis (Standard: stdout)')
+    passwords.add_argument('--methods', nargs='*', help='werkzeug-Methoden, z.B. scrypt:16384:8:1 pbkdf2:sha256:600000')
+    passwords.add_argument('--hash-workers', type=int, nargs='*', default=[1, 2], help='Größen des Hash-Pools')
+    passwords.add_argument('--threads', type=int, default=4, help='Parallele Logins')
+    passwords.add_argument('--duration', type=float, default=5.0, help='Sekunden je Einstellung')
+    
+    compare = commands.add_parser('compare', help='Ergebnis mit Baseline vergleichen')
+    compare.add_argument('current')
+    compare.add_argument('baseline')
+    compare.add_argument('--tolerance', type=float, default=0.25, help='Erlaubte Abweichung (0.25 = 25%%)')
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == 'seed':
+        from .seed import seed_database
+        summary = seed_database(args.db, users=args.users, months=args.months,
+                                rows_per_month=args.rows, seed=args.seed, end=args.end,
+                                force=args.force)
+        print(f'{summary["kosten_rows"]} Kosten für {summary["users"]} User in '
+              f'{summary["seconds"]} s erzeugt: {summary["db_path"]}')
+        return 0
+    
+    if args.command == 'compare':
+        from .compare import compare_results, format_comparison
+        with open(args.current, encoding='utf-8') as f:
+            current = json.load(f)
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        current_seed = current.get('meta', {}).get('seed')
+        baseline_seed = baseline.get('meta', {}).get('seed')
+        if current_seed != baseline_seed:
+            print(f'Warnung: andere Seed-Parameter als die Baseline ({current_seed} statt {baseline_seed}), '
+                  f'die Zahlen sind nicht vergleichbar', file=sys.stderr)
+        rows = compare_results(current, baseline, args.tolerance)
+        print(format_comparison(rows))
+        return 1 if any(row[-1] for row in rows) else 0
+    
+    if not os.path.exists(args.db):
+        parser.error(f'{args.db} existiert nicht, zuerst "python -m benchmarks seed" ausführen')
+    
+    result = {'meta': dict(run_metadata(), db_path=args.db, seed=seed_parameters(args.db))}
+    if args.command == 'passwords':
+        from .passwords import run_passwords
+        result['passwords'] = run_passwords(args.db, methods=args.methods, hash_workers=args.hash_workers,
+                                            threads=args.threads, duration=args.duration)
+        write_result(result, args.output)
+        return 0
+    if args.command in ('micro', 'all'):
+        from .micro import run_micro
+        result['micro'] = run_micro(args.db, iterations=args.iterations, routes=args.routes)
+    if args.command in ('concurrent', 'all'):
+        from .concurrent import run_concurrent
+        result['concurrent'] = run_concurrent(args.db, workers=args.workers, duration=args.duration)
+    write_result(result, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
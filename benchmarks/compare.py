@@ -0,0 +1,43 @@
+"""
+Vergleicht ein Benchmark-Ergebnis mit einer gespeicherten Baseline.
+
+Eine Regression liegt vor, wenn eine Latenz (p50/p95) um mehr als die
+Toleranz steigt oder der Durchsatz im Parallel-Benchmark um mehr als die
+Toleranz sinkt bzw. neue Lock-Fehler auftreten.
+"""
+
+LATENCY_KEYS = ('p50_ms', 'p95_ms')
+
+
+def compare_results(current, baseline, tolerance=0.25):
+    """Liefert eine Liste von (Name, Kennzahl, Baseline, Aktuell, Regression)"""
+    rows = []
+    
+    for route, base in baseline.get('micro', {}).items():
+        cur = current.get('micro', {}).get(route)
+        if not cur:
+            continue
+        for key in LATENCY_KEYS:
+            regression = cur[key] > base[key] * (1 + tolerance)
+            rows.append((f'micro.{route}', key, base[key], cur[key], regression))
+    
+    base = baseline.get('concurrent')
+    cur = current.get('concurrent')
+    if base and cur:
+        rows.append(('concurrent', 'throughput_rps', base['throughput_rps'], cur['throughput_rps'],
+                     cur['throughput_rps'] < base['throughput_rps'] * (1 - tolerance)))
+        for key in LATENCY_KEYS:
+            rows.append(('concurrent', key, base[key], cur[key], cur[key] > base[key] * (1 + tolerance)))
+        rows.append(('concurrent', 'lock_errors', base['lock_errors'], cur['lock_errors'],
+                     cur['lock_errors'] > base['lock_errors']))
+    
+    return rows
+
+
+def format_comparison(rows):
+    lines = [f'{"Benchmark":<32} {"Kennzahl":<15} {"Baseline":>10} {"Aktuell":>10} {"Änderung":>9}']
+    for name, key, base, cur, regression in rows:
+        change = f'{(cur - base) / base * 100:+.1f}%' if base else '-'
+        marker = '  REGRESSION' if regression else ''
+        lines.append(f'{name:<32} {key:<15} {base:>10} {cur:>10} {change:>9}{marker}')
+    return '\n'.join(lines)
@@ -0,0 +1,95 @@
+"""
+Parallel-Benchmark mit mehreren Prozessen (nachgestellte Gunicorn-Worker).
+
+Jeder Prozess importiert app.py selbst und schickt für `duration` Sekunden
+eine gemischte Last aus Lese- und Schreibzugriffen. Ausgewertet werden
+Durchsatz, Latenz-Perzentile und "database is locked"-Fehler.
+"""
+import multiprocessing
+import random
+import time
+
+from . import load_app, summarize
+from .micro import BenchmarkContext
+
+# Gewichtung der Operationen (ungefähr das Verhältnis im Betrieb)
+WORKLOAD = [
+    ('get_kosten', 50),
+    ('get_kosten_summary', 10),
+    ('get_konten', 15),
+    ('update_kosten', 20),
+    ('reorder_kosten', 5),
+]
+
+
+def _request(ctx, operation, user_id):
+    client = ctx.client
+    if operation == 'get_kosten':
+        return client.get(f'/api/kosten?month={ctx.month}&year={ctx.year}')
+    if operation == 'get_kosten_summary':
+        return client.get(f'/api/kosten/summary?month={ctx.month}&year={ctx.year}')
+    if operation == 'get_konten':
+        return client.get('/api/konten')
+    
+    rows = ctx.month_rows(user_id)
+    kosten_id, bezahlt = ctx.rng.choice(rows)
+    if operation == 'update_kosten':
+        return client.put(f'/api/kosten/{kosten_id}', json={'bezahlt': not bezahlt})
+    return client.post('/api/kosten/reorder', json={'id': kosten_id, 'index': 0})
+
+
+def _worker(args):
+    db_path, duration, worker_index, seed = args
+    app = load_app(db_path)
+    ctx = BenchmarkContext(app, seed=seed + worker_index)
+    rng = random.Random(seed + worker_index)
+    operations = [name for name, _ in WORKLOAD]
+    weights = [weight for _, weight in WORKLOAD]
+    
+    samples = []  # (operation, latency, status, locked)
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        user_id = ctx.pick_user(rng.randrange(len(ctx.users)))
+        operation = rng.choices(operations, weights)[0]
+        
+        started = time.perf_counter()
+        try:
+            response = _request(ctx, operation, user_id)
+            status = response.status_code
+            locked = status >= 500 and b'locked' in response.get_data()
+        except app.OperationalError as e:
+            status = 500
+            locked = 'locked' in str(e)
+        samples.append((operation, time.perf_counter() - started, status, locked))
+    
+    if not app.db.is_closed():
+        app.db.close()
+    return samples
+
+
+def run_concurrent(db_path, workers=3, duration=10.0, seed=1):
+    """Startet `workers` Prozesse und fasst deren Messwerte zusammen"""
+    context = multiprocessing.get_context('spawn')
+    started = time.perf_counter()
+    with context.Pool(workers) as pool:
+        per_worker = pool.map(_worker, [(db_path, duration, index, seed) for index in range(workers)])
+    elapsed = time.perf_counter() - started
+    
+    samples = [sample for worker_samples in per_worker for sample in worker_samples]
+    result = summarize([latency for _, latency, _, _ in samples], elapsed=duration)
+    result.update({
+        'workers': workers,
+        'duration_s': duration,
+        'wall_s': round(elapsed, 2),
+        'errors': sum(1 for _, _, status, _ in samples if status >= 400),
+        'lock_errors': sum(1 for *_, locked in samples if locked),
+        'operations': {},
+    })
+    for operation, _ in WORKLOAD:
+        operation_samples = [sample for sample in samples if sample[0] == operation]
+        if operation_samples:
+            result['operations'][operation] = dict(
+                summarize([latency for _, latency, _, _ in operation_samples]),
+                errors=sum(1 for _, _, status, _ in operation_samples if status >= 400),
+                lock_errors=sum(1 for *_, locked in operation_samples if locked))
+    return result
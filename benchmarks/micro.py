@@ -0,0 +1,207 @@
+"""
+Micro-Benchmarks der einzelnen Routen über den Flask-Test-Client.
+
+Jede Route wird `iterations` mal aufgerufen. Vorbereitung und Aufräumen
+(z.B. Löschen angelegter Einträge) laufen außerhalb der Zeitmessung.
+"""
+import random
+
+from . import BENCHMARK_PASSWORD, Timer, load_app, summarize
+
+
+class BenchmarkContext:
+    """Gemeinsamer Zustand: App, eingeloggter Client und Testdaten"""
+
+    def __init__(self, app, seed=1):
+        self.app = app
+        self.rng = random.Random(seed)
+        self.client = app.app.test_client()
+        
+        self.users = list(app.User.select(app.User.id, app.User.username).order_by(app.User.id).tuples())
+        latest = None
+        if self.users:
+            # Alle User haben dieselben Monate, mit SHARD_DIR reicht die Datei des ersten
+            with app.user_database(self.users[0][0]):
+                latest = (app.Kosten
+                          .select(app.Kosten.year, app.Kosten.month)
+                          .order_by(app.Kosten.year.desc(), app.Kosten.month.desc())
+                          .tuples()
+                          .first())
+        if not latest:
+            raise RuntimeError('Benchmark-Datenbank ist leer, zuerst "python -m benchmarks seed" ausführen')
+        self.year, self.month = latest
+        self.current_user = None
+    
+    def login(self, user_id, username):
+        """Setzt die Session direkt, ohne den teuren Login-Request"""
+        if self.current_user == user_id:
+            return
+        with self.client.session_transaction() as session:
+            session['user_id'] = user_id
+            session['username'] = username
+        self.current_user = user_id
+    
+    def pick_user(self, index):
+        user_id, username = self.users[index % len(self.users)]
+        self.login(user_id, username)
+        return user_id
+    
+    def month_rows(self, user_id):
+        # Über die Sicht, damit auch virtuelle Einträge aus Vorlagen dabei sind
+        view = self.app.kosten_view(user_id, [(self.month, self.year)])
+        with self.app.user_database(user_id):
+            return list(self.app.select_view(view, view.c.id, view.c.bezahlt)
+                        .order_by(view.c.konto, view.c.position)
+                        .tuples())
+
+
+def bench_get_kosten(ctx, index):
+    ctx.pick_user(index)
+    return ctx.client.get(f'/api/kosten?month={ctx.month}&year={ctx.year}'), None
+
+
+def bench_get_kosten_summary(ctx, index):
+    ctx.pick_user(index)
+    return ctx.client.get(f'/api/kosten/summary?month={ctx.month}&year={ctx.year}'), None
+
+
+def bench_get_report(ctx, index):
+    # Letzte 12 Monate, wie ein Jahresdiagramm
+    ctx.pick_user(index)
+    return ctx.client.get(f'/api/report?from={ctx.year - 1}-{ctx.month:02d}&to={ctx.year}-{ctx.month:02d}'), None
+
+
+def bench_get_bootstrap(ctx, index):
+    ctx.pick_user(index)
+    return ctx.client.get(f'/api/bootstrap?month={ctx.month}&year={ctx.year}'), None
+
+
+def bench_get_kosten_changes(ctx, index):
+    # Abgleich des Clients nach ein paar Änderungen seit dem letzten Stand
+    user_id = ctx.pick_user(index)
+    with ctx.app.user_database(user_id):
+        since = max(1, ctx.app.current_sync_seq() - 50)
+    return ctx.client.get(f'/api/kosten/changes?since={since}&month={ctx.month}&year={ctx.year}'), None
+
+
+def bench_get_konten(ctx, index):
+    ctx.pick_user(index)
+    return ctx.client.get('/api/konten'), None
+
+
+def bench_add_kosten(ctx, index):
+    ctx.pick_user(index)
+    response = ctx.client.post('/api/kosten', json={
+        'bezeichnung': f'Benchmark {index}',
+        'betrag': '1.234,56',
+        'zahlungstag': 15,
+        'konto': 'Girokonto',
+        'month': ctx.month,
+        'year': ctx.year
+    })
+    
+    def cleanup():
+        data = response.get_json() or {}
+        if data.get('success'):
+            with ctx.app.user_database(ctx.current_user):
+                ctx.app.Kosten.delete().where(ctx.app.Kosten.id == data['data']['id']).execute()
+                ctx.app.refresh_month_summaries(ctx.current_user, [(ctx.month, ctx.year)])
+    return response, cleanup
+
+
+def bench_update_kosten(ctx, index):
+    user_id = ctx.pick_user(index)
+    kosten_id, bezahlt = ctx.rng.choice(ctx.month_rows(user_id))
+    return ctx.client.put(f'/api/kosten/{kosten_id}?totals=1', json={'bezahlt': not bezahlt}), None
+
+
+def bench_reorder_kosten(ctx, index):
+    user_id = ctx.pick_user(index)
+    rows = ctx.month_rows(user_id)
+    kosten_id, _ = ctx.rng.choice(rows)
+    return ctx.client.post('/api/kosten/reorder', json={'id': kosten_id, 'index': 0}), None
+
+
+def bench_create_new_month(ctx, index):
+    # Jeder User wird höchstens einmal in den Folgemonat übertragen
+    user_id = ctx.pick_user(index)
+    month, year = ctx.app.get_next_month(ctx.month, ctx.year)
+    response = ctx.client.post('/api/create-month', json={'month': month, 'year': year})
+    
+    def cleanup():
+        app = ctx.app
+        with app.user_database(user_id):
+            app.KostenMonth.delete().where((app.KostenMonth.user == user_id) &
+                                           (app.KostenMonth.month == month) &
+                                           (app.KostenMonth.year == year)).execute()
+            app.Kosten.delete().where((app.Kosten.user == user_id) &
+                                      (app.Kosten.month == month) &
+                                      (app.Kosten.year == year)).execute()
+            app.RecurringTemplate.delete().where((app.RecurringTemplate.user == user_id) &
+                                                 (app.RecurringTemplate.valid_from ==
+                                                  app.month_key(month, year))).execute()
+            app.refresh_month_summaries(user_id, [(month, year)])
+    return response, cleanup
+
+
+def bench_get_admin_users(ctx, index):
+    ctx.pick_user(index)
+    return ctx.client.get(f'/admin/users/{ctx.app.ADMIN_SECRET}'), None
+
+
+def bench_login(ctx, index):
+    _, username = ctx.users[index % len(ctx.users)]
+    client = ctx.app.app.test_client()
+    return client.post('/login', data={'username': username, 'password': BENCHMARK_PASSWORD}), None
+
+
+ROUTES = {
+    'get_kosten': bench_get_kosten,
+    'get_kosten_summary': bench_get_kosten_summary,
+    'get_konten': bench_get_konten,
+    'get_bootstrap': bench_get_bootstrap,
+    'get_kosten_changes': bench_get_kosten_changes,
+    'get_report': bench_get_report,
+    'add_kosten': bench_add_kosten,
+    'update_kosten': bench_update_kosten,
+    'reorder_kosten': bench_reorder_kosten,
+    'create_new_month': bench_create_new_month,
+    'admin_users': bench_get_admin_users,
+    'login': bench_login,
+}
+
+# Routen mit teurem bzw. einmaligem Aufruf pro User laufen mit weniger Iterationen
+MAX_ITERATIONS = {
+    'login': 50,
+}
+
+
+def run_micro(db_path, iterations=200, routes=None, seed=1):
+    """Führt die Micro-Benchmarks aus und liefert die Kennzahlen je Route"""
+    app = load_app(db_path)
+    app.db.connect(reuse_if_open=True)
+    try:
+        ctx = BenchmarkContext(app, seed=seed)
+        results = {}
+        for name in routes or ROUTES:
+            bench = ROUTES[name]
+            count = min(iterations, MAX_ITERATIONS.get(name, iterations))
+            if name == 'create_new_month':
+                count = min(count, len(ctx.users))
+            
+            latencies = []
+            errors = 0
+            for index in range(count):
+                with Timer() as timer:
+                    response, cleanup = bench(ctx, index)
+                latencies.append(timer.elapsed)
+                if response.status_code >= 400:
+                    errors += 1
+                if cleanup:
+                    cleanup()
+            
+            results[name] = dict(summarize(latencies), errors=errors)
+        return results
+    finally:
+        if not app.db.is_closed():
+            app.db.close()
@@ -0,0 +1,107 @@
+"""
+Login-Durchsatz je Einstellung des Passwort-Hashings.
+
+Für jede Kombination aus Hash-Methode und Pool-Größe bekommen alle
+Benchmark-User einen Hash mit dieser Methode. Dann schicken `threads`
+Threads für `duration` Sekunden Logins (wie ein Gunicorn-Worker mit
+gthread). Ein weiterer Thread ruft parallel /api/kosten auf und zeigt,
+wie stark die Logins den normalen Traffic bremsen.
+"""
+import threading
+import time
+
+from werkzeug.security import generate_password_hash
+
+from . import BENCHMARK_PASSWORD, Timer, load_app, summarize
+
+DEFAULT_METHODS = ['scrypt:32768:8:1', 'scrypt:16384:8:1', 'pbkdf2:sha256:600000', 'pbkdf2:sha256:100000']
+
+
+def _login_loop(app, usernames, deadline, samples, index):
+    client = app.app.test_client()
+    while time.perf_counter() < deadline:
+        username = usernames[index % len(usernames)]
+        index += 1
+        with Timer() as timer:
+            response = client.post('/login', data={'username': username, 'password': BENCHMARK_PASSWORD})
+        samples.append((timer.elapsed, response.status_code))
+        client.get('/logout')
+
+
+def _api_loop(app, user, month, year, deadline, latencies):
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'], session['username'] = user
+    while time.perf_counter() < deadline:
+        with Timer() as timer:
+            client.get(f'/api/kosten?month={month}&year={year}')
+        latencies.append(timer.elapsed)
+
+
+def run_setting(app, method, workers, threads, duration, usernames, api_user, month, year):
+    """Misst Logins und API-Latenz für eine Einstellung"""
+    app.password_hasher = app.PasswordHasher(method=method, workers=workers, queue=threads)
+    # Ein Hash für alle User, sonst würde das Vorbereiten länger dauern als der Benchmark
+    with Timer() as hash_timer:
+        password_hash = generate_password_hash(BENCHMARK_PASSWORD, method)
+    app.User.update(password_hash=password_hash).execute()
+
+    logins = []
+    api_latencies = []
+    deadline = time.perf_counter() + duration
+    runners = [threading.Thread(target=_login_loop, args=(app, usernames, deadline, logins, i * 7))
+               for i in range(threads)]
+    runners.append(threading.Thread(target=_api_loop, args=(app, api_user, month, year, deadline, api_latencies)))
+
+    started = time.perf_counter()
+    for runner in runners:
+        runner.start()
+    for runner in runners:
+        runner.join()
+    elapsed = time.perf_counter() - started
+
+    # Erfolgreicher Login = Redirect auf die Startseite
+    ok = [latency for latency, status in logins if status == 302]
+    return {
+        'method': method,
+        'hash_workers': workers,
+        'hash_ms': round(hash_timer.elapsed * 1000, 1),
+        'logins_per_s': round(len(ok) / elapsed, 1),
+        'login': summarize(ok),
+        'busy': sum(1 for _, status in logins if status == 503),
+        'errors': sum(1 for _, status in logins if status not in (302, 503)),
+        'api': summarize(api_latencies, elapsed),
+    }
+
+
+def run_passwords(db_path, methods=None, hash_workers=(1, 2), threads=4, duration=5.0):
+    """Führt den Login-Benchmark für alle Kombinationen aus Methode und Pool-Größe aus"""
+    app = load_app(db_path)
+    app.db.connect(reuse_if_open=True)
+    try:
+        users = list(app.User.select(app.User.id, app.User.username).order_by(app.User.id).tuples())
+        if not users:
+            raise RuntimeError('Benchmark-Datenbank ist leer, zuerst "python -m benchmarks seed" ausführen')
+        with app.user_database(users[0][0]):
+            month, year = (app.Kosten
+                           .select(app.Kosten.month, app.Kosten.year)
+                           .where(app.Kosten.user == users[0][0])
+                           .order_by(app.Kosten.year.desc(), app.Kosten.month.desc())
+                           .tuples()
+                           .first())
+        original = list(app.User.select(app.User.id, app.User.password_hash).tuples())
+
+        results = []
+        for method in methods or DEFAULT_METHODS:
+            for workers in hash_workers:
+                results.append(run_setting(app, method, workers, threads, duration,
+                                           [username for _, username in users], users[0], month, year))
+
+        # Ursprüngliche Hashes wiederherstellen, damit andere Benchmarks unverändert laufen
+        with app.db.atomic():
+            for user_id, password_hash in original:
+                app.User.update(password_hash=password_hash).where(app.User.id == user_id).execute()
+        return results
+    finally:
+        if not app.db.is_closed():
+            app.db.close()
@@ -0,0 +1,140 @@
+"""
+Erzeugt eine synthetische kosten.db für Benchmarks.
+
+Alle User bekommen das Passwort BENCHMARK_PASSWORD und Kosten für die
+letzten `months` Monate bis einschließlich zum aktuellen Monat (bzw. `end`).
+Die Parameter landen in <db>.seed.json, die Benchmarks übernehmen sie in
+ihr Ergebnis (siehe seed_parameters).
+"""
+import json
+import os
+import random
+from datetime import datetime
+
+from werkzeug.security import generate_password_hash
+
+from . import BENCHMARK_PASSWORD, Timer, load_app, seed_parameters_path
+
+KONTEN = ['Girokonto', 'Kreditkarte', 'Gemeinschaftskonto', 'Tagesgeld', 'Sparkonto']
+BEZEICHNUNGEN = ['Miete', 'Strom', 'Internet', 'Handy', 'Versicherung', 'Streaming',
+                 'Fitnessstudio', 'Kita', 'Kredit', 'Zeitung', 'Verein', 'Sparplan']
+
+
+def iter_months(months, end=None):
+    """Liefert (month, year) der letzten `months` Monate, ältester zuerst"""
+    end = end or datetime.now()
+    month, year = end.month, end.year
+    result = []
+    for _ in range(months):
+        result.append((month, year))
+        month -= 1
+        if month == 0:
+            month, year = 12, year - 1
+    return list(reversed(result))
+
+
+def seed_database(db_path, users=50, months=12, rows_per_month=30, seed=42, end=None, force=False):
+    """Legt die Benchmark-Datenbank an und gibt eine Zusammenfassung zurück, end ist ein datetime"""
+    if os.path.exists(db_path):
+        if not force:
+            raise FileExistsError(f'{db_path} existiert bereits (--force zum Überschreiben)')
+        # Mit SHARD_DIR auch die Dateien pro User bzw. Bucket
+        shard_dir = os.environ.get('SHARD_DIR')
+        shards = [os.path.join(shard_dir, name) for name in os.listdir(shard_dir)
+                  if name.endswith('.db')] if shard_dir and os.path.isdir(shard_dir) else []
+        for path in [db_path] + shards:
+            for suffix in ('', '-wal', '-shm', '.seed.json'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+    
+    app = load_app(db_path)
+    rng = random.Random(seed)
+    # Hashing ist absichtlich teuer, deshalb ein Hash für alle User
+    password_hash = generate_password_hash(BENCHMARK_PASSWORD)
+    month_list = iter_months(months, end)
+    
+    app.db.connect(reuse_if_open=True)
+    try:
+        with Timer() as timer:
+            with app.db.atomic():
+                user_rows = [{'username': f'bench{i:05d}', 'email': f'bench{i:05d}@example.com',
+                              'password_hash': password_hash} for i in range(users)]
+                for batch in app.chunked(user_rows, 100):
+                    app.User.insert_many(batch).execute()
+            
+            user_ids = [row[0] for row in app.User.select(app.User.id).order_by(app.User.id).tuples()]
+            for user_id in user_ids:
+                # Mit SHARD_DIR landen die Kosten in der Datei des Users
+                with app.user_database(user_id):
+                    with app.db.atomic():
+                        konto_ids = list(app.Konto
+                                         .insert_many([{'user': user_id, 'name': name} for name in KONTEN])
+                                         .returning(app.Konto.id)
+                                         .tuples()
+                                         .execute())
+                
+                    # Jeder User hat feste Posten, die jeden Monat wiederkehren
+                    template = []
+                    for position in range(rows_per_month):
+                        template.append({
+                            'bezeichnung': f'{rng.choice(BEZEICHNUNGEN)} {position + 1}',
+                            'betrag': round(rng.uniform(5, 1500), 2),
+                            'zahlungstag': rng.randint(1, 28),
+                            'konto': rng.choice(konto_ids)[0],
+                            'cost_type': 'one-time' if rng.random() < 0.1 else 'recurring',
+                            'position': (position + 1) * app.POSITION_STEP,
+                        })
+                
+                    # Wiederkehrende Posten als Vorlage ab dem ersten Monat, einmalige als Zeilen
+                    first_month, first_year = month_list[0]
+                    recurring = [item for item in template if item['cost_type'] == 'recurring']
+                    with app.db.atomic():
+                        template_ids = [row[0] for row in app.RecurringTemplate
+                                        .insert_many([dict({field: item[field] for field in app.TEMPLATE_FIELDS},
+                                                           user=user_id,
+                                                           valid_from=app.month_key(first_month, first_year))
+                                                      for item in recurring])
+                                        .returning(app.RecurringTemplate.id)
+                                        .tuples()
+                                        .execute()]
+                        app.KostenMonth.insert_many([{'user': user_id, 'month': month, 'year': year}
+                                                     for month, year in month_list]).execute()
+                
+                    # Bezahlte Vorlagen-Posten brauchen eine eigene Zeile, offene bleiben virtuell
+                    rows = []
+                    for index, (month, year) in enumerate(month_list):
+                        is_current = index == len(month_list) - 1
+                        for item in template:
+                            bezahlt = not is_current or rng.random() < 0.5
+                            if item['cost_type'] == 'recurring':
+                                if not bezahlt:
+                                    continue
+                                row = dict(item, template=template_ids[recurring.index(item)])
+                            else:
+                                row = dict(item)
+                            rows.append(dict(row, user=user_id, month=month, year=year, bezahlt=bezahlt))
+                    with app.db.atomic():
+                        for batch in app.chunked(rows, app.ROLLOVER_CHUNK_SIZE):
+                            app.Kosten.insert_many(batch).execute()
+                        app.rebuild_month_summaries([user_id])
+            
+            for _ in app.each_database():
+                app.db.execute_sql('ANALYZE')
+    finally:
+        app.db.close()
+    
+    last_month, last_year = month_list[-1]
+    parameters = {'users': users, 'months': months, 'rows_per_month': rows_per_month, 'seed': seed,
+                  'end': f'{last_year}-{last_month:02d}'}
+    with open(seed_parameters_path(db_path), 'w', encoding='utf-8') as f:
+        json.dump(parameters, f, indent=2)
+        f.write('\n')
+    
+    return {
+        'db_path': db_path,
+        'users': users,
+        'months': months,
+        'rows_per_month': rows_per_month,
+        'kosten_rows': users * months * rows_per_month,
+        'seconds': round(timer.elapsed, 2),
+    }
@@ -0,0 +1,213 @@
+"""
+Statische Dateien für den Betrieb: minifiziert CSS/JS, schreibt Kopien mit
+Inhalts-Hash im Namen nach static/dist (plus .gz/.br für nginx gzip_static
+bzw. brotli_static) und das Manifest, aus dem asset_url() in app.py liest.
+
+    python build_assets.py
+
+Eigenes Modul ohne Flask und peewee: der Build importiert app.py nicht und
+führt damit weder init_db() noch Migrationen aus (z.B. im Deploy-Skript,
+bevor .env existiert).
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+
+try:
+    import brotli  # optional, für vorkomprimierte .br-Dateien
+except ImportError:
+    brotli = None
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+ASSETS = ['css/style.css', 'js/script.js']
+ASSET_DIST = 'dist'  # Unterordner von static
+
+# Zeichen, neben denen Leerzeichen in JS bzw. CSS nie nötig sind
+JS_PUNCTUATION = set('{}()[];,:=<>!?&|')
+CSS_TOKEN_RE = re.compile(r'(/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', re.S)
+JS_REGEX_PREFIX_RE = re.compile(r'(?:^|[^\w$])(?:return|typeof|case|do|else|in|of|void|yield|await|delete|throw|new)\s*$')
+
+
+def minify_css(source):
+    """Entfernt Kommentare und überflüssige Leerzeichen, Strings bleiben unverändert"""
+    def compress(css):
+        css = re.sub(r'\s+', ' ', css)
+        # Kein Leerzeichen vor ":" entfernen ("a :hover" ist etwas anderes als "a:hover")
+        css = re.sub(r' ?([{};,>]) ?', r'\1', css)
+        return css.replace(': ', ':').replace(';}', '}')
+    
+    result, text = [], ''
+    for index, part in enumerate(CSS_TOKEN_RE.split(source)):
+        if index % 2 == 0:
+            text += part
+        elif not part.startswith('/*'):  # Strings unverändert, Kommentare fallen weg
+            result += [compress(text), part]
+            text = ''
+    result.append(compress(text))
+    return ''.join(result).strip()
+
+
+def skip_js_string(source, i):
+    """Index hinter dem String bzw. Template-String ab source[i], inkl. verschachtelter ${...}"""
+    quote, j, n = source[i], i + 1, len(source)
+    while j < n and source[j] != quote:
+        if source[j] == '\\':
+            j += 2
+        elif quote == '`' and source.startswith('${', j):
+            # Ausdruck bis zur schließenden Klammer, Strings darin können wieder Templates sein
+            j, depth = j + 2, 1
+            while j < n and depth:
+                if source[j] in '\'"`':
+                    j = skip_js_string(source, j)
+                    continue
+                depth += {'{': 1, '}': -1}.get(source[j], 0)
+                j += 1
+        else:
+            j += 1
+    return j + 1
+
+
+def minify_js(source):
+    """
+    Konservative JS-Minifizierung ohne Parser: entfernt Kommentare,
+    Einrückung und Leerzeichen neben Satzzeichen. Zeilenumbrüche bleiben,
+    wo die automatische Semikolon-Ergänzung sie brauchen könnte. Strings,
+    Template-Strings und Regex-Literale bleiben unverändert.
+    """
+    out = []
+    i, n = 0, len(source)
+    
+    def last_char():
+        return out[-1][-1] if out else ''
+    
+    while i < n:
+        c = source[i]
+        if c in '\'"`':
+            j = skip_js_string(source, i)
+            out.append(source[i:j])
+            i = j
+        elif source.startswith('//', i) or source.startswith('/*', i) or c.isspace():
+            # Kommentare zählen als Leerraum, Zeilenumbrüche darin bleiben erhalten
+            newline = False
+            while i < n:
+                if source.startswith('//', i):
+                    end = source.find('\n', i)
+                    i = n if end < 0 else end
+                elif source.startswith('/*', i):
+                    end = source.find('*/', i + 2)
+                    newline = newline or '\n' in source[i:end]
+                    i = n if end < 0 else end + 2
+                elif source[i].isspace():
+                    newline = newline or source[i] == '\n'
+                    i += 1
+                else:
+                    break
+            prev, following = last_char(), source[i] if i < n else ''
+            if not prev or not following:
+                continue
+            if newline and prev not in '{;,([' and following not in '}])':
+                out.append('\n')
+            elif not newline and prev not in JS_PUNCTUATION and following not in JS_PUNCTUATION:
+                out.append(' ')
+        elif c == '/' and (last_char() in ('', *'(,=:[!&|?{};+-*%<>~^\n') or
+                           JS_REGEX_PREFIX_RE.search(''.join(out[-3:]))):
+            # Regex-Literal: bis zum nächsten "/" außerhalb einer Zeichenklasse, dann Flags
+            j, in_class = i + 1, False
+            while j < n and source[j] != '\n':
+                if source[j] == '\\':
+                    j += 1
+                elif source[j] == '[':
+                    in_class = True
+                elif source[j] == ']':
+                    in_class = False
+                elif source[j] == '/' and not in_class:
+                    break
+                j += 1
+            j += 1
+            while j < n and (source[j].isalnum() or source[j] in '_$'):
+                j += 1
+            out.append(source[i:j])
+            i = j
+        else:
+            j = i + 1
+            # Wörter und Zahlen am Stück übernehmen
+            while j < n and (source[j].isalnum() or source[j] in '_$.') and c not in '/\'"`':
+                j += 1
+            out.append(source[i:j])
+            i = j
+    return ''.join(out).strip()
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build_assets(static_folder=STATIC_FOLDER, keep_previous=True):
+    """
+    Minifiziert alle ASSETS, schreibt sie als <name>.<hash>.<ext> mit .gz
+    (und .br, wenn brotli installiert ist) nach static/dist und das
+    Manifest {Originalpfad: dist-Pfad}. Dateien des vorherigen Builds
+    bleiben für Clients mit alter Seite liegen, ältere werden gelöscht.
+    Gibt je Datei die Größen zurück.
+    """
+    dist = os.path.join(static_folder, ASSET_DIST)
+    manifest_path = os.path.join(dist, 'manifest.json')
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            previous = json.load(f)
+    
+    manifest = {}
+    report = {}
+    for name in ASSETS:
+        with open(os.path.join(static_folder, name), encoding='utf-8') as f:
+            source = f.read()
+        base, ext = os.path.splitext(name)
+        data = MINIFIERS[ext](source).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        target = f'{ASSET_DIST}/{base}.{digest}{ext}'
+        path = os.path.join(static_folder, target)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        variants = {'': data, '.gz': gzip.compress(data, 9, mtime=0)}
+        if brotli:
+            variants['.br'] = brotli.compress(data, quality=11)
+        for suffix, content in variants.items():
+            with open(path + suffix, 'wb') as f:
+                f.write(content)
+        manifest[name] = target
+        report[name] = {'file': target, 'source': len(source.encode('utf-8')),
+                        **{suffix.lstrip('.') or 'minified': len(content) for suffix, content in variants.items()}}
+    
+    # Aufräumen: nur Dateien aus diesem und (optional) dem vorherigen Build behalten
+    keep = set(manifest.values()) | (set(previous.values()) if keep_previous else set())
+    for root, _, files in os.walk(dist):
+        for file in files:
+            relative = os.path.relpath(os.path.join(root, file), static_folder).replace(os.sep, '/')
+            if file != 'manifest.json' and re.sub(r'\.(gz|br)$', '', relative) not in keep:
+                os.remove(os.path.join(root, file))
+    
+    # Manifest zuletzt und atomar schreiben, die Dateien existieren dann schon
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python build_assets.py',
+                                     description='Minifiziert CSS/JS, schreibt Dateien mit Hash, .gz/.br und das Manifest')
+    parser.add_argument('--static-folder', default=STATIC_FOLDER, help='Ordner mit css/ und js/ (Standard: static)')
+    args = parser.parse_args(argv)
+    
+    for name, sizes in build_assets(args.static_folder).items():
+        details = ', '.join(f'{key} {value}' for key, value in sizes.items() if key != 'file')
+        print(f'{name} -> {sizes["file"]} ({details} Bytes)')
+    if not brotli:
+        print('Hinweis: brotli ist nicht installiert, keine .br-Dateien (pip install brotli)')
+
+
+if __name__ == '__main__':
+    main()
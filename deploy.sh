@@ -72,6 +72,10 @@ pip install --upgrade pip
 pip install -r requirements.txt
 echo -e "${GREEN}✓ Dependencies installiert${NC}"
 
+# CSS/JS minifizieren, mit Hash im Namen und vorkomprimiert (.gz/.br) nach static/dist
+python build_assets.py
+echo -e "${GREEN}✓ Statische Dateien gebaut${NC}"
+
 echo -e "\n${YELLOW}[6/10] .env Datei erstellen...${NC}"
 SECRET_KEY=$(python3 -c "import secrets; print(secrets.token_hex(32))")
 cat > .env << EOF
@@ -83,11 +87,9 @@ echo -e "${GREEN}✓ .env erstellt mit SECRET_KEY${NC}"
 
 echo -e "\n${YELLOW}[7/10] Datenbank initialisieren...${NC}"
 python3 << 'PYEOF'
-from app import db, User, PasswordReset, Kosten
-db.connect()
-db.create_tables([User, PasswordReset, Kosten])
-db.close()
-print("✓ Datenbank-Tabellen erstellt")
+from app import init_db
+init_db()
+print("✓ Datenbank-Tabellen erstellt bzw. migriert")
 PYEOF
 echo -e "${GREEN}✓ Datenbank initialisiert${NC}"
 
@@ -104,7 +106,10 @@ Group=root
 WorkingDirectory=$INSTALL_DIR
 Environment="PATH=$INSTALL_DIR/venv/bin"
 EnvironmentFile=$INSTALL_DIR/.env
-ExecStart=$INSTALL_DIR/venv/bin/gunicorn --workers 3 --bind unix:$INSTALL_DIR/verwalco.sock --timeout 60 app:app
+# Jeder offene /api/events-Stream belegt bis zu EVENTS_MAX_SECONDS (300 s) einen der --threads;
+# app.py erlaubt ohne EVENTS_MAX_CONNECTIONS ein Viertel, höchstens die Hälfte davon pro Worker.
+# Mehr gleichzeitige Live-Clients: --threads erhöhen (und DB_MAX_CONNECTIONS >= --threads).
+ExecStart=$INSTALL_DIR/venv/bin/gunicorn -c $INSTALL_DIR/gunicorn.conf.py --workers 3 --threads 4 --bind unix:$INSTALL_DIR/verwalco.sock --timeout 60 app:app
 ExecReload=/bin/kill -s HUP \$MAINPID
 KillMode=mixed
 TimeoutStopSec=5
@@ -136,10 +141,16 @@ server {
     access_log /var/log/nginx/verwalco_access.log;
     error_log /var/log/nginx/verwalco_error.log;
 
+    location /static/dist/ {
+        alias $INSTALL_DIR/static/dist/;
+        gzip_static on;
+        expires 1y;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+
     location /static {
         alias $INSTALL_DIR/static;
-        expires 30d;
-        add_header Cache-Control "public, immutable";
+        expires 1h;
     }
 
     location / {
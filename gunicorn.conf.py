@@ -0,0 +1,31 @@
+"""
+Gunicorn-Hooks für Verwalco (gunicorn -c gunicorn.conf.py app:app).
+
+Läuft im Master-Prozess und importiert deshalb app.py nicht (der Import
+migriert die Datenbank), nur worker_metrics.
+"""
+import os
+
+from worker_metrics import fold_stale_metrics, fold_worker_metrics
+
+METRICS_DIR = os.environ.get('METRICS_DIR', 'metrics')
+
+
+def on_starting(server):
+    """Metrik-Dateien aus einem früheren Lauf zusammenfassen"""
+    folded = fold_stale_metrics(METRICS_DIR)
+    if folded:
+        server.log.info('Metriken von %d alten Workern zusammengefasst', folded)
+
+
+def post_fork(server, worker):
+    """
+    --threads an app.py weitergeben: jeder /api/events-Stream belegt einen
+    Thread, EVENTS_MAX_CONNECTIONS wird daran gemessen (events_connection_limit)
+    """
+    os.environ['GUNICORN_THREADS'] = str(worker.cfg.threads)
+
+
+def child_exit(server, worker):
+    """Zähler des beendeten Workers in dead-workers.json übernehmen, seine Datei löschen"""
+    fold_worker_metrics(METRICS_DIR, [worker.pid])
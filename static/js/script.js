@@ -5,6 +5,15 @@ let collapsedAccounts = new Set(JSON.parse(localStorage.getItem('collapsedAccoun
 // Monats-Navigation
 let currentMonth = new Date().getMonth() + 1; // 1-12
 let currentYear = new Date().getFullYear();
+// Grenzen der Navigation ({ min, max } als { month, year }), kommen aus /api/bootstrap
+let navigation = null;
+// Einträge des angezeigten Monats nach ID und Stand für /api/kosten/changes
+let kostenById = new Map();
+let syncSeq = 0;
+// Live-Updates von anderen Geräten (/api/events)
+let eventSource = null;
+let eventRetryTimer = null;
+const EVENTS_FALLBACK_MS = 30000; // Server voll oder nicht erreichbar: so lange abgleichen und neu versuchen
 const monthNames = ['Januar', 'Februar', 'März', 'April', 'Mai', 'Juni', 
                     'Juli', 'August', 'September', 'Oktober', 'November', 'Dezember'];
 
@@ -67,8 +76,8 @@ document.addEventListener('DOMContentLoaded', function() {
             if (result.success) {
                 // Form zurücksetzen
                 document.getElementById('kostenForm').reset();
-                // Kosten neu laden
-                loadKosten();
+                // Nur die Änderungen laden
+                syncKosten();
             }
         } catch (error) {
             console.error('Error:', error);
@@ -84,60 +93,56 @@ document.addEventListener('DOMContentLoaded', function() {
         changeMonth(1);
     });
     
-    // Initial laden
-    updateMonthDisplay();
-    loadKosten();
-    loadKonten();
+    // Initial laden: Daten stehen im HTML (BOOTSTRAP_INLINE) oder kommen in einem Aufruf
+    const inline = document.getElementById('bootstrap-data');
+    if (inline) {
+        applyBootstrap(JSON.parse(inline.textContent));
+    } else {
+        updateMonthDisplay();
+        loadBootstrap();
+    }
 });
 
+// Monatsansicht, Konten und Navigation in einem Aufruf laden
+async function loadBootstrap() {
+    try {
+        const response = await fetch(`/api/bootstrap?month=${currentMonth}&year=${currentYear}`);
+        applyBootstrap(await response.json());
+    } catch (error) {
+        console.error('Error loading bootstrap:', error);
+    }
+}
+
+// Antwort von /api/bootstrap anzeigen
+function applyBootstrap(data) {
+    currentMonth = data.month;
+    currentYear = data.year;
+    navigation = data.navigation;
+    updateMonthDisplay();
+    displayKonten(data.konten);
+    kostenById = new Map();
+    applyKostenChanges({ ...data.kosten, seq: data.seq, deleted: [] });
+    connectEvents();
+}
+
 // Monats-Anzeige aktualisieren
-async function updateMonthDisplay() {
+function updateMonthDisplay() {
     const monthYearElement = document.getElementById('currentMonthYear');
     monthYearElement.textContent = `${monthNames[currentMonth - 1]} ${currentYear}`;
     
-    // Prüfe ob wir am aktuellen Monat sind
-    const now = new Date();
-    const isCurrentMonth = currentMonth === (now.getMonth() + 1) && currentYear === now.getFullYear();
-    
-    // Berechne nächsten Monat
-    let nextMonth = currentMonth + 1;
-    let nextYear = currentYear;
-    if (nextMonth > 12) {
-        nextMonth = 1;
-        nextYear++;
-    }
-    
-    // Nächster Monat Button: aktivieren wenn wir in der Vergangenheit sind ODER wenn Daten im nächsten Monat existieren
-    const currentDate = new Date(currentYear, currentMonth - 1);
-    const todayDate = new Date(now.getFullYear(), now.getMonth());
-    
-    if (currentDate < todayDate) {
-        // Wir sind in der Vergangenheit: immer aktivieren (um zur Gegenwart zu navigieren)
-        document.getElementById('nextMonth').disabled = false;
-    } else if (isCurrentMonth) {
-        // Am aktuellen Monat: nur aktivieren wenn nächster Monat Daten hat
-        try {
-            const response = await fetch(`/api/kosten?month=${nextMonth}&year=${nextYear}`);
-            const kosten = await response.json();
-            document.getElementById('nextMonth').disabled = kosten.length === 0;
-        } catch (error) {
-            document.getElementById('nextMonth').disabled = true;
-        }
-    } else {
-        // In der Zukunft: deaktivieren
+    // Bis die Grenzen geladen sind, nicht navigieren
+    if (!navigation) {
         document.getElementById('nextMonth').disabled = true;
+        document.getElementById('prevMonth').disabled = true;
+        return;
     }
     
-    // Prüfe ob "Vorheriger Monat" Button deaktiviert werden soll (6 Monate zurück)
-    const sixMonthsAgo = new Date();
-    sixMonthsAgo.setMonth(sixMonthsAgo.getMonth() - 6);
-    const minMonth = sixMonthsAgo.getMonth() + 1;
-    const minYear = sixMonthsAgo.getFullYear();
-    
-    const isMinMonth = (currentYear === minYear && currentMonth === minMonth) || 
-                       (currentYear === minYear && currentMonth < minMonth) ||
-                       (currentYear < minYear);
-    document.getElementById('prevMonth').disabled = isMinMonth;
+    // Monate als Zahl YYYYMM vergleichen: vorwärts bis zum aktuellen Monat bzw. dem
+    // bereits angelegten Folgemonat, zurück höchstens 6 Monate
+    const key = (month, year) => year * 100 + month;
+    const current = key(currentMonth, currentYear);
+    document.getElementById('nextMonth').disabled = current >= key(navigation.max.month, navigation.max.year);
+    document.getElementById('prevMonth').disabled = current <= key(navigation.min.month, navigation.min.year);
 }
 
 // Monat wechseln
@@ -153,26 +158,29 @@ function changeMonth(direction) {
     }
     
     updateMonthDisplay();
-    loadKosten();
+    loadBootstrap();
 }
 
 // Konten laden und Datalist aktualisieren
 async function loadKonten() {
     try {
         const response = await fetch('/api/konten');
-        const konten = await response.json();
-        const datalist = document.getElementById('konten-list');
-        datalist.innerHTML = '';
-        konten.forEach(konto => {
-            const option = document.createElement('option');
-            option.value = konto;
-            datalist.appendChild(option);
-        });
+        displayKonten(await response.json());
     } catch (error) {
         console.error('Error loading konten:', error);
     }
 }
 
+function displayKonten(konten) {
+    const datalist = document.getElementById('konten-list');
+    datalist.innerHTML = '';
+    konten.forEach(konto => {
+        const option = document.createElement('option');
+        option.value = konto;
+        datalist.appendChild(option);
+    });
+}
+
 // Funktion zum Umbenennen eines Kontos
 async function toggleKontoExclude(konto) {
     try {
@@ -191,7 +199,7 @@ async function toggleKontoExclude(konto) {
         const result = await response.json();
         
         if (result.success) {
-            loadKosten(); // Neu laden um Button-Status zu aktualisieren
+            syncKosten(); // Button-Status aktualisieren
         } else {
             alert(`Fehler: ${result.error}`);
         }
@@ -218,7 +226,7 @@ async function renameKonto(oldName) {
 
             const result = await response.json();
             if (result.success) {
-                loadKosten();
+                syncKosten();
                 loadKonten();
             } else {
                 alert('Fehler beim Umbenennen: ' + (result.error || 'Unbekannter Fehler'));
@@ -230,6 +238,42 @@ async function renameKonto(oldName) {
     }
 }
 
+// CSV/NDJSON-Datei importieren (Fallback-Monat ist der angezeigte Monat)
+async function importKosten(input) {
+    const file = input.files[0];
+    input.value = '';
+    if (!file) return;
+
+    const formData = new FormData();
+    formData.append('file', file);
+
+    try {
+        const response = await fetch(`/api/import?month=${currentMonth}&year=${currentYear}`, {
+            method: 'POST',
+            body: formData
+        });
+
+        const result = await response.json();
+        if (!result.success) {
+            const details = (result.errors || []).slice(0, 10)
+                .map(e => `Zeile ${e.line}: ${e.error}`).join('\n');
+            alert('Fehler beim Import: ' + result.error + (details ? '\n\n' + details : ''));
+            return;
+        }
+
+        let message = `${result.imported} Einträge importiert`;
+        if (result.skipped) {
+            message += `, ${result.skipped} Duplikate übersprungen`;
+        }
+        alert(message);
+        syncKosten();
+        loadKonten();
+    } catch (error) {
+        console.error('Error:', error);
+        alert('Fehler beim Import der Datei');
+    }
+}
+
 // Globale Variable für die Summenberechnung
 let selectedSums = {};
 
@@ -238,6 +282,7 @@ function updateSumDisplay(konto) {
     const kontoHeader = document.querySelector(`.konto-group[data-konto="${konto}"] .konto-header`);
     const sumDisplay = kontoHeader.querySelector('.sum-display');
     const renameButton = kontoHeader.querySelector('.btn-outline-secondary');
+    let markPaidButton = kontoHeader.querySelector('.mark-paid-btn');
     
     if (selectedSums[konto] && selectedSums[konto] > 0) {
         if (!sumDisplay) {
@@ -245,6 +290,15 @@ function updateSumDisplay(konto) {
             newSumDisplay.className = 'sum-display';
             kontoHeader.appendChild(newSumDisplay);
         }
+        if (!markPaidButton) {
+            markPaidButton = document.createElement('button');
+            markPaidButton.className = 'btn btn-success btn-sm ms-2 mark-paid-btn';
+            markPaidButton.innerHTML = '<i class="fas fa-check-double"></i>';
+            markPaidButton.setAttribute('data-tooltip', 'Ausgewählte als bezahlt markieren');
+            markPaidButton.onclick = () => markSelectedPaid(konto);
+            kontoHeader.appendChild(markPaidButton);
+        }
+        markPaidButton.style.display = 'inline-block';
         const displayElement = sumDisplay || kontoHeader.querySelector('.sum-display');
         const formattedSum = new Intl.NumberFormat('de-DE', { 
             style: 'currency', 
@@ -264,6 +318,9 @@ function updateSumDisplay(konto) {
         if (sumDisplay) {
             sumDisplay.style.display = 'none';
         }
+        if (markPaidButton) {
+            markPaidButton.style.display = 'none';
+        }
         // Show rename button when no sum is displayed
         if (renameButton) {
             renameButton.style.display = 'inline-block';
@@ -271,6 +328,47 @@ function updateSumDisplay(konto) {
     }
 }
 
+// Alle in der Summen-Spalte ausgewählten Einträge eines Kontos mit einem Request als bezahlt markieren
+async function markSelectedPaid(konto) {
+    const rows = Array.from(document.querySelectorAll(`.konto-group[data-konto="${konto}"] .sum-checkbox:checked`))
+        .map(checkbox => checkbox.closest('tr'))
+        .filter(row => !row.classList.contains('archived-row'));
+    if (rows.length === 0) return;
+
+    const operations = rows.map(row => ({ op: 'toggle', id: Number(row.dataset.id), bezahlt: true }));
+
+    try {
+        const response = await fetch(`/api/kosten/batch?totals=1&month=${currentMonth}&year=${currentYear}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ operations })
+        });
+
+        const result = await response.json();
+        if (!result.success) {
+            alert('Fehler: ' + (result.error || 'Unbekannter Fehler'));
+            return;
+        }
+
+        rows.forEach(row => {
+            row.classList.add('bezahlt');
+            row.querySelector('.col-bezahlt input').checked = true;
+        });
+        operations.forEach(op => {
+            const kosten = kostenById.get(op.id);
+            if (kosten) {
+                kosten.bezahlt = true;
+            }
+        });
+        displaySummen(result.totals);
+    } catch (error) {
+        console.error('Error:', error);
+        alert('Fehler beim Markieren als bezahlt');
+    }
+}
+
 // Funktion zum Aktualisieren der ausgewählten Summe
 function updateSelectedSum(checkbox, betrag, konto) {
     if (!selectedSums[konto]) {
@@ -372,11 +470,98 @@ function groupByKonto(kosten) {
     return groups;
 }
 
-// Kosten laden
+// Kosten des Monats komplett laden
 async function loadKosten() {
-    const response = await fetch(`/api/kosten?month=${currentMonth}&year=${currentYear}`);
-    const kosten = await response.json();
-    displayKosten(kosten);
+    kostenById = new Map();
+    syncSeq = 0;
+    await syncKosten();
+}
+
+// Nur geänderte und gelöschte Einträge seit dem letzten Stand laden (since=0: alle)
+async function syncKosten() {
+    const month = currentMonth;
+    const year = currentYear;
+    const since = syncSeq;
+    try {
+        const response = await fetch(`/api/kosten/changes?since=${since}&month=${month}&year=${year}`);
+        const data = await response.json();
+        // Inzwischen anderer Monat angezeigt oder eine neuere Antwort schon übernommen
+        if (month !== currentMonth || year !== currentYear || data.seq < syncSeq) return;
+        if (data.reset) {
+            if (since) await loadKosten();
+            return;
+        }
+        if (!since) kostenById = new Map();
+        applyKostenChanges(data);
+    } catch (error) {
+        console.error('Error syncing kosten:', error);
+    }
+}
+
+// Änderungen des angezeigten Monats per Server-Sent Events empfangen
+function connectEvents() {
+    if (!window.EventSource) return;
+    if (eventSource) eventSource.close();
+    clearTimeout(eventRetryTimer);
+
+    const source = new EventSource(`/api/events?month=${currentMonth}&year=${currentYear}&since=${syncSeq}`);
+    eventSource = source;
+    source.addEventListener('changes', async e => {
+        const data = JSON.parse(e.data);
+        if (data.reset) {
+            // Stand zu alt: Monat neu laden und mit dem neuen Stand verbinden
+            source.close();
+            await loadKosten();
+            connectEvents();
+            return;
+        }
+        // Anderer Monat oder schon per syncKosten übernommen
+        if (data.month !== currentMonth || data.year !== currentYear || data.seq <= syncSeq) return;
+        applyKostenChanges(data);
+        displaySummen(data.totals);
+    });
+    source.onerror = () => {
+        // Abgelehnt (z.B. 503, alle Plätze belegt): später erneut versuchen, bis dahin regelmäßig abgleichen
+        if (source.readyState === EventSource.CLOSED && source === eventSource) {
+            eventRetryTimer = setTimeout(() => {
+                syncKosten();
+                connectEvents();
+            }, EVENTS_FALLBACK_MS);
+        }
+    };
+}
+
+// Änderungen ({ seq, columns, rows, deleted }) übernehmen und die Liste neu aufbauen
+function applyKostenChanges({ seq, columns, rows, deleted }) {
+    deleted.forEach(id => kostenById.delete(id));
+    rows.forEach(row => {
+        // Spaltenformat (kleinere Antwort) in Objekte umwandeln
+        const kosten = Object.fromEntries(columns.map((name, i) => [name, row[i]]));
+        if (kosten.month === currentMonth && kosten.year === currentYear) {
+            kostenById.set(kosten.id, kosten);
+        } else {
+            kostenById.delete(kosten.id);
+        }
+    });
+    syncSeq = seq;
+    // Sortierung wie bei /api/kosten: Konto, Position, Zahlungstag
+    const compare = (a, b) => (a < b ? -1 : a > b ? 1 : 0);
+    displayKosten([...kostenById.values()].sort((a, b) =>
+        compare(a.konto, b.konto) || a.position - b.position || a.zahlungstag - b.zahlungstag));
+}
+
+// Summen-Anzeigen aktualisieren ({ paid, total, open } wie von /api/kosten/summary)
+function displaySummen(totals) {
+    const format = betrag => new Intl.NumberFormat('de-DE', { 
+        style: 'currency', 
+        currency: 'EUR',
+        minimumFractionDigits: 2,
+        maximumFractionDigits: 2
+    }).format(betrag);
+
+    document.getElementById('bezahlteSumme').textContent = format(totals.paid);
+    document.getElementById('gesamtsummeTotal').textContent = format(totals.total);
+    document.getElementById('gesamtsumme').textContent = format(totals.open);
 }
 
 // Kosten anzeigen
@@ -406,26 +591,7 @@ function displayKosten(kostenListe) {
     });
     
     // Aktualisiere alle 3 Summen-Anzeigen
-    document.getElementById('bezahlteSumme').textContent = new Intl.NumberFormat('de-DE', { 
-        style: 'currency', 
-        currency: 'EUR',
-        minimumFractionDigits: 2,
-        maximumFractionDigits: 2
-    }).format(bezahlteSumme);
-    
-    document.getElementById('gesamtsummeTotal').textContent = new Intl.NumberFormat('de-DE', { 
-        style: 'currency', 
-        currency: 'EUR',
-        minimumFractionDigits: 2,
-        maximumFractionDigits: 2
-    }).format(gesamtsummeTotal);
-    
-    document.getElementById('gesamtsumme').textContent = new Intl.NumberFormat('de-DE', { 
-        style: 'currency', 
-        currency: 'EUR',
-        minimumFractionDigits: 2,
-        maximumFractionDigits: 2
-    }).format(unbezahlteSumme);
+    displaySummen({ paid: bezahlteSumme, total: gesamtsummeTotal, open: unbezahlteSumme });
 
     Object.keys(kontoGruppen).sort().forEach(konto => {
         const kontoGruppe = document.createElement('div');
@@ -510,18 +676,21 @@ function displayKosten(kostenListe) {
         
         kontoGruppen[konto].forEach(k => {
             const tr = document.createElement('tr');
-            tr.draggable = true;
+            // Archivierte Monate sind nur lesbar (der Server antwortet mit 409)
+            tr.draggable = !k.archived;
             tr.dataset.id = k.id;
             tr.dataset.konto = konto;
             
             // Farbliche Kennzeichnung der Zeile basierend auf Kostentyp
             const costType = k.cost_type || 'recurring';
-            tr.className = `draggable ${costType === 'recurring' ? 'recurring-row' : 'one-time-row'}`;
+            tr.className = `${k.archived ? 'archived-row' : 'draggable'} ${costType === 'recurring' ? 'recurring-row' : 'one-time-row'}`;
             
-            tr.addEventListener('dragstart', handleDragStart);
-            tr.addEventListener('dragend', handleDragEnd);
-            tr.addEventListener('dragover', handleDragOver);
-            tr.addEventListener('drop', handleDrop);
+            if (!k.archived) {
+                tr.addEventListener('dragstart', handleDragStart);
+                tr.addEventListener('dragend', handleDragEnd);
+                tr.addEventListener('dragover', handleDragOver);
+                tr.addEventListener('drop', handleDrop);
+            }
             
             const betragFormatted = new Intl.NumberFormat('de-DE', { 
                 style: 'decimal', 
@@ -533,12 +702,21 @@ function displayKosten(kostenListe) {
             const costTypeButton = costType === 'recurring' 
                 ? `<button class="btn btn-sm cost-type-btn-recurring" onclick="toggleCostType(${k.id})" data-tooltip="Wiederkehrende Kosten"><i class="fas fa-sync-alt"></i></button>`
                 : `<button class="btn btn-sm cost-type-btn-one-time" onclick="toggleCostType(${k.id})" data-tooltip="Einmalige Kosten"><i class="fas fa-calendar-check"></i></button>`;
+            const actions = k.archived
+                ? `<span class="archived-lock" data-tooltip="Monat archiviert"><i class="fas fa-lock"></i></span>`
+                : `${costTypeButton}
+                    <button class="btn btn-sm btn-edit" onclick="startEdit(${k.id})" data-tooltip="Bearbeiten">
+                        <i class="fas fa-edit"></i>
+                    </button>
+                    <button class="btn btn-sm btn-delete" onclick="deleteKosten(${k.id})" data-tooltip="Löschen">
+                        <i class="fas fa-trash"></i>
+                    </button>`;
             
             tr.innerHTML = `
                 <td>
-                    <span class="drag-handle">
+                    ${k.archived ? '' : `<span class="drag-handle">
                         <i class="fas fa-grip-vertical"></i>
-                    </span>
+                    </span>`}
                 </td>
                 <td class="col-bezeichnung">${k.bezeichnung}</td>
                 <td class="col-betrag">${betragFormatted} €</td>
@@ -553,18 +731,12 @@ function displayKosten(kostenListe) {
                 <td class="col-bezahlt">
                     <div class="form-check">
                         <input type="checkbox" class="form-check-input" 
-                            ${k.bezahlt ? 'checked' : ''} 
+                            ${k.bezahlt ? 'checked' : ''} ${k.archived ? 'disabled' : ''}
                             onchange="updateBezahlt(${k.id}, this.checked)">
                     </div>
                 </td>
                 <td class="col-aktionen">
-                    ${costTypeButton}
-                    <button class="btn btn-sm btn-edit" onclick="startEdit(${k.id})" data-tooltip="Bearbeiten">
-                        <i class="fas fa-edit"></i>
-                    </button>
-                    <button class="btn btn-sm btn-delete" onclick="deleteKosten(${k.id})" data-tooltip="Löschen">
-                        <i class="fas fa-trash"></i>
-                    </button>
+                    ${actions}
                 </td>
             `;
             
@@ -645,15 +817,23 @@ function handleDragOver(e) {
 
 function handleDrop(e) {
     e.preventDefault();
-    updatePositions();
+    if (draggedItem) {
+        moveKosten(draggedItem);
+    }
 }
 
-async function updatePositions() {
-    const rows = document.querySelectorAll('tr[data-id]');
-    const positions = Array.from(rows).map((row, index) => ({
-        id: row.dataset.id,
-        position: index + 1
-    }));
+// Verschobene Zeile mit ihren neuen Nachbarn an den Server melden (eine Zeile wird geschrieben)
+async function moveKosten(row) {
+    const prev = row.previousElementSibling;
+    const next = row.nextElementSibling;
+    const move = { id: Number(row.dataset.id) };
+    if (prev) {
+        move.after_id = Number(prev.dataset.id);
+    } else if (next) {
+        move.before_id = Number(next.dataset.id);
+    } else {
+        move.index = 0;
+    }
 
     try {
         const response = await fetch('/api/kosten/reorder', {
@@ -661,12 +841,14 @@ async function updatePositions() {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify(positions)
+            body: JSON.stringify(move)
         });
         
         if (!response.ok) {
             throw new Error('Failed to update positions');
         }
+        // Neue Positionen (und die ID, falls ein Eintrag einer Vorlage eine eigene Zeile bekam)
+        syncKosten();
     } catch (error) {
         console.error('Error updating positions:', error);
     }
@@ -744,7 +926,7 @@ async function saveEdit(id) {
         console.log('Server response:', responseData);
 
         if (response.ok) {
-            await loadKosten();
+            await syncKosten();
         } else {
             console.error('Failed to save:', responseData.error || 'Unknown error');
             alert('Fehler beim Speichern: ' + (responseData.error || 'Unbekannter Fehler'));
@@ -757,7 +939,7 @@ async function saveEdit(id) {
 
 async function updateBezahlt(id, bezahlt) {
     try {
-        const response = await fetch(`/api/kosten/${id}`, {
+        const response = await fetch(`/api/kosten/${id}?totals=1`, {
             method: 'PUT',
             headers: {
                 'Content-Type': 'application/json'
@@ -773,6 +955,10 @@ async function updateBezahlt(id, bezahlt) {
         }
 
         // Aktualisiere den Bezahlstatus visuell
+        const kosten = kostenById.get(id);
+        if (kosten) {
+            kosten.bezahlt = bezahlt;
+        }
         const row = document.querySelector(`tr[data-id="${id}"]`);
         if (row) {
             if (bezahlt) {
@@ -782,47 +968,8 @@ async function updateBezahlt(id, bezahlt) {
             }
         }
 
-        // Aktualisiere alle 3 Summen (ohne ausgeschlossene Konten)
-        const kostenResponse = await fetch(`/api/kosten?month=${currentMonth}&year=${currentYear}`);
-        const kostenListe = await kostenResponse.json();
-        
-        let unbezahlteSumme = 0;
-        let bezahlteSumme = 0;
-        let gesamtsummeTotal = 0;
-        
-        kostenListe.forEach(k => {
-            if (!k.exclude_from_total) {
-                const betrag = Number(k.betrag);
-                gesamtsummeTotal += betrag;
-                
-                if (k.bezahlt) {
-                    bezahlteSumme += betrag;
-                } else {
-                    unbezahlteSumme += betrag;
-                }
-            }
-        });
-        
-        document.getElementById('bezahlteSumme').textContent = new Intl.NumberFormat('de-DE', { 
-            style: 'currency', 
-            currency: 'EUR',
-            minimumFractionDigits: 2,
-            maximumFractionDigits: 2
-        }).format(bezahlteSumme);
-        
-        document.getElementById('gesamtsummeTotal').textContent = new Intl.NumberFormat('de-DE', { 
-            style: 'currency', 
-            currency: 'EUR',
-            minimumFractionDigits: 2,
-            maximumFractionDigits: 2
-        }).format(gesamtsummeTotal);
-        
-        document.getElementById('gesamtsumme').textContent = new Intl.NumberFormat('de-DE', { 
-            style: 'currency', 
-            currency: 'EUR',
-            minimumFractionDigits: 2,
-            maximumFractionDigits: 2
-        }).format(unbezahlteSumme);
+        // Aktualisiere alle 3 Summen mit den vom Server berechneten Werten
+        displaySummen(responseData.totals);
     } catch (error) {
         console.error('Error updating bezahlt status:', error);
         // Checkbox auf den vorherigen Zustand zurücksetzen
@@ -835,10 +982,7 @@ async function updateBezahlt(id, bezahlt) {
 
 async function toggleCostType(id) {
     try {
-        // Hole aktuelle Daten
-        const response = await fetch('/api/kosten');
-        const kosten = await response.json();
-        const currentKosten = kosten.find(k => k.id === id);
+        const currentKosten = kostenById.get(id);
         
         if (!currentKosten) {
             console.error('Kosten nicht gefunden');
@@ -860,7 +1004,7 @@ async function toggleCostType(id) {
         });
 
         if (updateResponse.ok) {
-            loadKosten();
+            syncKosten();
         } else {
             console.error('Fehler beim Aktualisieren des Kostentyps');
         }
@@ -878,7 +1022,7 @@ async function deleteKosten(id) {
         });
 
         if (response.ok) {
-            loadKosten();
+            syncKosten();
         }
     } catch (error) {
         console.error('Error:', error);
@@ -0,0 +1,75 @@
+"""
+Gemeinsame Fixtures der Tests.
+
+app.py legt beim Import die Datenbank an bzw. migriert sie. Deshalb zeigen
+DATABASE_PATH und METRICS_DIR schon vor dem Import auf ein temporäres
+Verzeichnis, eine vorhandene kosten.db wird nie angefasst.
+"""
+import atexit
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = tempfile.mkdtemp(prefix='verwalco-tests-')
+atexit.register(shutil.rmtree, TMP_DIR, ignore_errors=True)
+
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'kosten.db')
+os.environ['METRICS_DIR'] = os.path.join(TMP_DIR, 'metrics')
+os.environ.pop('SHARD_DIR', None)
+# Schnelles Hashing, die Tests registrieren viele User
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+sys.path.insert(0, ROOT)
+
+import app as verwalco  # noqa: E402
+
+TEST_PASSWORD = 'geheim123'
+_usernames = (f'test{i:04d}' for i in itertools.count())
+
+
+@pytest.fixture
+def app_module():
+    return verwalco
+
+
+@pytest.fixture
+def register():
+    """Legt einen neuen User an und gibt (Test-Client, User-ID) zurück"""
+    def register():
+        username = next(_usernames)
+        client = verwalco.app.test_client()
+        client.post('/register', data={'username': username, 'email': f'{username}@example.com',
+                                       'password': TEST_PASSWORD, 'password_confirm': TEST_PASSWORD})
+        with client.session_transaction() as session:
+            user_id = session['user_id']
+        return client, user_id
+    return register
+
+
+@pytest.fixture
+def client(register):
+    return register()[0]
+
+
+def add_kosten(client, bezeichnung, month, year, konto='Girokonto', cost_type='one-time', betrag='10'):
+    """Legt einen Eintrag über die API an und gibt ihn als dict zurück"""
+    response = client.post('/api/kosten', json={'bezeichnung': bezeichnung, 'betrag': betrag, 'zahlungstag': 3,
+                                                'konto': konto, 'month': month, 'year': year,
+                                                'cost_type': cost_type})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['data']
+
+
+def create_month(client, month, year):
+    """Legt den Monat über /api/create-month an (wiederkehrende Kosten gelten dort über ihre Vorlage)"""
+    response = client.post('/api/create-month', json={'month': month, 'year': year})
+    assert response.status_code == 200, response.get_json()
+
+
+def kosten_by_name(client, month, year):
+    """Einträge des Monats aus /api/kosten als {bezeichnung: dict}"""
+    return {row['bezeichnung']: row for row in client.get(f'/api/kosten?month={month}&year={year}').get_json()}
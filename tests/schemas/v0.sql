@@ -0,0 +1,9 @@
+-- kosten.db vor der ersten Migration (user_version 0)
+CREATE TABLE "kosten" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "bezeichnung" VARCHAR(255) NOT NULL, "betrag" REAL NOT NULL, "zahlungstag" INTEGER NOT NULL, "konto" VARCHAR(255) NOT NULL, "bezahlt" INTEGER NOT NULL, "position" INTEGER NOT NULL, "cost_type" VARCHAR(255) NOT NULL, "month" INTEGER NOT NULL, "year" INTEGER NOT NULL, "exclude_from_total" INTEGER NOT NULL, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE);
+CREATE TABLE "password_resets" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "token" VARCHAR(255) NOT NULL, "created_at" DATETIME NOT NULL, "expires_at" DATETIME NOT NULL, "used" INTEGER NOT NULL, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE);
+CREATE TABLE "users" ("id" INTEGER NOT NULL PRIMARY KEY, "username" VARCHAR(255) NOT NULL, "email" VARCHAR(255) NOT NULL, "password_hash" VARCHAR(255) NOT NULL, "created_at" DATETIME NOT NULL);
+CREATE INDEX "kosten_user_id" ON "kosten" ("user_id");
+CREATE UNIQUE INDEX "passwordreset_token" ON "password_resets" ("token");
+CREATE INDEX "passwordreset_user_id" ON "password_resets" ("user_id");
+CREATE UNIQUE INDEX "user_email" ON "users" ("email");
+CREATE UNIQUE INDEX "user_username" ON "users" ("username");
@@ -0,0 +1,24 @@
+-- kosten.db nach Migration 4 (Konten-Tabelle), user_version 4
+CREATE TABLE "konten" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "name" VARCHAR(255) NOT NULL, "exclude_from_total" INTEGER NOT NULL, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE);
+CREATE TABLE "konto_months" ("id" INTEGER NOT NULL PRIMARY KEY, "konto_id" INTEGER NOT NULL, "year" INTEGER NOT NULL, "month" INTEGER NOT NULL, "exclude_from_total" INTEGER NOT NULL, FOREIGN KEY ("konto_id") REFERENCES "konten" ("id") ON DELETE CASCADE);
+CREATE TABLE "kosten" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "bezeichnung" VARCHAR(255) NOT NULL, "betrag" REAL NOT NULL, "zahlungstag" INTEGER NOT NULL, "konto_id" INTEGER NOT NULL, "bezahlt" INTEGER NOT NULL, "position" INTEGER NOT NULL, "cost_type" VARCHAR(255) NOT NULL, "month" INTEGER NOT NULL, "year" INTEGER NOT NULL, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE, FOREIGN KEY ("konto_id") REFERENCES "konten" ("id") ON DELETE CASCADE);
+CREATE TABLE "kosten_month_summaries" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "year" INTEGER NOT NULL, "month" INTEGER NOT NULL, "konto_id" INTEGER NOT NULL, "count" INTEGER NOT NULL, "total" REAL NOT NULL, "paid" REAL NOT NULL, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE, FOREIGN KEY ("konto_id") REFERENCES "konten" ("id") ON DELETE CASCADE);
+CREATE TABLE "kosten_versions" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "year" INTEGER NOT NULL, "month" INTEGER NOT NULL, "version" INTEGER NOT NULL, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE);
+CREATE TABLE "password_resets" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "token" VARCHAR(255) NOT NULL, "created_at" DATETIME NOT NULL, "expires_at" DATETIME NOT NULL, "used" INTEGER NOT NULL, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE);
+CREATE TABLE "users" ("id" INTEGER NOT NULL PRIMARY KEY, "username" VARCHAR(255) NOT NULL, "email" VARCHAR(255) NOT NULL, "password_hash" VARCHAR(255) NOT NULL, "created_at" DATETIME NOT NULL);
+CREATE INDEX "konto_user_id" ON "konten" ("user_id");
+CREATE UNIQUE INDEX "konto_user_id_name" ON "konten" ("user_id", "name");
+CREATE INDEX "kontomonth_konto_id" ON "konto_months" ("konto_id");
+CREATE UNIQUE INDEX "kontomonth_konto_id_year_month" ON "konto_months" ("konto_id", "year", "month");
+CREATE INDEX "kosten_konto_id" ON "kosten" ("konto_id");
+CREATE INDEX "kosten_user_id" ON "kosten" ("user_id");
+CREATE INDEX "kosten_user_id_year_month_konto_id_position_zahlungstag" ON "kosten" ("user_id", "year", "month", "konto_id", "position", "zahlungstag");
+CREATE INDEX "kostenmonthsummary_konto_id" ON "kosten_month_summaries" ("konto_id");
+CREATE INDEX "kostenmonthsummary_user_id" ON "kosten_month_summaries" ("user_id");
+CREATE UNIQUE INDEX "kostenmonthsummary_user_id_year_month_konto_id" ON "kosten_month_summaries" ("user_id", "year", "month", "konto_id");
+CREATE INDEX "kostenversion_user_id" ON "kosten_versions" ("user_id");
+CREATE UNIQUE INDEX "kostenversion_user_id_year_month" ON "kosten_versions" ("user_id", "year", "month");
+CREATE UNIQUE INDEX "passwordreset_token" ON "password_resets" ("token");
+CREATE INDEX "passwordreset_user_id" ON "password_resets" ("user_id");
+CREATE UNIQUE INDEX "user_email" ON "users" ("email");
+CREATE UNIQUE INDEX "user_username" ON "users" ("username");
@@ -0,0 +1,64 @@
+-- kosten.db nach Migration 8 (Volltextsuche), user_version 8
+CREATE TABLE "konten" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "name" VARCHAR(255) NOT NULL, "exclude_from_total" INTEGER NOT NULL, "updated_seq" INTEGER NOT NULL DEFAULT 0, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE);
+CREATE TABLE "konto_months" ("id" INTEGER NOT NULL PRIMARY KEY, "konto_id" INTEGER NOT NULL, "year" INTEGER NOT NULL, "month" INTEGER NOT NULL, "exclude_from_total" INTEGER NOT NULL, FOREIGN KEY ("konto_id") REFERENCES "konten" ("id") ON DELETE CASCADE);
+CREATE TABLE "kosten" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "bezeichnung" VARCHAR(255) NOT NULL, "betrag" REAL NOT NULL, "zahlungstag" INTEGER NOT NULL, "konto_id" INTEGER NOT NULL, "bezahlt" INTEGER NOT NULL, "position" INTEGER NOT NULL, "cost_type" VARCHAR(255) NOT NULL, "month" INTEGER NOT NULL, "year" INTEGER NOT NULL, "template_id" INTEGER, "updated_seq" INTEGER NOT NULL DEFAULT 0, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE, FOREIGN KEY ("konto_id") REFERENCES "konten" ("id") ON DELETE CASCADE, FOREIGN KEY ("template_id") REFERENCES "recurring_templates" ("id"));
+CREATE TABLE "kosten_archive" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "bezeichnung" VARCHAR(255) NOT NULL, "betrag" REAL NOT NULL, "zahlungstag" INTEGER NOT NULL, "konto_id" INTEGER NOT NULL, "bezahlt" INTEGER NOT NULL, "position" INTEGER NOT NULL, "cost_type" VARCHAR(255) NOT NULL, "month" INTEGER NOT NULL, "year" INTEGER NOT NULL, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE, FOREIGN KEY ("konto_id") REFERENCES "konten" ("id") ON DELETE CASCADE);
+CREATE TABLE "kosten_month_summaries" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "year" INTEGER NOT NULL, "month" INTEGER NOT NULL, "konto_id" INTEGER NOT NULL, "count" INTEGER NOT NULL, "total" REAL NOT NULL, "paid" REAL NOT NULL, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE, FOREIGN KEY ("konto_id") REFERENCES "konten" ("id") ON DELETE CASCADE);
+CREATE TABLE "kosten_months" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "year" INTEGER NOT NULL, "month" INTEGER NOT NULL, "updated_seq" INTEGER NOT NULL DEFAULT 0, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE);
+CREATE VIRTUAL TABLE "kosten_search" USING fts5("bezeichnung", "konto", "owner", tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3');
+CREATE TABLE "kosten_tombstones" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "kosten_id" INTEGER NOT NULL, "month" INTEGER NOT NULL, "year" INTEGER NOT NULL, "seq" INTEGER NOT NULL, "created_at" DATETIME NOT NULL, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE);
+CREATE TABLE "kosten_versions" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "year" INTEGER NOT NULL, "month" INTEGER NOT NULL, "version" INTEGER NOT NULL, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE);
+CREATE TABLE "maintenance_runs" ("id" INTEGER NOT NULL PRIMARY KEY, "started_at" DATETIME NOT NULL, "finished_at" DATETIME, "report" TEXT);
+CREATE TABLE "password_resets" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "token" VARCHAR(255) NOT NULL, "created_at" DATETIME NOT NULL, "expires_at" DATETIME NOT NULL, "used" INTEGER NOT NULL, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE);
+CREATE TABLE "recurring_templates" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, "bezeichnung" VARCHAR(255) NOT NULL, "betrag" REAL NOT NULL, "zahlungstag" INTEGER NOT NULL, "konto_id" INTEGER NOT NULL, "position" INTEGER NOT NULL, "valid_from" INTEGER NOT NULL, "valid_to" INTEGER, "updated_seq" INTEGER NOT NULL DEFAULT 0, FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE, FOREIGN KEY ("konto_id") REFERENCES "konten" ("id") ON DELETE CASCADE);
+CREATE TABLE "sync_sequence" ("id" INTEGER NOT NULL PRIMARY KEY, "seq" INTEGER NOT NULL, "purged_seq" INTEGER NOT NULL);
+CREATE TABLE "users" ("id" INTEGER NOT NULL PRIMARY KEY, "username" VARCHAR(255) NOT NULL, "email" VARCHAR(255) NOT NULL, "password_hash" VARCHAR(255) NOT NULL, "created_at" DATETIME NOT NULL);
+CREATE INDEX "konto_user_id" ON "konten" ("user_id");
+CREATE UNIQUE INDEX "konto_user_id_name" ON "konten" ("user_id", "name");
+CREATE INDEX "kontomonth_konto_id" ON "konto_months" ("konto_id");
+CREATE UNIQUE INDEX "kontomonth_konto_id_year_month" ON "konto_months" ("konto_id", "year", "month");
+CREATE INDEX "kosten_konto_id" ON "kosten" ("konto_id");
+CREATE UNIQUE INDEX "kosten_template_id_year_month" ON "kosten" ("template_id", "year", "month") WHERE "template_id" IS NOT NULL;
+CREATE INDEX "kosten_user_id" ON "kosten" ("user_id");
+CREATE INDEX "kosten_user_id_year_month_konto_id_position_zahlungstag" ON "kosten" ("user_id", "year", "month", "konto_id", "position", "zahlungstag");
+CREATE INDEX "kostenarchive_konto_id" ON "kosten_archive" ("konto_id");
+CREATE INDEX "kostenarchive_user_id" ON "kosten_archive" ("user_id");
+CREATE INDEX "kostenarchive_user_id_year_month" ON "kosten_archive" ("user_id", "year", "month");
+CREATE INDEX "kostenmonth_user_id" ON "kosten_months" ("user_id");
+CREATE UNIQUE INDEX "kostenmonth_user_id_year_month" ON "kosten_months" ("user_id", "year", "month");
+CREATE INDEX "kostenmonthsummary_konto_id" ON "kosten_month_summaries" ("konto_id");
+CREATE INDEX "kostenmonthsummary_user_id" ON "kosten_month_summaries" ("user_id");
+CREATE UNIQUE INDEX "kostenmonthsummary_user_id_year_month_konto_id" ON "kosten_month_summaries" ("user_id", "year", "month", "konto_id");
+CREATE INDEX "kostentombstone_created_at" ON "kosten_tombstones" ("created_at");
+CREATE INDEX "kostentombstone_user_id" ON "kosten_tombstones" ("user_id");
+CREATE INDEX "kostentombstone_user_id_seq" ON "kosten_tombstones" ("user_id", "seq");
+CREATE INDEX "kostenversion_user_id" ON "kosten_versions" ("user_id");
+CREATE UNIQUE INDEX "kostenversion_user_id_year_month" ON "kosten_versions" ("user_id", "year", "month");
+CREATE INDEX "maintenancerun_started_at" ON "maintenance_runs" ("started_at");
+CREATE INDEX "passwordreset_expires_at" ON "password_resets" ("expires_at");
+CREATE UNIQUE INDEX "passwordreset_token" ON "password_resets" ("token");
+CREATE INDEX "passwordreset_user_id" ON "password_resets" ("user_id");
+CREATE INDEX "recurringtemplate_konto_id" ON "recurring_templates" ("konto_id");
+CREATE INDEX "recurringtemplate_user_id" ON "recurring_templates" ("user_id");
+CREATE INDEX "recurringtemplate_user_id_valid_from" ON "recurring_templates" ("user_id", "valid_from");
+CREATE UNIQUE INDEX "user_email" ON "users" ("email");
+CREATE UNIQUE INDEX "user_username" ON "users" ("username");
+CREATE TRIGGER "konten_search_update" AFTER UPDATE OF "name" ON "konten" BEGIN UPDATE "kosten_search" SET "konto" = NEW."name" WHERE "rowid" IN (SELECT "id" * 4 + 1 FROM "kosten" WHERE "user_id" = NEW."user_id" AND "konto_id" = NEW."id" UNION ALL SELECT "id" * 4 + 2 FROM "kosten_archive" WHERE "user_id" = NEW."user_id" AND "konto_id" = NEW."id" UNION ALL SELECT "id" * 4 + 3 FROM "recurring_templates" WHERE "user_id" = NEW."user_id" AND "konto_id" = NEW."id"); END;
+CREATE TRIGGER "konten_sync_update" AFTER UPDATE OF "name", "exclude_from_total" ON "konten" BEGIN UPDATE "sync_sequence" SET "seq" = "seq" + 1 WHERE "id" = 1; UPDATE "konten" SET "updated_seq" = (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1) WHERE "id" = NEW."id"; END;
+CREATE TRIGGER "konto_months_sync_delete" AFTER DELETE ON "konto_months" BEGIN UPDATE "sync_sequence" SET "seq" = "seq" + 1 WHERE "id" = 1; UPDATE "konten" SET "updated_seq" = (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1) WHERE "id" = OLD."konto_id"; END;
+CREATE TRIGGER "konto_months_sync_insert" AFTER INSERT ON "konto_months" BEGIN UPDATE "sync_sequence" SET "seq" = "seq" + 1 WHERE "id" = 1; UPDATE "konten" SET "updated_seq" = (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1) WHERE "id" = NEW."konto_id"; END;
+CREATE TRIGGER "konto_months_sync_update" AFTER UPDATE ON "konto_months" BEGIN UPDATE "sync_sequence" SET "seq" = "seq" + 1 WHERE "id" = 1; UPDATE "konten" SET "updated_seq" = (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1) WHERE "id" = NEW."konto_id"; END;
+CREATE TRIGGER "kosten_archive_search_delete" AFTER DELETE ON "kosten_archive" BEGIN DELETE FROM "kosten_search" WHERE "rowid" = OLD."id" * 4 + 2; END;
+CREATE TRIGGER "kosten_archive_search_insert" AFTER INSERT ON "kosten_archive" BEGIN INSERT INTO "kosten_search" ("rowid", "bezeichnung", "konto", "owner") VALUES (NEW."id" * 4 + 2, NEW."bezeichnung", (SELECT "name" FROM "konten" WHERE "id" = NEW."konto_id"), 'u' || NEW."user_id"); END;
+CREATE TRIGGER "kosten_archive_search_update" AFTER UPDATE OF "bezeichnung", "konto_id" ON "kosten_archive" BEGIN UPDATE "kosten_search" SET "bezeichnung" = NEW."bezeichnung", "konto" = (SELECT "name" FROM "konten" WHERE "id" = NEW."konto_id") WHERE "rowid" = NEW."id" * 4 + 2; END;
+CREATE TRIGGER "kosten_months_sync_delete" AFTER DELETE ON "kosten_months" BEGIN UPDATE "sync_sequence" SET "seq" = "seq" + 1 WHERE "id" = 1; INSERT INTO "kosten_tombstones" ("user_id", "kosten_id", "month", "year", "seq", "created_at") SELECT OLD."user_id", -("t"."id" * 1000000 + OLD."year" * 100 + OLD."month"), OLD."month", OLD."year", (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1), datetime('now', 'localtime') FROM "recurring_templates" AS "t" WHERE "t"."user_id" = OLD."user_id" AND OLD."year" * 100 + OLD."month" BETWEEN "t"."valid_from" AND COALESCE("t"."valid_to", 999999); END;
+CREATE TRIGGER "kosten_months_sync_insert" AFTER INSERT ON "kosten_months" BEGIN UPDATE "sync_sequence" SET "seq" = "seq" + 1 WHERE "id" = 1; UPDATE "kosten_months" SET "updated_seq" = (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1) WHERE "id" = NEW."id"; END;
+CREATE TRIGGER "kosten_sync_delete" AFTER DELETE ON "kosten" BEGIN UPDATE "sync_sequence" SET "seq" = "seq" + 1 WHERE "id" = 1; INSERT INTO "kosten_tombstones" ("user_id", "kosten_id", "month", "year", "seq", "created_at") VALUES (OLD."user_id", OLD."id", OLD."month", OLD."year", (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1), datetime('now', 'localtime')); UPDATE "kosten_months" SET "updated_seq" = (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1) WHERE OLD."template_id" IS NOT NULL AND "user_id" = OLD."user_id" AND "year" = OLD."year" AND "month" = OLD."month"; END;
+CREATE TRIGGER "kosten_sync_insert" AFTER INSERT ON "kosten" BEGIN UPDATE "sync_sequence" SET "seq" = "seq" + 1 WHERE "id" = 1; UPDATE "kosten" SET "updated_seq" = (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1) WHERE "id" = NEW."id"; INSERT INTO "kosten_tombstones" ("user_id", "kosten_id", "month", "year", "seq", "created_at") SELECT NEW."user_id", -(NEW."template_id" * 1000000 + NEW."year" * 100 + NEW."month"), NEW."month", NEW."year", (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1), datetime('now', 'localtime') WHERE NEW."template_id" IS NOT NULL; END;
+CREATE TRIGGER "kosten_sync_update" AFTER UPDATE OF "bezeichnung", "betrag", "zahlungstag", "konto_id", "bezahlt", "position", "cost_type", "month", "year", "template_id" ON "kosten" BEGIN UPDATE "sync_sequence" SET "seq" = "seq" + 1 WHERE "id" = 1; UPDATE "kosten" SET "updated_seq" = (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1) WHERE "id" = NEW."id"; INSERT INTO "kosten_tombstones" ("user_id", "kosten_id", "month", "year", "seq", "created_at") SELECT OLD."user_id", OLD."id", OLD."month", OLD."year", (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1), datetime('now', 'localtime') WHERE OLD."month" != NEW."month" OR OLD."year" != NEW."year"; END;
+CREATE TRIGGER "recurring_templates_search_delete" AFTER DELETE ON "recurring_templates" BEGIN DELETE FROM "kosten_search" WHERE "rowid" = OLD."id" * 4 + 3; END;
+CREATE TRIGGER "recurring_templates_search_insert" AFTER INSERT ON "recurring_templates" BEGIN INSERT INTO "kosten_search" ("rowid", "bezeichnung", "konto", "owner") VALUES (NEW."id" * 4 + 3, NEW."bezeichnung", (SELECT "name" FROM "konten" WHERE "id" = NEW."konto_id"), 'u' || NEW."user_id"); END;
+CREATE TRIGGER "recurring_templates_search_update" AFTER UPDATE OF "bezeichnung", "konto_id" ON "recurring_templates" BEGIN UPDATE "kosten_search" SET "bezeichnung" = NEW."bezeichnung", "konto" = (SELECT "name" FROM "konten" WHERE "id" = NEW."konto_id") WHERE "rowid" = NEW."id" * 4 + 3; END;
+CREATE TRIGGER "recurring_templates_sync_delete" AFTER DELETE ON "recurring_templates" BEGIN UPDATE "sync_sequence" SET "seq" = "seq" + 1 WHERE "id" = 1; INSERT INTO "kosten_tombstones" ("user_id", "kosten_id", "month", "year", "seq", "created_at") SELECT "m"."user_id", -(OLD."id" * 1000000 + "m"."year" * 100 + "m"."month"), "m"."month", "m"."year", (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1), datetime('now', 'localtime') FROM "kosten_months" AS "m" WHERE "m"."user_id" = OLD."user_id" AND "m"."year" * 100 + "m"."month" BETWEEN OLD."valid_from" AND COALESCE(OLD."valid_to", 999999); END;
+CREATE TRIGGER "recurring_templates_sync_insert" AFTER INSERT ON "recurring_templates" BEGIN UPDATE "sync_sequence" SET "seq" = "seq" + 1 WHERE "id" = 1; UPDATE "recurring_templates" SET "updated_seq" = (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1) WHERE "id" = NEW."id"; END;
+CREATE TRIGGER "recurring_templates_sync_update" AFTER UPDATE OF "bezeichnung", "betrag", "zahlungstag", "konto_id", "position", "valid_from", "valid_to" ON "recurring_templates" BEGIN UPDATE "sync_sequence" SET "seq" = "seq" + 1 WHERE "id" = 1; UPDATE "recurring_templates" SET "updated_seq" = (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1) WHERE "id" = NEW."id"; INSERT INTO "kosten_tombstones" ("user_id", "kosten_id", "month", "year", "seq", "created_at") SELECT "m"."user_id", -(OLD."id" * 1000000 + "m"."year" * 100 + "m"."month"), "m"."month", "m"."year", (SELECT "seq" FROM "sync_sequence" WHERE "id" = 1), datetime('now', 'localtime') FROM "kosten_months" AS "m" WHERE "m"."user_id" = OLD."user_id" AND "m"."year" * 100 + "m"."month" BETWEEN OLD."valid_from" AND COALESCE(OLD."valid_to", 999999) AND "m"."year" * 100 + "m"."month" NOT BETWEEN NEW."valid_from" AND COALESCE(NEW."valid_to", 999999); END;
@@ -0,0 +1,76 @@
+"""
+Archivierte Monate (archive_months): Einträge wandern mit ihrer ID nach
+kosten_archive und bleiben über kosten_view und die Suche lesbar,
+Schreibzugriffe antworten mit 409 statt mit 404.
+"""
+import pytest
+
+from conftest import add_kosten
+
+MONTH, YEAR = 3, 2020
+
+
+def archive(app_module):
+    with app_module.db.connection_context():
+        app_module.archive_months((MONTH + 1, YEAR))
+
+
+def test_archived_ids_are_not_reused(app_module, client):
+    add_kosten(client, 'Strom', 5, 2026)
+    # Höchste ID der Tabelle, ohne AUTOINCREMENT bekäme die nächste Zeile sie neu
+    miete = add_kosten(client, 'Miete', MONTH, YEAR)
+    archive(app_module)
+    wasser = add_kosten(client, 'Wasser', 5, 2026)
+    assert wasser['id'] > miete['id']
+
+    result = client.get('/api/search?q=Miete').get_json()
+    assert [(kosten['id'], kosten['bezeichnung']) for group in result['groups'] for kosten in group['kosten']] \
+        == [(miete['id'], 'Miete')]
+
+
+@pytest.fixture
+def archived(app_module, client):
+    """Test-Client mit einem archivierten Monat, gibt (Test-Client, Eintrag) zurück"""
+    kosten = add_kosten(client, 'Miete', MONTH, YEAR)
+    add_kosten(client, 'Strom', MONTH, YEAR)
+    archive(app_module)
+    return client, kosten
+
+
+def test_archived_rows_are_marked(archived):
+    client, kosten = archived
+    rows = client.get(f'/api/kosten?month={MONTH}&year={YEAR}').get_json()
+    assert {row['bezeichnung'] for row in rows} == {'Miete', 'Strom'}
+    assert all(row['archived'] is True for row in rows)
+    assert add_kosten(client, 'Neu', 5, 2026)['archived'] is False
+
+
+def test_writes_to_archived_rows_return_409(app_module, archived):
+    client, kosten = archived
+    url = f'/api/kosten/{kosten["id"]}'
+    assert client.put(url, json={'bezahlt': True}).status_code == 409
+    assert client.delete(url).status_code == 409
+    assert client.post('/api/kosten/reorder', json={'id': kosten['id'], 'index': 0}).status_code == 409
+    assert client.post('/api/kosten/reorder', json=[{'id': kosten['id'], 'position': 1}]).status_code == 409
+
+    response = client.post('/api/kosten/batch', json={'operations': [{'op': 'toggle', 'id': kosten['id']}]})
+    assert response.status_code == 409
+    assert response.get_json()['results'][0]['error'] == app_module.ARCHIVED_ERROR
+
+    response = client.post('/api/kosten', json={'bezeichnung': 'Neu', 'betrag': '1', 'zahlungstag': 1,
+                                                'konto': 'Girokonto', 'month': MONTH, 'year': YEAR})
+    assert response.status_code == 409
+    rows = client.get(f'/api/kosten?month={MONTH}&year={YEAR}').get_json()
+    assert len(rows) == 2 and not any(row['bezahlt'] for row in rows)
+
+
+def test_unknown_id_is_still_404(client):
+    assert client.put('/api/kosten/999999999', json={'bezahlt': True}).status_code == 404
+
+
+def test_import_into_archived_month_returns_409(archived):
+    client, kosten = archived
+    response = client.post('/api/import', data=f'bezeichnung,betrag,zahlungstag,konto,month,year\n'
+                                                f'Neu,1,1,Girokonto,{MONTH},{YEAR}\n')
+    assert response.status_code == 409
+    assert response.get_json()['months'] == [{'month': MONTH, 'year': YEAR}]
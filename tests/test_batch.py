@@ -0,0 +1,84 @@
+"""
+/api/kosten/batch: alle Operationen in einer Transaktion, eine ungültige
+Operation verhindert alle anderen (400 mit einem Ergebnis pro Operation).
+"""
+import pytest
+
+from conftest import add_kosten, create_month, kosten_by_name
+
+
+def batch(client, operations, query=''):
+    return client.post(f'/api/kosten/batch{query}', json={'operations': operations})
+
+
+def test_invalid_operation_rolls_back_everything(client):
+    miete = add_kosten(client, 'Miete', 5, 2026)
+    response = batch(client, [
+        {'op': 'toggle', 'id': miete['id']},
+        {'op': 'create', 'data': {'bezeichnung': 'Neu', 'betrag': '5', 'zahlungstag': 1, 'konto': 'Girokonto',
+                                  'month': 5, 'year': 2026}},
+        {'op': 'update', 'id': miete['id'] + 100000, 'data': {'betrag': '1'}},
+    ])
+    assert response.status_code == 400
+    results = response.get_json()['results']
+    assert [result['success'] for result in results] == [True, True, False]
+    assert results[2]['error'] == 'Eintrag nicht gefunden'
+    assert set(kosten_by_name(client, 5, 2026)) == {'Miete'}
+    assert kosten_by_name(client, 5, 2026)['Miete']['bezahlt'] is False
+
+
+def test_duplicate_id_is_rejected(client):
+    miete = add_kosten(client, 'Miete', 5, 2026)
+    response = batch(client, [{'op': 'toggle', 'id': miete['id']},
+                              {'op': 'delete', 'id': miete['id']}])
+    assert response.status_code == 400
+    assert response.get_json()['results'][1]['error'] == 'Eintrag mehrfach im Batch'
+    assert 'Miete' in kosten_by_name(client, 5, 2026)
+
+
+@pytest.mark.parametrize('kosten_id', [[1], {'id': 1}, '1', True, None])
+def test_malformed_id_returns_400(client, kosten_id):
+    add_kosten(client, 'Miete', 5, 2026)
+    response = batch(client, [{'op': 'delete', 'id': kosten_id}])
+    assert response.status_code == 400
+    assert response.get_json()['results'] == [{'index': 0, 'op': 'delete', 'success': False,
+                                               'error': 'Ungültige ID'}]
+
+
+@pytest.mark.parametrize('month, year, error', [('abc', 2026, 'Ungültiger Monat'), (13, 2026, 'Ungültiger Monat'),
+                                                (5, 'abc', 'Ungültiges Jahr'), (5, 20260, 'Ungültiges Jahr')])
+def test_create_with_invalid_month_or_year(client, month, year, error):
+    response = batch(client, [{'op': 'create', 'data': {'bezeichnung': 'Neu', 'betrag': '5', 'zahlungstag': 1,
+                                                        'konto': 'Girokonto', 'month': month, 'year': year}}])
+    assert response.status_code == 400
+    assert response.get_json()['results'][0]['error'] == error
+
+
+def test_virtual_template_rows(client):
+    add_kosten(client, 'Miete', 5, 2026, cost_type='recurring', betrag='800')
+    add_kosten(client, 'Strom', 5, 2026, cost_type='recurring', betrag='60')
+    create_month(client, 6, 2026)
+    june = kosten_by_name(client, 6, 2026)
+    assert june['Miete']['id'] < 0 and june['Strom']['id'] < 0
+
+    response = batch(client, [{'op': 'toggle', 'id': june['Miete']['id']},
+                              {'op': 'update', 'id': june['Strom']['id'], 'data': {'betrag': '65'}}])
+    assert response.status_code == 200
+    new_ids = [result['id'] for result in response.get_json()['results']]
+    assert all(new_id > 0 for new_id in new_ids)
+
+    june = kosten_by_name(client, 6, 2026)
+    assert (june['Miete']['id'], june['Miete']['bezahlt']) == (new_ids[0], True)
+    assert (june['Strom']['id'], june['Strom']['betrag']) == (new_ids[1], 65.0)
+    # Nur der Juni hat eine eigene Zeile, Mai bleibt unverändert
+    may = kosten_by_name(client, 5, 2026)
+    assert may['Miete']['bezahlt'] is False and may['Strom']['betrag'] == 60.0
+
+
+def test_totals(client):
+    miete = add_kosten(client, 'Miete', 5, 2026, betrag='800')
+    add_kosten(client, 'Strom', 5, 2026, betrag='60')
+    response = batch(client, [{'op': 'toggle', 'id': miete['id'], 'bezahlt': True}], '?totals=1&month=5&year=2026')
+    totals = response.get_json()['totals']
+    assert (totals['total'], totals['paid'], totals['open']) == (860.0, 800.0, 60.0)
+    assert totals == client.get('/api/kosten/summary?month=5&year=2026').get_json()
@@ -0,0 +1,45 @@
+"""
+build_assets.py: läuft ohne App-Import (keine Migrationen) und behält nur
+die Dateien des aktuellen und des vorherigen Builds.
+"""
+import os
+import shutil
+import subprocess
+import sys
+
+import build_assets
+from conftest import ROOT
+
+# Läuft im Kindprozess: nach dem Build darf weder app.py noch peewee geladen sein
+BUILD_CHECK = '''
+import sys
+import build_assets
+build_assets.main(['--static-folder', sys.argv[1]])
+assert not {'app', 'flask', 'peewee'} & set(sys.modules), sorted(sys.modules)
+'''
+
+
+def copy_static(tmp_path):
+    static = tmp_path / 'static'
+    shutil.copytree(os.path.join(ROOT, 'static'), static, ignore=shutil.ignore_patterns('dist'))
+    return static
+
+
+def test_build_does_not_import_app(tmp_path):
+    static = copy_static(tmp_path)
+    result = subprocess.run([sys.executable, '-c', BUILD_CHECK, str(static)], cwd=tmp_path,
+                            env=dict(os.environ, PYTHONPATH=ROOT), capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert (static / 'dist' / 'manifest.json').exists()
+    assert not (tmp_path / 'kosten.db').exists()
+
+
+def test_build_keeps_previous_files(tmp_path):
+    static = copy_static(tmp_path)
+    source = static / 'css' / 'style.css'
+    files = []
+    for rule in ('', '.x1{a:b}', '.x2{a:b}'):
+        source.write_text(source.read_text() + rule)
+        files.append(os.path.basename(build_assets.build_assets(str(static))['css/style.css']['file']))
+    remaining = os.listdir(static / 'dist' / 'css')
+    assert files[0] not in remaining and files[1] in remaining and files[2] in remaining
@@ -0,0 +1,71 @@
+"""
+Änderungs-Feed (/api/kosten/changes): die SYNC_TRIGGERS setzen updated_seq
+bzw. schreiben kosten_tombstones, ein Client mit Stand `since` bekommt nur
+die seitdem geänderten Einträge und gelöschten IDs.
+"""
+from datetime import datetime, timedelta
+
+from conftest import add_kosten
+
+
+def changes(client, since, month=5, year=2026):
+    return client.get(f'/api/kosten/changes?since={since}&month={month}&year={year}').get_json()
+
+
+def changed_names(result):
+    index = result['columns'].index('bezeichnung')
+    return sorted(row[index] for row in result['rows'])
+
+
+def test_since_returns_only_later_changes(client):
+    miete = add_kosten(client, 'Miete', 5, 2026)
+    add_kosten(client, 'Strom', 5, 2026)
+    add_kosten(client, 'Anderer Monat', 6, 2026)
+    seq = changes(client, 0)['seq']
+    assert changed_names(changes(client, seq)) == []
+
+    client.put(f'/api/kosten/{miete["id"]}', json={'bezahlt': True})
+    add_kosten(client, 'Wasser', 5, 2026)
+    result = changes(client, seq)
+    assert not result['reset'] and result['seq'] > seq
+    assert changed_names(result) == ['Miete', 'Wasser']
+    assert changed_names(changes(client, result['seq'])) == []
+
+
+def test_deletes_are_reported(client):
+    miete = add_kosten(client, 'Miete', 5, 2026)
+    strom = add_kosten(client, 'Strom', 5, 2026)
+    seq = changes(client, 0)['seq']
+    client.delete(f'/api/kosten/{miete["id"]}')
+    client.post('/api/kosten/batch', json={'operations': [{'op': 'delete', 'id': strom['id']}]})
+    result = changes(client, seq)
+    assert result['deleted'] == sorted([miete['id'], strom['id']]) and result['rows'] == []
+
+
+def test_konto_rename_returns_its_rows(client):
+    add_kosten(client, 'Miete', 5, 2026)
+    add_kosten(client, 'Netflix', 5, 2026, konto='Kreditkarte')
+    seq = changes(client, 0)['seq']
+    client.post('/api/konten/rename', json={'old_name': 'Girokonto', 'new_name': 'Hauskonto'})
+    result = changes(client, seq)
+    assert changed_names(result) == ['Miete']
+    assert result['rows'][0][result['columns'].index('konto')] == 'Hauskonto'
+
+
+def test_reset_after_purged_tombstones(app_module, client):
+    miete = add_kosten(client, 'Miete', 5, 2026)
+    seq = changes(client, 0)['seq']
+    client.delete(f'/api/kosten/{miete["id"]}')
+
+    SyncSequence = app_module.SyncSequence
+    with app_module.db.connection_context():
+        purged_seq = SyncSequence.get_by_id(1).purged_seq
+        assert app_module.purge_tombstones(now=datetime.now() + timedelta(days=app_module.TOMBSTONE_KEEP_DAYS + 1))
+    try:
+        result = changes(client, seq)
+        assert result['reset'] is True and 'rows' not in result
+        assert changes(client, result['seq'])['reset'] is False
+    finally:
+        # Andere Tests arbeiten mit älteren Ständen
+        with app_module.db.connection_context():
+            SyncSequence.update(purged_seq=purged_seq).where(SyncSequence.id == 1).execute()
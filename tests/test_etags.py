@@ -0,0 +1,45 @@
+"""
+ETags der Monatsansicht: unveränderte Daten antworten auf If-None-Match mit
+304, nach einer Änderung im Monat kommt 200 mit neuem ETag.
+"""
+import pytest
+
+from conftest import add_kosten
+
+URLS = ['/api/kosten?month=5&year=2026', '/api/kosten/summary?month=5&year=2026']
+
+
+def get(client, url, etag=None):
+    return client.get(url, headers={'If-None-Match': etag} if etag else {})
+
+
+@pytest.mark.parametrize('url', URLS)
+def test_month_etag(client, url):
+    kosten = add_kosten(client, 'Miete', 5, 2026)
+    first = get(client, url)
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag
+    response = get(client, url, etag)
+    assert response.status_code == 304 and response.get_data() == b''
+
+    # Änderung in einem anderen Monat: weiter 304
+    add_kosten(client, 'Strom', 6, 2026)
+    assert get(client, url, etag).status_code == 304
+
+    client.put(f'/api/kosten/{kosten["id"]}', json={'bezahlt': True})
+    response = get(client, url, etag)
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    assert get(client, url, response.headers['ETag']).status_code == 304
+
+
+def test_konten_etag(client):
+    add_kosten(client, 'Miete', 5, 2026)
+    etag = get(client, '/api/konten').headers['ETag']
+    assert get(client, '/api/konten', etag).status_code == 304
+    add_kosten(client, 'Strom', 5, 2026)
+    assert get(client, '/api/konten', etag).status_code == 304
+
+    add_kosten(client, 'Netflix', 5, 2026, konto='Kreditkarte')
+    response = get(client, '/api/konten', etag)
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    assert response.get_json() == ['Girokonto', 'Kreditkarte']
@@ -0,0 +1,28 @@
+"""
+/api/events: jeder Stream belegt einen Gunicorn-Thread, aber zwischen zwei
+Blicken auf sync_sequence keine Datenbank-Verbindung.
+"""
+import pytest
+
+
+@pytest.mark.parametrize('configured, threads, expected', [
+    (None, 4, 1), (None, 8, 2), (2, 4, 2), (3, 4, 2), (0, 4, 0), (None, 1, 0),
+    (None, 0, 2), (5, 0, 5),
+])
+def test_connection_limit_follows_threads(app_module, configured, threads, expected):
+    assert app_module.events_connection_limit(configured, threads) == expected
+
+
+def test_stream_returns_connection_between_polls(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'EVENTS_POLL_INTERVAL', 0)
+    monkeypatch.setattr(app_module, 'EVENTS_HEARTBEAT', 0)
+    monkeypatch.setattr(app_module, 'event_streams', app_module.EventStreams(max_connections=1))
+    response = client.get('/api/events?month=5&year=2026&since=1', buffered=False)
+    assert response.status_code == 200
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b'retry:')
+    # Der Stream läuft im Test im selben Thread, beim Heartbeat ist die Verbindung zurück im Pool
+    assert next(chunks).startswith(b': ping') and app_module.db.is_closed()
+    assert next(chunks).startswith(b': ping') and app_module.db.is_closed()
+    response.close()
+    assert app_module.event_streams.acquire(1)
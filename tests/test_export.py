@@ -0,0 +1,35 @@
+"""
+Export (/api/export): Bool-Spalten als true/false in NDJSON, 0/1 in CSV,
+und der Export lässt sich unverändert wieder importieren.
+"""
+import json
+
+from conftest import add_kosten
+
+
+def test_ndjson_export_has_bools(client):
+    kosten = add_kosten(client, 'Miete', 5, 2026)
+    client.put(f'/api/kosten/{kosten["id"]}', json={'bezahlt': True})
+    add_kosten(client, 'Strom', 5, 2026)
+
+    response = client.get('/api/export?format=ndjson')
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert {row['bezeichnung']: row['bezahlt'] for row in rows} == {'Miete': True, 'Strom': False}
+    assert all(row['exclude_from_total'] is False for row in rows)
+
+
+def test_csv_export_keeps_numbers(client):
+    add_kosten(client, 'Miete', 5, 2026)
+    lines = client.get('/api/export?format=csv').get_data(as_text=True).lstrip('\ufeff').splitlines()
+    assert lines[1].split(';')[6] == '0' and lines[1].split(';')[8] == '0'
+
+
+def test_ndjson_export_roundtrip(register):
+    source, _ = register()
+    add_kosten(source, 'Miete', 5, 2026)
+    export = source.get('/api/export?format=ndjson').get_data()
+
+    target, _ = register()
+    response = target.post('/api/import', data=export)
+    assert response.get_json()['imported'] == 1
+    assert target.get('/api/kosten?month=5&year=2026').get_json()[0]['bezeichnung'] == 'Miete'
@@ -0,0 +1,53 @@
+"""
+Import (/api/import): ungültige Zeilen werden mit Zeilennummer und deutscher
+Meldung abgelehnt, Duplikate (gleiche bezeichnung, konto, month, year) in
+der Datei und gegenüber der Datenbank übersprungen bzw. mit
+?duplicates=import trotzdem angelegt.
+"""
+from conftest import add_kosten, kosten_by_name
+
+HEADER = 'bezeichnung,betrag,zahlungstag,konto,month,year\n'
+
+
+def test_invalid_rows_are_reported(client):
+    response = client.post('/api/import', data=HEADER +
+                           'Miete,800,1,Girokonto,5,2026\n'
+                           'Strom,60,1,Girokonto,abc,2026\n'
+                           'Wasser,30,1,Girokonto,5,zwanzig\n'
+                           'Gas,x,1,Girokonto,5,2026\n'
+                           'Handy,20,1,Girokonto,13,2026\n'
+                           'Netz,40,1,Girokonto,5,99999\n')
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [
+        {'line': 3, 'error': 'Ungültiger Monat'},
+        {'line': 4, 'error': 'Ungültiges Jahr'},
+        {'line': 5, 'error': 'Ungültiges Zahlenformat für Betrag'},
+        {'line': 6, 'error': 'Ungültiger Monat'},
+        {'line': 7, 'error': 'Ungültiges Jahr'},
+    ]
+    # Nichts importiert, auch nicht die gültige erste Zeile
+    assert kosten_by_name(client, 5, 2026) == {}
+
+
+def test_duplicates_are_skipped(client):
+    add_kosten(client, 'Miete', 5, 2026)
+    response = client.post('/api/import', data=HEADER +
+                           'Miete,800,1,Girokonto,5,2026\n'
+                           'Strom,60,1,Girokonto,5,2026\n'
+                           'Strom,60,1,Girokonto,5,2026\n'
+                           'Strom,60,1,Girokonto,6,2026\n')
+    result = response.get_json()
+    assert (result['imported'], result['duplicates'], result['skipped']) == (2, 2, 2)
+    assert result['duplicate_lines'] == [2, 4]
+    assert sorted(row['bezeichnung'] for row in client.get('/api/kosten?month=5&year=2026').get_json()) \
+        == ['Miete', 'Strom']
+
+
+def test_duplicates_can_be_imported(client):
+    add_kosten(client, 'Miete', 5, 2026)
+    response = client.post('/api/import?duplicates=import', data=HEADER +
+                           'Miete,800,1,Girokonto,5,2026\n'
+                           'Miete,800,1,Girokonto,5,2026\n')
+    result = response.get_json()
+    assert (result['imported'], result['duplicates'], result['skipped']) == (2, 2, 0)
+    assert len(client.get('/api/kosten?month=5&year=2026').get_json()) == 3
@@ -0,0 +1,67 @@
+"""
+EXPLAIN QUERY PLAN der häufigsten Abfragen: jede Tabelle wird über einen
+Index gelesen, keine durchsucht die ganze Historie aller User.
+"""
+import pytest
+
+from conftest import add_kosten
+
+MONTH, YEAR = 5, 2026
+MONTH_INDEX = 'kosten_user_id_year_month_konto_id_position_zahlungstag'
+
+
+def query_plan(app_module, query):
+    """Die Zeilen von EXPLAIN QUERY PLAN als Text"""
+    sql, params = query.sql()
+    with app_module.db.connection_context():
+        return [row[3] for row in app_module.db.execute_sql(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()]
+
+
+def assert_no_table_scan(plan, *aliases):
+    """Keine der Tabellen (Aliase in kosten_view) wird komplett gelesen"""
+    scans = [line for line in plan for alias in aliases
+             if line.startswith(f'SCAN {alias} ') or line == f'SCAN {alias}']
+    assert not scans, plan
+
+
+@pytest.fixture
+def user_id(register):
+    client, user_id = register()
+    add_kosten(client, 'Miete', MONTH, YEAR, cost_type='recurring')
+    add_kosten(client, 'Strom', MONTH, YEAR)
+    client.post('/api/create-month', json={'month': MONTH + 1, 'year': YEAR})
+    return user_id
+
+
+def test_month_view_uses_composite_index(app_module, user_id):
+    view = app_module.kosten_view(user_id, months=[(MONTH, YEAR)])
+    plan = query_plan(app_module, app_module.kosten_api_query(view))
+    assert f'SEARCH k USING INDEX {MONTH_INDEX} (user_id=? AND year=? AND month=?)' in plan
+    assert 'SEARCH m USING INDEX kostenmonth_user_id_year_month (user_id=? AND year=? AND month=?)' in plan
+    assert any(line.startswith('SEARCH o USING COVERING INDEX kosten_template_id_year_month') for line in plan)
+    assert any(line.startswith('SEARCH a USING INDEX kostenarchive_user_id_year_month') for line in plan)
+    assert_no_table_scan(plan, 'k', 'm', 't', 'o', 'a')
+
+
+def test_next_position_uses_konto_column_of_index(app_module, user_id):
+    view = app_module.kosten_view(user_id, months=[(MONTH, YEAR)])
+    konto_id = app_module.Konto.get(app_module.Konto.user == user_id).id
+    query = app_module.select_view(view, app_module.fn.MAX(view.c.position)).where(view.c.konto == konto_id)
+    plan = query_plan(app_module, query)
+    assert f'SEARCH k USING INDEX {MONTH_INDEX} (user_id=? AND year=? AND month=? AND konto_id=?)' in plan
+    assert_no_table_scan(plan, 'k', 'm', 't', 'o', 'a')
+
+
+def test_report_reads_month_summaries_by_index(app_module, user_id):
+    summary = app_module.KostenMonthSummary
+    query = summary.select().where((summary.user == user_id) & (summary.year == YEAR))
+    plan = query_plan(app_module, query)
+    assert any('USING INDEX kostenmonthsummary_user_id_year_month_konto_id (user_id=? AND year=?)' in line
+               for line in plan), plan
+
+
+def test_changes_read_tombstones_by_user_and_seq(app_module, user_id):
+    tombstone = app_module.KostenTombstone
+    query = tombstone.select().where((tombstone.user == user_id) & (tombstone.seq > 1))
+    plan = query_plan(app_module, query)
+    assert any('kostentombstone_user_id_seq (user_id=? AND seq>?)' in line for line in plan), plan
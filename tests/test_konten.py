@@ -0,0 +1,73 @@
+"""
+Konten: Umbenennen in ein bestehendes Konto führt beide zusammen,
+exclude_from_total gilt pro Monat (und wird beim Monatswechsel übernommen)
+oder ohne Monat als Standard des Kontos.
+"""
+from conftest import add_kosten, create_month, kosten_by_name
+
+
+def toggle(client, konto, **month):
+    response = client.post('/api/konto/toggle-exclude', json=dict(konto=konto, **month))
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['excluded']
+
+
+def summary(client, month, year=2026):
+    return client.get(f'/api/kosten/summary?month={month}&year={year}').get_json()
+
+
+def test_rename_into_existing_konto_merges(client):
+    miete = add_kosten(client, 'Miete', 5, 2026, betrag='800')
+    add_kosten(client, 'Netflix', 5, 2026, konto='Kreditkarte', cost_type='recurring', betrag='12')
+    amazon = add_kosten(client, 'Amazon', 5, 2026, konto='Kreditkarte', betrag='30')
+    # Bezahlt, sonst wandern die einmaligen Kosten in den Juni
+    for kosten in (miete, amazon):
+        client.put(f'/api/kosten/{kosten["id"]}', json={'bezahlt': True})
+    create_month(client, 6, 2026)
+    toggle(client, 'Kreditkarte', month=6, year=2026)
+
+    response = client.post('/api/konten/rename', json={'old_name': 'Kreditkarte', 'new_name': 'Girokonto'})
+    assert response.get_json() == {'success': True}
+    assert client.get('/api/konten').get_json() == ['Girokonto']
+    assert {row['konto'] for month in (5, 6) for row in kosten_by_name(client, month, 2026).values()} \
+        == {'Girokonto'}
+
+    may = summary(client, 5)
+    assert [(konto['konto'], konto['count'], konto['total']) for konto in may['konten']] \
+        == [('Girokonto', 3, 842.0)]
+    # Die Monats-Einstellung des alten Kontos gilt jetzt für das Zielkonto
+    assert summary(client, 6)['total'] == 0
+    assert kosten_by_name(client, 6, 2026)['Netflix']['exclude_from_total'] is True
+
+
+def test_month_exclude_is_carried_over(client):
+    add_kosten(client, 'Miete', 5, 2026, cost_type='recurring', betrag='800')
+    add_kosten(client, 'Netflix', 5, 2026, konto='Kreditkarte', cost_type='recurring', betrag='12')
+    assert toggle(client, 'Kreditkarte', month=5, year=2026) is True
+    create_month(client, 6, 2026)
+
+    june = kosten_by_name(client, 6, 2026)
+    assert june['Netflix']['exclude_from_total'] is True and june['Miete']['exclude_from_total'] is False
+    assert summary(client, 6)['total'] == 800.0
+    # Der Standard des Kontos bleibt unverändert
+    add_kosten(client, 'Spotify', 9, 2026, konto='Kreditkarte', betrag='10')
+    assert summary(client, 9)['total'] == 10.0
+
+
+def test_konto_default_without_month(client):
+    add_kosten(client, 'Netflix', 5, 2026, konto='Kreditkarte', betrag='12')
+    add_kosten(client, 'Spotify', 6, 2026, konto='Kreditkarte', betrag='10')
+    # Juni hat eine eigene Einstellung, die bleibt beim Umschalten des Standards erhalten
+    assert toggle(client, 'Kreditkarte', month=6, year=2026) is True
+    assert toggle(client, 'Kreditkarte', month=6, year=2026) is False
+
+    assert toggle(client, 'Kreditkarte') is True
+    assert summary(client, 5)['total'] == 0 and summary(client, 7)['konten'] == []
+    assert kosten_by_name(client, 5, 2026)['Netflix']['exclude_from_total'] is True
+    assert summary(client, 6)['total'] == 10.0
+    assert toggle(client, 'Kreditkarte') is False
+    assert summary(client, 5)['total'] == 12.0
+
+    for data in ({'konto': 'Kreditkarte', 'month': 5}, {'konto': 'Kreditkarte', 'year': 2026}, {'konto': ''}):
+        assert client.post('/api/konto/toggle-exclude', json=data).status_code == 400
+    assert client.post('/api/konto/toggle-exclude', json={'konto': 'Gibt es nicht'}).status_code == 404
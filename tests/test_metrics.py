@@ -0,0 +1,52 @@
+"""
+Metrik-Dateien der Worker (worker_metrics): beendete Worker werden in
+dead-workers.json zusammengefasst, die Summe über alle Dateien bleibt gleich.
+"""
+import json
+import os
+
+import worker_metrics
+
+
+def write_worker(metrics_dir, pid, count):
+    data = {'requests': {'index GET 200': count}, 'durations': {'index': [count, 0.5 * count]},
+            'queries': {}}
+    worker_metrics.write_metrics(worker_metrics.worker_path(metrics_dir, pid), json.dumps(data))
+
+
+def test_fold_keeps_totals_and_removes_files(tmp_path):
+    metrics_dir = str(tmp_path)
+    for pid, count in ((101, 1), (102, 2), (103, 4)):
+        write_worker(metrics_dir, pid, count)
+    before = worker_metrics.collect_metrics(metrics_dir)
+
+    assert worker_metrics.fold_worker_metrics(metrics_dir, [101]) == 1
+    assert worker_metrics.fold_worker_metrics(metrics_dir, [102, 999]) == 1
+    assert sorted(os.listdir(metrics_dir)) == ['dead-workers.json', 'worker-103.json']
+    assert worker_metrics.collect_metrics(metrics_dir) == before
+    assert before['requests'] == {'index GET 200': 7}
+
+    # Beim Start des Masters: alles aus dem letzten Lauf
+    assert worker_metrics.fold_stale_metrics(metrics_dir) == 1
+    assert os.listdir(metrics_dir) == ['dead-workers.json']
+    assert worker_metrics.collect_metrics(metrics_dir) == before
+
+
+def test_collect_skips_folded_file_not_yet_removed(tmp_path):
+    """Zwischen dem Schreiben von dead-workers.json und dem Löschen der Worker-Datei"""
+    metrics_dir = str(tmp_path)
+    write_worker(metrics_dir, 101, 3)
+    path = worker_metrics.worker_path(metrics_dir, 101)
+    with open(path) as f:
+        pending = f.read()
+    worker_metrics.fold_worker_metrics(metrics_dir, [101])
+    worker_metrics.write_metrics(path, pending)
+
+    assert worker_metrics.collect_metrics(metrics_dir)['requests'] == {'index GET 200': 3}
+
+
+def test_worker_flushes_own_file(app_module, client, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, 'METRICS_DIR', str(tmp_path))
+    client.get('/login')
+    app_module.request_metrics.flush(force=True)
+    assert os.listdir(tmp_path) == [f'worker-{os.getpid()}.json']
@@ -0,0 +1,223 @@
+"""
+Upgrade bestehender Datenbanken: eine kosten.db in einem alten Schema
+(tests/schemas) wird von einem eigenen Prozess mit dem aktuellen app.py
+geöffnet, wie beim Neustart nach einem Update.
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from conftest import ROOT, TEST_PASSWORD
+
+SCHEMA_DIR = os.path.join(os.path.dirname(__file__), 'schemas')
+
+# Läuft im Kindprozess: importiert app.py (migriert dabei) und liest über die API
+UPGRADE_CHECK = '''
+import json, sys
+import app
+client = app.app.test_client()
+client.post('/login', data={'username': 'anna', 'password': sys.argv[1]})
+result = {
+    'kosten': client.get('/api/kosten?month=5&year=2026').get_json(),
+    'summary': client.get('/api/kosten/summary?month=5&year=2026').get_json(),
+    'report': client.get('/api/report?from=2026-04&to=2026-05').get_json(),
+    'search': client.get('/api/search?q=miete').get_json(),
+}
+created = client.post('/api/kosten', json={'bezeichnung': 'Neu', 'betrag': '1', 'zahlungstag': 1,
+                                           'konto': 'Girokonto', 'month': 5, 'year': 2026})
+result['created'] = created.get_json()
+result['changes'] = client.get('/api/kosten/changes?since=1&month=5&year=2026').get_json()
+print(json.dumps(result))
+'''
+
+
+def create_database(path, schema, rows):
+    """Legt die Datenbank mit dem Schema aus tests/schemas und den Zeilen {Tabelle: [dict, ...]} an"""
+    connection = sqlite3.connect(path)
+    with open(os.path.join(SCHEMA_DIR, schema)) as f:
+        connection.executescript(f.read())
+    for table, table_rows in rows.items():
+        for row in table_rows:
+            columns = ', '.join(f'"{column}"' for column in row)
+            connection.execute(f'INSERT INTO "{table}" ({columns}) VALUES ({", ".join("?" * len(row))})',
+                               list(row.values()))
+    connection.execute(f'PRAGMA user_version = {int(schema[1:-4])}')
+    connection.commit()
+    connection.close()
+
+
+def start_app(path):
+    """Startet app.py auf der Datenbank und führt UPGRADE_CHECK aus"""
+    env = dict(os.environ, DATABASE_PATH=str(path), METRICS_DIR=os.path.join(os.path.dirname(path), 'metrics'),
+               PYTHONPATH=ROOT)
+    env.pop('SHARD_DIR', None)
+    return subprocess.run([sys.executable, '-c', UPGRADE_CHECK, TEST_PASSWORD], env=env,
+                          cwd=os.path.dirname(path), capture_output=True, text=True, timeout=120)
+
+
+def upgrade(path):
+    """Migriert die Datenbank und gibt die Antworten aus UPGRADE_CHECK zurück"""
+    result = start_app(path)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def schema_objects(path, kind):
+    connection = sqlite3.connect(path)
+    try:
+        return {name for name, in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = ? AND name NOT LIKE 'sqlite_%'", (kind,))}
+    finally:
+        connection.close()
+
+
+def user_version(path):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        connection.close()
+
+
+def fresh_schema(app_module, kind):
+    return schema_objects(app_module.DATABASE_PATH, kind)
+
+
+def assert_upgraded(app_module, path, result):
+    """Gemeinsame Prüfungen nach dem Upgrade auf die neueste Version"""
+    assert user_version(path) == app_module.MIGRATIONS[-1][0]
+    # Gleiche Tabellen, Indizes und Trigger wie eine neu angelegte Datenbank
+    for kind in ('table', 'index', 'trigger'):
+        assert schema_objects(path, kind) == fresh_schema(app_module, kind), kind
+
+    kosten = {row['bezeichnung']: row for row in result['kosten']}
+    assert set(kosten) == {'Miete', 'Strom', 'Netflix'}
+    assert kosten['Miete']['konto'] == 'Girokonto' and kosten['Miete']['bezahlt'] is True
+    assert kosten['Netflix']['exclude_from_total'] is True
+    assert result['summary']['total'] == 860.0 and result['summary']['paid'] == 800.0
+
+    # Monatssummen und Suchindex wurden nach den Migrationen aus den Daten befüllt
+    report = {(entry['year'], entry['month']): entry for entry in result['report']['months']}
+    assert report[(2026, 4)]['total'] == 800.0 and report[(2026, 5)]['total'] == 860.0
+    if 'kosten_search' in schema_objects(path, 'table'):
+        assert result['search']['total'] == 2
+
+    # Trigger laufen: neue Zeile ist im Änderungs-Feed
+    assert result['created']['success'], result['created']
+    assert result['created']['data']['id'] in [row[0] for row in result['changes']['rows']]
+
+
+def test_upgrade_from_baseline(app_module, tmp_path):
+    path = tmp_path / 'kosten.db'
+    kosten = dict(user_id=1, zahlungstag=1, position=0, cost_type='recurring', exclude_from_total=0)
+    create_database(path, 'v0.sql', {
+        'users': [dict(id=1, username='anna', email='anna@example.com',
+                       password_hash=generate_password_hash(TEST_PASSWORD), created_at='2026-01-01 00:00:00')],
+        'kosten': [
+            dict(kosten, bezeichnung='Miete', betrag=800, konto='Girokonto', bezahlt=1, month=4, year=2026),
+            dict(kosten, bezeichnung='Miete', betrag=800, konto='Girokonto', bezahlt=1, month=5, year=2026),
+            dict(kosten, bezeichnung='Strom', betrag=60, konto='Girokonto', bezahlt=0, month=5, year=2026),
+            dict(kosten, bezeichnung='Netflix', betrag=12, konto='Kreditkarte', bezahlt=0, month=5, year=2026,
+                 exclude_from_total=1),
+        ],
+    })
+
+    assert_upgraded(app_module, path, upgrade(path))
+
+
+def test_failed_migration_keeps_old_version(app_module, tmp_path):
+    """Alle Migrationen laufen in einer Transaktion: bricht eine ab, bleibt die Datei unverändert"""
+    path = tmp_path / 'kosten.db'
+    create_database(path, 'v0.sql', {})
+    connection = sqlite3.connect(path)
+    # Migration 4 scheitert beim Umbenennen von kosten, Migration 1 bis 3 sind dann schon gelaufen
+    connection.execute('CREATE TABLE "kosten_old" ("id" INTEGER)')
+    connection.commit()
+    connection.close()
+
+    result = start_app(path)
+    assert result.returncode != 0 and 'kosten_old' in result.stderr
+    assert user_version(path) == 0
+    assert 'kosten_versions' not in schema_objects(path, 'table')
+    assert 'kosten_user_id_konto_position' not in schema_objects(path, 'index')
+
+
+V4_ROWS = {
+    'users': [dict(id=1, username='anna', email='anna@example.com',
+                   password_hash=generate_password_hash(TEST_PASSWORD), created_at='2026-01-01 00:00:00')],
+    'konten': [dict(id=1, user_id=1, name='Girokonto', exclude_from_total=0),
+               dict(id=2, user_id=1, name='Kreditkarte', exclude_from_total=0)],
+    'konto_months': [dict(konto_id=2, year=2026, month=5, exclude_from_total=1)],
+    'kosten': [
+        dict(user_id=1, bezeichnung='Miete', betrag=800, zahlungstag=1, konto_id=1, bezahlt=1, position=1024,
+             cost_type='recurring', month=4, year=2026),
+        dict(user_id=1, bezeichnung='Miete', betrag=800, zahlungstag=1, konto_id=1, bezahlt=1, position=1024,
+             cost_type='recurring', month=5, year=2026),
+        dict(user_id=1, bezeichnung='Strom', betrag=60, zahlungstag=3, konto_id=1, bezahlt=0, position=2048,
+             cost_type='one-time', month=5, year=2026),
+        dict(user_id=1, bezeichnung='Netflix', betrag=12, zahlungstag=5, konto_id=2, bezahlt=0, position=1024,
+             cost_type='recurring', month=5, year=2026),
+    ],
+    # Veraltete Summe, wird beim Upgrade neu berechnet
+    'kosten_month_summaries': [dict(user_id=1, year=2026, month=5, konto_id=1, count=1, total=1, paid=0)],
+}
+
+# So hat eine frühere Fassung von Migration 4 kosten und konten angelegt (neuestes
+# Schema der Models), bevor Migration 5 an kosten_archive scheiterte
+V4_LIVE_MODEL_COLUMNS = (
+    'ALTER TABLE "kosten" ADD COLUMN "template_id" INTEGER REFERENCES "recurring_templates" ("id")',
+    'ALTER TABLE "kosten" ADD COLUMN "updated_seq" INTEGER NOT NULL DEFAULT 0',
+    'ALTER TABLE "konten" ADD COLUMN "updated_seq" INTEGER NOT NULL DEFAULT 0',
+    'CREATE UNIQUE INDEX "kosten_template_id_year_month" ON "kosten" ("template_id", "year", "month") '
+    'WHERE "template_id" IS NOT NULL',
+)
+
+
+@pytest.mark.parametrize('extra_statements', [(), V4_LIVE_MODEL_COLUMNS], ids=['v4', 'v4-live-model-columns'])
+def test_upgrade_from_v4(app_module, tmp_path, extra_statements):
+    path = tmp_path / 'kosten.db'
+    create_database(path, 'v4.sql', V4_ROWS)
+    connection = sqlite3.connect(path)
+    for statement in extra_statements:
+        connection.execute(statement)
+    connection.commit()
+    connection.close()
+
+    assert_upgraded(app_module, path, upgrade(path))
+
+
+def test_upgrade_from_v8_renumbers_reused_ids(app_module, tmp_path):
+    """Vor AUTOINCREMENT (Migration 9) konnte eine neue Zeile die ID eines archivierten Eintrags bekommen"""
+    path = tmp_path / 'kosten.db'
+    kosten = dict(user_id=1, zahlungstag=1, konto_id=1, bezahlt=0, position=1024, cost_type='one-time',
+                  month=5, year=2026, updated_seq=2)
+    # sync_sequence zuerst, die Trigger von Version 8 lesen den Stand beim Einfügen
+    create_database(path, 'v8.sql', {
+        'sync_sequence': [dict(id=1, seq=5, purged_seq=0)],
+        'users': V4_ROWS['users'],
+        'konten': [dict(id=1, user_id=1, name='Girokonto', exclude_from_total=0, updated_seq=1)],
+        'kosten_months': [dict(user_id=1, year=2026, month=5, updated_seq=1)],
+        'kosten': [dict(kosten, id=1, bezeichnung='Miete', betrag=800),
+                   dict(kosten, id=2, bezeichnung='Wasser', betrag=30)],
+        'kosten_archive': [dict(id=2, user_id=1, bezeichnung='Miete', betrag=700, zahlungstag=1, konto_id=1,
+                                bezahlt=1, position=1024, cost_type='one-time', month=3, year=2019)],
+    })
+
+    result = upgrade(path)
+    for kind in ('table', 'index', 'trigger'):
+        assert schema_objects(path, kind) == fresh_schema(app_module, kind), kind
+    kosten = {row['bezeichnung']: row['id'] for row in result['kosten']}
+    assert kosten['Miete'] == 1 and kosten['Wasser'] == 3
+    assert result['created']['data']['id'] == 4
+    # Alte Stände der Clients kennen Wasser noch unter ID 2
+    assert result['changes']['reset'] is True
+
+    if 'kosten_search' in schema_objects(path, 'table'):
+        found = [(group['year'], kosten['id'], kosten['betrag'])
+                 for group in result['search']['groups'] for kosten in group['kosten']]
+        assert found == [(2026, 1, 800.0), (2019, 2, 700.0)]
@@ -0,0 +1,40 @@
+"""
+Sampling-Profiler (PROFILING_ENABLED): gthread-Worker bearbeiten Requests in
+Threads ihres Pools, der Profiler muss dort genauso Samples liefern.
+"""
+import threading
+import time
+
+
+def busy_request(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_profiler_samples_other_thread(app_module):
+    profiler = {}
+
+    def worker():
+        profiler['instance'] = app_module.SamplingProfiler()
+        profiler['instance'].start()
+        busy_request(0.1)
+        profiler['instance'].stop()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    samples = profiler['instance'].samples
+    assert sum(count for stack, count in samples.items() if 'busy_request' in stack) > 5
+
+
+def test_profile_header_outside_main_thread(app_module, client, monkeypatch, tmp_path):
+    monkeypatch.setattr(app_module, 'PROFILING_ENABLED', True)
+    monkeypatch.setattr(app_module, 'PROFILE_DIR', str(tmp_path))
+    responses = []
+    thread = threading.Thread(target=lambda: responses.append(
+        client.get('/api/kosten?month=5&year=2026', headers={'X-Verwalco-Profile': app_module.ADMIN_SECRET})))
+    thread.start()
+    thread.join()
+    path = responses[0].headers['X-Verwalco-Profile-File']
+    assert path.startswith(str(tmp_path)) and path.endswith('.folded')
@@ -0,0 +1,69 @@
+"""
+Verschieben (/api/kosten/reorder): die neue Position liegt zwischen den
+Nachbarn, geschrieben wird nur die verschobene Zeile. Erst wenn keine
+Lücke mehr frei ist, wird das Konto im Monat neu durchnummeriert.
+"""
+import pytest
+
+from conftest import add_kosten, create_month, kosten_by_name
+
+
+def order(client, month=5, year=2026):
+    rows = client.get(f'/api/kosten?month={month}&year={year}').get_json()
+    return [row['bezeichnung'] for row in sorted(rows, key=lambda row: row['position'])]
+
+
+def move(client, **data):
+    response = client.post('/api/kosten/reorder', json=data)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['renumbered']
+
+
+def test_move_writes_one_row(client):
+    miete, strom, wasser = (add_kosten(client, name, 5, 2026) for name in ('Miete', 'Strom', 'Wasser'))
+    assert move(client, id=wasser['id'], after_id=miete['id']) is False
+    positions = {name: row['position'] for name, row in kosten_by_name(client, 5, 2026).items()}
+    assert positions == {'Miete': miete['position'], 'Wasser': (miete['position'] + strom['position']) // 2,
+                         'Strom': strom['position']}
+
+    assert move(client, id=miete['id'], index=5) is False
+    assert order(client) == ['Wasser', 'Strom', 'Miete']
+
+
+def test_renumbers_without_gap(app_module, client):
+    miete, strom, wasser = (add_kosten(client, name, 5, 2026) for name in ('Miete', 'Strom', 'Wasser'))
+    client.post('/api/kosten/reorder', json=[{'id': miete['id'], 'position': 1}, {'id': strom['id'], 'position': 2},
+                                             {'id': wasser['id'], 'position': 3}])
+    assert move(client, id=wasser['id'], before_id=strom['id']) is True
+    assert order(client) == ['Miete', 'Wasser', 'Strom']
+    assert sorted(row['position'] for row in kosten_by_name(client, 5, 2026).values()) \
+        == [app_module.POSITION_STEP, 2 * app_module.POSITION_STEP, 3 * app_module.POSITION_STEP]
+
+
+def test_move_around_virtual_rows(client):
+    for name in ('Miete', 'Strom', 'Wasser'):
+        add_kosten(client, name, 5, 2026, cost_type='recurring')
+    create_month(client, 6, 2026)
+    june = kosten_by_name(client, 6, 2026)
+    assert all(row['id'] < 0 for row in june.values())
+
+    assert move(client, id=june['Wasser']['id'], before_id=june['Miete']['id']) is False
+    assert order(client, 6, 2026) == ['Wasser', 'Miete', 'Strom']
+    # Nur die verschobene Zeile hat jetzt eine eigene Zeile, Mai bleibt unverändert
+    june = kosten_by_name(client, 6, 2026)
+    assert june['Wasser']['id'] > 0 and june['Miete']['id'] < 0 and june['Strom']['id'] < 0
+    assert order(client) == ['Miete', 'Strom', 'Wasser']
+
+    assert move(client, id=june['Miete']['id'], after_id=june['Strom']['id']) is False
+    assert order(client, 6, 2026) == ['Wasser', 'Strom', 'Miete']
+
+
+@pytest.mark.parametrize('data', [{'id': [1], 'index': 0}, {'id': '1', 'index': 0}, {'index': 0},
+                                  {'id': 1, 'after_id': [2]}, {'id': 1, 'before_id': {'id': 2}},
+                                  {'id': 1, 'index': 'erste'}])
+def test_malformed_values_return_400(client, data):
+    assert client.post('/api/kosten/reorder', json=data).status_code == 400
+
+
+def test_malformed_list_returns_400(client):
+    assert client.post('/api/kosten/reorder', json=[{'id': [1], 'position': 1}]).status_code == 400
@@ -0,0 +1,104 @@
+"""
+Sharding (SHARD_DIR, optional SHARD_BUCKETS): conftest entfernt SHARD_DIR,
+deshalb läuft die App hier wie in test_migrations in einem eigenen Prozess.
+Geprüft werden die Trennung der User, Monatswechsel und Wartung über alle
+Dateien und das Löschen eines Users im Admin-Bereich.
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+from conftest import ROOT, TEST_PASSWORD
+
+# Läuft im Kindprozess: drei User, Monatswechsel und Archivierung per CLI, danach wird User 1 gelöscht
+SHARD_CHECK = '''
+import json, sys
+import app
+
+def login(name):
+    client = app.app.test_client()
+    client.post('/register', data={'username': name, 'email': f'{name}@example.com',
+                                   'password': sys.argv[1], 'password_confirm': sys.argv[1]})
+    with client.session_transaction() as session:
+        return client, session['user_id']
+
+def names(client, month, year):
+    return sorted(row['bezeichnung'] for row in client.get(f'/api/kosten?month={month}&year={year}').get_json())
+
+result = {'users': {}}
+clients = {}
+for name in ('anna', 'ben', 'carla'):
+    client, user_id = login(name)
+    clients[user_id] = client
+    for bezeichnung, cost_type in ((f'Miete {name}', 'recurring'), (f'Strom {name}', 'one-time')):
+        client.post('/api/kosten', json={'bezeichnung': bezeichnung, 'betrag': '10', 'zahlungstag': 1,
+                                         'konto': 'Girokonto', 'cost_type': cost_type, 'month': 3, 'year': 2020})
+
+runner = app.app.test_cli_runner()
+result['rollover'] = runner.invoke(args=['rollover', '--month', '4', '--year', '2020']).output
+result['maintenance'] = runner.invoke(args=['maintenance', '--archive-after', '1', '--no-analyze']).output
+
+for user_id, client in clients.items():
+    april = client.get('/api/kosten?month=4&year=2020').get_json()
+    result['users'][user_id] = {'march': names(client, 3, 2020), 'april': names(client, 4, 2020),
+                                'archived': all(row['archived'] for row in april),
+                                'search': client.get('/api/search?q=miete').get_json()['total']}
+
+deleted = min(clients)
+result['deleted'] = deleted
+result['delete'] = clients[deleted].post(f'/admin/users/{app.ADMIN_SECRET}/delete/{deleted}').get_json()
+print(json.dumps(result))
+'''
+
+
+def run_sharded(tmp_path, buckets):
+    env = dict(os.environ, DATABASE_PATH=str(tmp_path / 'kosten.db'), SHARD_DIR=str(tmp_path / 'shards'),
+               SHARD_BUCKETS=str(buckets), METRICS_DIR=str(tmp_path / 'metrics'), PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, '-c', SHARD_CHECK, TEST_PASSWORD], env=env, cwd=tmp_path,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def user_rows(path, user_id):
+    connection = sqlite3.connect(path)
+    try:
+        return sum(connection.execute(f'SELECT COUNT(*) FROM "{table}" WHERE "user_id" = ?', (user_id,)).fetchone()[0]
+                   for table in ('kosten', 'kosten_archive', 'recurring_templates', 'konten'))
+    finally:
+        connection.close()
+
+
+def assert_sharded(tmp_path, result):
+    users = {int(user_id): values for user_id, values in result['users'].items()}
+    for user_id, values in users.items():
+        name = {1: 'anna', 2: 'ben', 3: 'carla'}[user_id]
+        # Jeder User sieht nur seine eigenen Kosten, auch in der Suche
+        assert values['march'] == [f'Miete {name}']
+        assert values['april'] == [f'Miete {name}', f'Strom {name}']
+        assert values['archived'] is True
+        assert values['search'] == 2
+    assert result['delete']['success'] is True
+    # Die Kosten liegen nur in den Shard-Dateien
+    assert user_rows(tmp_path / 'kosten.db', result['deleted']) == 0
+
+
+def test_shard_per_user(tmp_path):
+    result = run_sharded(tmp_path, 0)
+    assert_sharded(tmp_path, result)
+    assert result['rollover'].count('Monatswechsel 3/2020 -> 4/2020') == 3
+    # Die Datei des gelöschten Users ist weg, die der anderen bleiben
+    assert sorted(os.listdir(tmp_path / 'shards')) == ['user-2.db', 'user-3.db']
+    assert user_rows(tmp_path / 'shards' / 'user-2.db', 2) > 0
+
+
+def test_shard_buckets(tmp_path):
+    result = run_sharded(tmp_path, 2)
+    assert_sharded(tmp_path, result)
+    assert result['rollover'].count('Monatswechsel 3/2020 -> 4/2020') == 2
+    # User 1 und 3 teilen sich bucket-0001.db: nur die Zeilen von User 1 sind gelöscht
+    bucket = tmp_path / 'shards' / 'bucket-0001.db'
+    assert user_rows(bucket, 1) == 0 and user_rows(bucket, 3) > 0
+    assert user_rows(tmp_path / 'shards' / 'bucket-0000.db', 2) > 0
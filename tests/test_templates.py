@@ -0,0 +1,124 @@
+"""
+Wiederkehrende Kosten als Vorlagen (recurring_templates): der Monatswechsel
+kopiert keine Zeilen, Einträge aus Vorlagen haben virtuelle IDs
+-(template_id * 1000000 + YYYYMM) und bekommen erst beim Ändern eine eigene
+Zeile. Löschen beendet die Vorlage, frühere Monate bleiben unverändert.
+"""
+import pytest
+
+from conftest import add_kosten, create_month, kosten_by_name
+
+
+@pytest.fixture
+def user(register):
+    """Test-Client mit Miete (wiederkehrend) und Strom (einmalig, bezahlt) im Mai, gibt (Client, User-ID) zurück"""
+    client, user_id = register()
+    add_kosten(client, 'Miete', 5, 2026, cost_type='recurring', betrag='800')
+    strom = add_kosten(client, 'Strom', 5, 2026, betrag='60')
+    client.put(f'/api/kosten/{strom["id"]}', json={'bezahlt': True})
+    return client, user_id
+
+
+def edit(client, row, **changes):
+    """Ändert einen Eintrag wie der Dialog im Browser (alle Felder)"""
+    data = {key: row[key] for key in ('bezeichnung', 'betrag', 'zahlungstag', 'konto', 'cost_type')}
+    response = client.put(f'/api/kosten/{row["id"]}', json=dict(data, **changes))
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['data']
+
+
+def stored_rows(app_module, user_id, month=None):
+    """Zeilen in der Tabelle kosten, virtuelle Einträge zählen nicht mit"""
+    Kosten = app_module.Kosten
+    with app_module.db.connection_context():
+        query = Kosten.select().where(Kosten.user == user_id)
+        if month:
+            query = query.where((Kosten.month == month[0]) & (Kosten.year == month[1]))
+        return query.count()
+
+
+def test_rollover_copies_no_rows(app_module, user):
+    client, user_id = user
+    before = stored_rows(app_module, user_id)
+    create_month(client, 6, 2026)
+    create_month(client, 7, 2026)
+    assert stored_rows(app_module, user_id) == before
+
+    for month in (6, 7):
+        kosten = kosten_by_name(client, month, 2026)
+        assert set(kosten) == {'Miete'}
+        assert kosten['Miete']['id'] < 0 and kosten['Miete']['bezahlt'] is False
+        template_id, virtual_month, year = app_module.split_virtual_id(kosten['Miete']['id'])
+        assert (virtual_month, year) == (month, 2026)
+
+
+@pytest.mark.parametrize('toggle', [True, False], ids=['toggle', 'edit'])
+def test_change_creates_one_override(app_module, user, toggle):
+    client, user_id = user
+    create_month(client, 6, 2026)
+    create_month(client, 7, 2026)
+    june = kosten_by_name(client, 6, 2026)['Miete']
+
+    if toggle:
+        assert client.put(f'/api/kosten/{june["id"]}', json={'bezahlt': True}).status_code == 200
+    else:
+        edit(client, june, betrag='850')
+    # Der Client kennt evtl. noch die virtuelle ID: die eigene Zeile wird weiterverwendet
+    edit(client, june, zahlungstag=5)
+    assert stored_rows(app_module, user_id, (6, 2026)) == 1
+
+    miete = kosten_by_name(client, 6, 2026)['Miete']
+    assert miete['id'] > 0 and miete['zahlungstag'] == 5
+    assert miete['bezahlt'] is toggle and miete['betrag'] == 800.0
+    # Mai und Juli kommen weiter aus der Vorlage
+    july = kosten_by_name(client, 7, 2026)['Miete']
+    assert july['id'] < 0 and (july['betrag'], july['bezahlt'], july['zahlungstag']) == (800.0, False, 3)
+    assert kosten_by_name(client, 5, 2026)['Miete']['zahlungstag'] == 3
+
+
+def test_delete_ends_template(app_module, user):
+    client, user_id = user
+    for month in (6, 7, 8):
+        create_month(client, month, 2026)
+    edit(client, kosten_by_name(client, 7, 2026)['Miete'], betrag='900')
+    may = kosten_by_name(client, 5, 2026)
+
+    june = kosten_by_name(client, 6, 2026)['Miete']
+    assert client.delete(f'/api/kosten/{june["id"]}').status_code == 200
+    assert 'Miete' not in kosten_by_name(client, 6, 2026)
+    assert kosten_by_name(client, 5, 2026) == may
+    # Spätere Monate laufen mit einer neuen Vorlage weiter, eigene Zeilen bleiben erhalten
+    assert kosten_by_name(client, 7, 2026)['Miete']['betrag'] == 900.0
+    august = kosten_by_name(client, 8, 2026)['Miete']
+    assert august['betrag'] == 800.0 and august['id'] < 0
+    assert app_module.split_virtual_id(august['id'])[0] != app_module.split_virtual_id(june['id'])[0]
+
+    # Im letzten Monat gelöscht: die Vorlage endet davor, ohne Nachfolger
+    assert client.delete(f'/api/kosten/{august["id"]}').status_code == 200
+    assert 'Miete' not in kosten_by_name(client, 8, 2026)
+    assert kosten_by_name(client, 7, 2026)['Miete']['betrag'] == 900.0
+    add_kosten(client, 'Wasser', 8, 2026)
+    create_month(client, 9, 2026)
+    assert set(kosten_by_name(client, 9, 2026)) == {'Wasser'}
+
+
+def test_totals_match_rows(user):
+    client, _ = user
+    add_kosten(client, 'Netflix', 5, 2026, konto='Kreditkarte', cost_type='recurring', betrag='12')
+    create_month(client, 6, 2026)
+    create_month(client, 7, 2026)
+    june = kosten_by_name(client, 6, 2026)
+    edit(client, june['Miete'], betrag='810')
+    client.put(f'/api/kosten/{june["Netflix"]["id"]}', json={'bezahlt': True})
+    add_kosten(client, 'Wasser', 7, 2026, betrag='30')
+
+    report = {entry['month']: entry for entry in
+              client.get('/api/report?from=2026-05&to=2026-07').get_json()['months']}
+    for month in (5, 6, 7):
+        rows = client.get(f'/api/kosten?month={month}&year=2026').get_json()
+        summary = client.get(f'/api/kosten/summary?month={month}&year=2026').get_json()
+        total = round(sum(row['betrag'] for row in rows), 2)
+        paid = round(sum(row['betrag'] for row in rows if row['bezahlt']), 2)
+        assert (summary['total'], summary['paid']) == (total, paid), month
+        assert (report[month]['total'], report[month]['paid']) == (total, paid), month
+        assert sum(konto['count'] for konto in summary['konten']) == len(rows)
@@ -0,0 +1,125 @@
+"""
+Metrik-Dateien der Gunicorn-Worker in METRICS_DIR.
+
+Jeder Worker schreibt seinen Stand nach worker-<pid>.json (siehe
+RequestMetrics in app.py). Beendet sich ein Worker, addiert der
+Gunicorn-Master (child_exit in gunicorn.conf.py) seine Zähler in
+dead-workers.json und löscht die Datei, wie der Multiprocess-Modus von
+prometheus_client. So bleiben die Zähler monoton, ohne dass METRICS_DIR
+mit jedem Worker-Neustart wächst.
+
+Eigenes Modul ohne Flask und peewee: der Master importiert app.py nicht,
+sonst würde er beim Laden der Konfiguration die Datenbank migrieren.
+"""
+import json
+import os
+
+DEAD_WORKERS_FILE = 'dead-workers.json'
+COLLECT_ATTEMPTS = 3
+
+
+def empty_metrics():
+    return {'requests': {}, 'durations': {}, 'queries': {}}
+
+
+def merge_metrics(merged, data):
+    """Addiert die Zähler aus data in merged"""
+    for key, count in data['requests'].items():
+        merged['requests'][key] = merged['requests'].get(key, 0) + count
+    for section in ('durations', 'queries'):
+        for endpoint, values in data[section].items():
+            current = merged[section].setdefault(endpoint, [0] * len(values))
+            merged[section][endpoint] = [a + b for a, b in zip(current, values)]
+    return merged
+
+
+def read_metrics(path):
+    """Inhalt einer Metrik-Datei, None wenn sie fehlt oder unvollständig ist"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_metrics(path, text):
+    """Schreibt atomar (temporäre Datei und os.replace), Leser sehen nie eine halbe Datei"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        f.write(text)
+    os.replace(path + '.tmp', path)
+
+
+def worker_path(metrics_dir, pid):
+    return os.path.join(metrics_dir, f'worker-{pid}.json')
+
+
+def worker_pid(name):
+    """PID aus dem Dateinamen worker-<pid>.json, sonst None"""
+    if name.startswith('worker-') and name.endswith('.json'):
+        return name[len('worker-'):-len('.json')]
+    return None
+
+
+def fold_worker_metrics(metrics_dir, pids):
+    """
+    Addiert die Dateien der beendeten Worker `pids` in dead-workers.json und
+    löscht sie danach. Nur der Gunicorn-Master ruft das auf, dead-workers.json
+    hat also nie zwei Schreiber gleichzeitig. Die PIDs und eine neue Version
+    stehen mit in der Datei, siehe collect_metrics.
+    """
+    pids = [str(pid) for pid in pids if os.path.exists(worker_path(metrics_dir, pid))]
+    if not pids:
+        return 0
+    dead_path = os.path.join(metrics_dir, DEAD_WORKERS_FILE)
+    dead = read_metrics(dead_path) or {}
+    merged = merge_metrics(empty_metrics(), dead) if dead else empty_metrics()
+    for pid in pids:
+        data = read_metrics(worker_path(metrics_dir, pid))
+        if data:
+            merge_metrics(merged, data)
+    merged['pids'] = pids
+    merged['version'] = dead.get('version', 0) + 1
+    write_metrics(dead_path, json.dumps(merged))
+    for pid in pids:
+        os.remove(worker_path(metrics_dir, pid))
+    return len(pids)
+
+
+def fold_stale_metrics(metrics_dir):
+    """
+    Beim Start des Masters: Dateien von Workern eines früheren Laufs (z.B.
+    nach kill -9 des Masters) zusammenfassen. Gibt die Anzahl zurück.
+    """
+    if not os.path.isdir(metrics_dir):
+        return 0
+    pids = [worker_pid(name) for name in os.listdir(metrics_dir) if worker_pid(name)]
+    return fold_worker_metrics(metrics_dir, pids)
+
+
+def collect_metrics(metrics_dir):
+    """
+    Summiert dead-workers.json und die Dateien der laufenden Worker.
+    Dateien, die der letzte Lauf von fold_worker_metrics schon übernommen,
+    aber noch nicht gelöscht hat, werden übersprungen; ändert sich
+    dead-workers.json während des Lesens, wird neu gelesen. So zählt ein
+    Abruf einen beendeten Worker weder doppelt noch gar nicht.
+    """
+    merged = empty_metrics()
+    if not os.path.isdir(metrics_dir):
+        return merged
+    dead_path = os.path.join(metrics_dir, DEAD_WORKERS_FILE)
+    for _ in range(COLLECT_ATTEMPTS):
+        dead = read_metrics(dead_path) or {}
+        merged = merge_metrics(empty_metrics(), dead) if dead else empty_metrics()
+        folded = set(dead.get('pids', ()))
+        for name in os.listdir(metrics_dir):
+            pid = worker_pid(name)
+            if pid is None or pid in folded:
+                continue
+            data = read_metrics(os.path.join(metrics_dir, name))
+            if data:
+                merge_metrics(merged, data)
+        if (read_metrics(dead_path) or {}).get('version') == dead.get('version'):
+            break
+    return merged